@@ -1,13 +1,15 @@
 import logging
 import os
 import json
+import time
 import asyncio
 from datetime import datetime
-from typing import Annotated, Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any, Set
 
 from dotenv import load_dotenv
-import scipy.io.wavfile as wav
-import numpy as np
+
+# Load environment variables before the project modules below read their settings at import
+load_dotenv(".env")
 
 from livekit import agents, api
 from livekit.agents import AgentSession, Agent, RoomInputOptions, llm
@@ -18,6 +20,21 @@ from livekit.plugins import (
     groq,
 )
 
+from backend.services.transcript_store import TranscriptStore
+from backend.services import storage
+from backend.services.dial_scheduler import DialScheduler
+from backend.services.call_analytics import CallAnalytics, ANALYTICS_ENABLED
+from agent_services.recording import AudioRecorder
+from agent_services.turn_metrics import TurnMetricsCollector
+from agent_services.journal import TranscriptJournal, display_role
+from agent_services.worker_load import CallResources, WorkerLoad, LOAD_THRESHOLD
+from agent_services.fake_providers import FakeSTT, FakeLLM, FakeTTS
+from agent_services.tts_cache import PhraseCache, TTS_CACHE_ENABLED
+from agent_services.failover import BreakerOptions, FailoverSTT, FailoverLLM, FailoverTTS, provider_switches
+from agent_services.prompts import HistoryWindow, Instructions
+from agent_services.transfer import DEFAULT_DEPARTMENT, ParticipantIndex, TransferDirectory, transfer_participant
+from agent_services import amd
+
 # Only import noise cancellation if specifically needed to save memory
 # from livekit.plugins import noise_cancellation
 
@@ -27,15 +44,16 @@ try:
 except ImportError:
     openai = None
 
-# Load environment variables
-load_dotenv(".env")
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("outbound-agent")
 
 
 # --- Configuration ---
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip().lower() for item in (os.getenv(name) or default).split(",") if item.strip()]
+
+
 class Config:
     OUTBOUND_TRUNK_ID = os.getenv("OUTBOUND_TRUNK_ID")
     SIP_DOMAIN = os.getenv("VOBIZ_SIP_DOMAIN")
@@ -61,134 +79,95 @@ class Config:
     # Deepgram
     DEEPGRAM_TTS_MODEL = os.getenv("DEEPGRAM_TTS_MODEL", "aura-asteria-en")
 
+    # Provider failover: comma-separated, in order of preference (defaults to the single provider)
+    STT_PROVIDERS = _env_list("STT_PROVIDERS", STT_PROVIDER)
+    LLM_PROVIDERS = _env_list("LLM_PROVIDERS", LLM_PROVIDER)
+    TTS_PROVIDERS = _env_list("TTS_PROVIDERS", TTS_PROVIDER)
+    OPENAI_LLM_MODEL = os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini")
+    # Send the same request to the next provider if the first is silent this long (0 = off)
+    LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "0"))
+    TTS_HEDGE_AFTER_MS = float(os.getenv("TTS_HEDGE_AFTER_MS", "0"))
+    # Circuit breakers: a provider is skipped when its rolling p95 (TTFT / TTFB) or error
+    # rate goes over the limit, and retried after the cooldown
+    LLM_BREAKER_P95_MS = float(os.getenv("LLM_BREAKER_P95_MS", "2500"))
+    TTS_BREAKER_P95_MS = float(os.getenv("TTS_BREAKER_P95_MS", "1500"))
+    BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+    BREAKER_MIN_SAMPLES = int(os.getenv("BREAKER_MIN_SAMPLES", "5"))
+    BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+    BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+
+    # Worker pool (start.sh runs several workers per host, each with its own health port)
+    WORKER_PORT = int(os.getenv("AGENT_HEALTH_PORT", "8081"))
+    IDLE_PROCESSES = int(os.getenv("AGENT_IDLE_PROCESSES", "2"))
 
-# --- Instructions ---
-AGENT_INSTRUCTIONS = """
-SECTION 1: Demeanour & Identity
-
-Personality  
-mosuam Rakse is a professional, polite, and concise virtual receptionist and AI calling agent representing Mansa InfoTech Technology Services. He speaks clearly with a calm and courteous tone, ensuring every caller feels heard and supported. Mohsum never deviates from the technology focus of Mansa InfoTech services and maintains professionalism throughout the call. He adapts to the caller’s pace and responds precisely, avoiding unnecessary details or personal opinions. His manner is structured yet warm, guiding callers smoothly through the conversation.
-
-Context  
-Mohsum handles both inbound and outbound calls for Mansa InfoTech, a company offering specialized technology and software development services. He fields questions strictly related to AI agents, voice calling, chatbots, telephony integrations, LLM integrations, and related IT offerings. Callers may be business clients or individuals seeking custom technology solutions. Mohsum’s role is to understand their technical requirements, collect lead information, and if needed, schedule a consultation call with senior technical consultants.
-
-Environment  
-Calls take place via phone lines or VOIP, demanding short, clear sentences suitable for voice interaction. Mohsum’s tone remains professional and focused. He never indulges in off-topic conversations or jokes and politely declines non-technology-related queries, steering the conversation back to Mansa InfoTech’s service offerings.
-
-Tone  
-Mohsum’s voice is respectful, friendly, and efficient. He is patient and listens actively, asking smart, relevant questions to understand callers’ needs. He pauses appropriately to allow callers to respond and never interrupts. When the caller needs more detailed help, Mohsum offers to schedule a consultation politely without pressure.
-
-Goal  
-His main objectives are:  
-- Greet callers and introduce Mansa InfoTech professionally  
-- Understand technology-related requirements clearly (AI agents, chatbots, telephony, LLMs, etc.)  
-- Collect mandatory lead details: full name, email address, and contact number  
-- Offer to book a detailed consultation call with senior consultants if appropriate  
-- Politely refuse unrelated or off-topic queries without providing irrelevant information  
-- End calls warmly, leaving a positive impression about Mansa InfoTech
-
-Guardrails  
-- Only provide information about Mansa InfoTech’s specified technology and software services  
-- Do not answer non-technology or unrelated questions; politely decline and redirect  
-- Avoid personal opinions, jokes, or casual banter  
-- Never provide information beyond the scope of Mansa InfoTech’s offerings  
-- Keep communication clear, concise, and professional at all times
-
-Interview Structure & Flow
-
-Call Opening (Inbound & Outbound):  
-English: Hello! Thank you for calling Mansa InfoTech. This is Mousam Rakse, your virtual receptionist. How may I assist you with your technology or software requirements today?  
-If outbound: Hello, this is Mousam Rakse calling from Mansa InfoTech. We provide AI agents, calling systems, chatbots, and more. May I know if you have any current technology needs I can assist with?
-
-Lead Collection:  
-English: May I please have your full name?  
-English: Could you share your email address so our technical team can contact you?  
-English: May I have your contact number for further communication?
-
-Requirement Discovery:  
-English: What type of solution are you looking for? (AI agent, calling system, chatbot, app, website, automation, etc.)  
-English: Is this for a business or personal project?  
-English: Do you need integration with phone numbers, CRM, or LiveKit?  
-English: Are you using any LLM like Gemini, OpenAI, Grok, or others?
-
-Booking Consultation:  
-If caller needs detailed assistance or project discussion:  
-English: Would you like me to arrange a consultation call with our senior technical consultant?  
-If yes: English: Thank you! I will forward your details to our senior consultant team. They will contact you shortly to discuss your requirements in detail.
-
-Non-Tech Query Handling:  
-If the caller asks anything unrelated to technology or Mansa InfoTech services:  
-English: I’m here to assist only with technology and Mansa InfoTech services. Could you please share your technical requirement?
-
-End Call Message:  
-English: Thank you for contacting Mansa InfoTech. Your request has been noted. Our team will connect with you shortly. Have a great day!
-
-Language and Style  
-English language only  
-Use short, professional, and courteous sentences suitable for voice communications  
-Avoid repetition, filler words, or off-topic details  
-Always maintain polite tone even when declining non-pertinent queries
-
-SECTION 2: INTERVIEW STARTER  
-
-Inbound/Outbound Call Opening:  
-English: Hello! Thank you for calling Mansa InfoTech. This is Mohsum Rakhse, your virtual receptionist. How may I assist you with your technology or software requirements today?  
-Outbound call option: Hello, this is Mohsum Rakhse calling from Mansa InfoTech. We provide AI agents, calling systems, chatbots, and more. May I know if you have any current technology needs I can assist with?
-
-SECTION 3: LEAD COLLECTION  
-
-English: May I please have your full name?  
-English: Could you share your email address so our technical team can contact you?  
-English: May I have your contact number for further communication?
-
-SECTION 4: UNDERSTANDING REQUIREMENT  
-
-English: What type of solution are you looking for? (AI agent, calling system, chatbot, app, website, automation, etc.)  
-English: Is this for a business or personal project?  
-English: Do you need integration with phone numbers, CRM, or LiveKit?  
-English: Are you using any LLM like Gemini, OpenAI, Grok, or others?
-
-SECTION 5: BOOKING CONSULTATION  
-
-English: Would you like me to arrange a consultation call with our senior technical consultant?  
-If yes: English: Thank you! I will forward your details to our senior consultant team. They will contact you shortly to discuss your requirements in detail.
-
-SECTION 6: NON-TECH QUERY HANDLING  
-
-English: I’m here to assist only with technology and Mansa InfoTech services. Could you please share your technical requirement?
 
-SECTION 7: END CALL MESSAGE  
-
-English: Thank you for contacting Mansa InfoTech. Your request has been noted. Our team will connect with you shortly. Have a great day!
-"""
+# --- Instructions ---
+AGENT_NAME = "Mohsum Rakhse"
+COMPANY_NAME = "Mansa InfoTech"
+
+# Fixed lines from the instructions. When a reply is exactly one of these it is played
+# from the TTS phrase cache instead of being synthesized again.
+INBOUND_GREETING = f"Hello! Thank you for calling {COMPANY_NAME}. This is {AGENT_NAME}, your virtual receptionist. How may I assist you with your technology or software requirements today?"
+OUTBOUND_OPENER = f"Hello, this is {AGENT_NAME} calling from {COMPANY_NAME}. We provide AI agents, calling systems, chatbots, and more. May I know if you have any current technology needs I can assist with?"
+CONTACT_NUMBER_QUESTION = "May I have your contact number for further communication?"
+CLOSING_LINE = f"Thank you for contacting {COMPANY_NAME}. Your request has been noted. Our team will connect with you shortly. Have a great day!"
+# Left on answering machines when AMD_MACHINE_ACTION=message (played from the cache only)
+VOICEMAIL_MESSAGE = f"Hello, this is {AGENT_NAME} from {COMPANY_NAME}. We help businesses with AI agents, calling systems, chatbots and custom software. We will try you again later. Thank you!"
+CACHED_PHRASES = (INBOUND_GREETING, OUTBOUND_OPENER, CONTACT_NUMBER_QUESTION, CLOSING_LINE, VOICEMAIL_MESSAGE)
+
+# Rendered once per worker from prompts/agent_<PROMPT_VERSION>.txt
+INSTRUCTIONS = Instructions(
+    agent_name=AGENT_NAME,
+    company=COMPANY_NAME,
+    inbound_greeting=INBOUND_GREETING,
+    outbound_opener=OUTBOUND_OPENER,
+    contact_number_question=CONTACT_NUMBER_QUESTION,
+    closing_line=CLOSING_LINE,
+)
 
 
 # --- Model Builders ---
-def _build_stt():
-    if Config.STT_PROVIDER == "deepgram":
+def _build_stt_provider(name: str):
+    if name == "fake":
+        logger.info("Using fake STT (load testing)")
+        return FakeSTT()
+    if name == "deepgram":
         logger.info(f"Using Deepgram STT (Model: {Config.STT_MODEL})")
         return deepgram.STT(model=Config.STT_MODEL, language=Config.STT_LANGUAGE)
     # Add other providers here if needed
-    logger.warning(f"Unknown STT provider '{Config.STT_PROVIDER}', defaulting to Deepgram.")
+    logger.warning(f"Unknown STT provider '{name}', defaulting to Deepgram.")
     return deepgram.STT(model=Config.STT_MODEL, language=Config.STT_LANGUAGE)
 
 
-def _build_llm():
-    if Config.LLM_PROVIDER == "groq":
+def _build_llm_provider(name: str):
+    if name == "fake":
+        logger.info("Using fake LLM (load testing)")
+        return FakeLLM()
+    if name == "groq":
         logger.info(f"Using Groq LLM (Model: {Config.LLM_MODEL})")
         return groq.LLM(model=Config.LLM_MODEL)
+    if name == "openai":
+        if openai:
+            logger.info(f"Using OpenAI LLM (Model: {Config.OPENAI_LLM_MODEL})")
+            return openai.LLM(model=Config.OPENAI_LLM_MODEL)
+        else:
+            logger.error("OpenAI LLM requested but livekit-plugins-openai not installed.")
+            raise ImportError("livekit-plugins-openai not installed/imported")
     # Add other providers here
-    logger.warning(f"Unknown LLM provider '{Config.LLM_PROVIDER}', defaulting to Groq.")
+    logger.warning(f"Unknown LLM provider '{name}', defaulting to Groq.")
     return groq.LLM(model=Config.LLM_MODEL)
 
 
-def _build_tts():
-    """Configure the Text-to-Speech provider based on env vars."""
-    if Config.TTS_PROVIDER == "cartesia":
+def _build_tts_provider(name: str):
+    if name == "fake":
+        logger.info("Using fake TTS (load testing)")
+        return FakeTTS()
+
+    if name == "cartesia":
         logger.info(f"Using Cartesia TTS (Model: {Config.CARTESIA_MODEL})")
         return cartesia.TTS(model=Config.CARTESIA_MODEL, voice=Config.CARTESIA_VOICE)
     
-    if Config.TTS_PROVIDER == "openai":
+    if name == "openai":
         if openai:
             logger.info(f"Using OpenAI TTS (Model: {Config.OPENAI_MODEL})")
             return openai.TTS(model=Config.OPENAI_MODEL, voice=Config.OPENAI_VOICE)
@@ -196,206 +175,330 @@ def _build_tts():
             logger.error("OpenAI TTS requested but livekit-plugins-openai not installed.")
             raise ImportError("livekit-plugins-openai not installed/imported")
 
-    if Config.TTS_PROVIDER == "deepgram":
+    if name == "deepgram":
         logger.info(f"Using Deepgram TTS (Model: {Config.DEEPGRAM_TTS_MODEL})")
         return deepgram.TTS(model=Config.DEEPGRAM_TTS_MODEL)
             
     # Fallback to Cartesia if unknown
-    logger.warning(f"Unknown TTS provider '{Config.TTS_PROVIDER}', defaulting to Cartesia.")
+    logger.warning(f"Unknown TTS provider '{name}', defaulting to Cartesia.")
     return cartesia.TTS(model=Config.CARTESIA_MODEL, voice=Config.CARTESIA_VOICE)
 
 
+def _breaker_options(p95_limit_ms: float) -> BreakerOptions:
+    return BreakerOptions(
+        p95_limit_ms=p95_limit_ms,
+        error_rate=Config.BREAKER_ERROR_RATE,
+        min_samples=Config.BREAKER_MIN_SAMPLES,
+        window_seconds=Config.BREAKER_WINDOW_SECONDS,
+        cooldown_seconds=Config.BREAKER_COOLDOWN_SECONDS,
+    )
+
+
+def _build_stt():
+    plugins = [_build_stt_provider(name) for name in Config.STT_PROVIDERS]
+    if len(plugins) == 1:
+        return plugins[0]
+    logger.info(f"STT failover order: {Config.STT_PROVIDERS}")
+    return FailoverSTT(plugins)
+
+
+def _build_llm():
+    plugins = [_build_llm_provider(name) for name in Config.LLM_PROVIDERS]
+    if len(plugins) == 1:
+        return plugins[0]
+    logger.info(f"LLM failover order: {Config.LLM_PROVIDERS} (hedge after {Config.LLM_HEDGE_AFTER_MS:.0f} ms)")
+    return FailoverLLM(plugins, _breaker_options(Config.LLM_BREAKER_P95_MS), Config.LLM_HEDGE_AFTER_MS)
+
+
+def _build_tts():
+    """Configure the Text-to-Speech provider(s) based on env vars."""
+    plugins = [_build_tts_provider(name) for name in Config.TTS_PROVIDERS]
+    if len(plugins) == 1:
+        return plugins[0]
+    logger.info(f"TTS failover order: {Config.TTS_PROVIDERS} (hedge after {Config.TTS_HEDGE_AFTER_MS:.0f} ms)")
+    return FailoverTTS(plugins, _breaker_options(Config.TTS_BREAKER_P95_MS), Config.TTS_HEDGE_AFTER_MS)
+
+
+def _build_phrase_cache(tts_plugin) -> Optional[PhraseCache]:
+    """Phrase cache for the configured TTS voice, warmed from disk (None when disabled)."""
+    if not TTS_CACHE_ENABLED:
+        return None
+    voices = {"cartesia": Config.CARTESIA_VOICE, "openai": Config.OPENAI_VOICE}
+    voice = "+".join(voices.get(name, "default") for name in Config.TTS_PROVIDERS)
+    cache = PhraseCache(tts_plugin.provider, tts_plugin.model, voice, CACHED_PHRASES)
+    loaded = cache.load_disk()
+    logger.info(f"TTS phrase cache: {loaded}/{len(cache.phrases)} phrases loaded from disk")
+    return cache
+
+
+# --- Worker Prewarm ---
+def prewarm(proc: agents.JobProcess):
+    """
+    Runs once in each worker process before it is handed a job. Loads the Silero VAD model,
+    constructs the provider plugins and loads cached phrase audio so an answered call
+    doesn't pay for them.
+    Each job process serves a single job, so the plugins are taken (not shared) by it.
+    """
+    started = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["stt"] = _build_stt()
+    proc.userdata["llm"] = _build_llm()
+    proc.userdata["tts"] = _build_tts()
+    proc.userdata["phrase_cache"] = _build_phrase_cache(proc.userdata["tts"])
+    logger.info(f"Worker process prewarmed in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def _take_vad(ctx: agents.JobContext):
+    """The process's prewarmed VAD (loaded here if the process was not prewarmed)."""
+    userdata = ctx.proc.userdata
+    vad = userdata.get("vad")
+    if vad is None:
+        logger.warning("Process was not prewarmed, loading VAD inside the job.")
+        vad = userdata["vad"] = silero.VAD.load()
+    return vad
+
+
+def _take_pipeline(ctx: agents.JobContext):
+    """
+    Returns (stt, llm, tts) from the prewarmed process, building any that are missing, with
+    provider connections opened. Called only once the pipeline is needed (for outbound
+    calls, when a person answers), so ringing calls hold no provider connections.
+    """
+    userdata = ctx.proc.userdata
+    stt_plugin = userdata.pop("stt", None) or _build_stt()
+    llm_plugin = userdata.pop("llm", None) or _build_llm()
+    tts_plugin = userdata.pop("tts", None) or _build_tts()
+
+    # Opens connections inside the job's HTTP context
+    for plugin in (stt_plugin, llm_plugin, tts_plugin):
+        try:
+            plugin.prewarm()
+        except Exception as e:
+            logger.warning(f"Prewarm of {type(plugin).__name__} failed: {e}")
+    return stt_plugin, llm_plugin, tts_plugin
+
+
+# Fire-and-forget tasks are referenced here until they finish, so they are not garbage
+# collected mid-run and their failures are logged
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro, name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed: {task.exception()!r}")
+
+
 # --- Tools ---
+# Normalized once at startup; a transfer mid-call is a lookup
+TRANSFERS = TransferDirectory.from_env(Config.DEFAULT_TRANSFER_NUMBER, Config.SIP_DOMAIN)
+
+
 class TransferFunctions(llm.ToolContext):
     def __init__(self, ctx: agents.JobContext, phone_number: str = None):
         super().__init__(tools=[])
         self.ctx = ctx
         self.phone_number = phone_number
+        self.participants = ParticipantIndex(ctx.room, f"sip_{phone_number}" if phone_number else None)
+        self.transfers: List[Dict[str, Any]] = []
 
-    @llm.function_tool(description="Transfer the call to a human support agent or another phone number.")
+    @llm.function_tool(description=(
+        "Transfer the call to a human support agent or another phone number. "
+        + (f"Departments: {', '.join(TRANSFERS.departments)}." if TRANSFERS.departments else "")
+    ))
     async def transfer_call(self, destination: Optional[str] = None):
         """
         Transfer the call to a human or another number.
+
+        Args:
+            destination: A department name, or a phone number. Leave empty for the default line.
         """
-        if destination is None:
-            destination = Config.DEFAULT_TRANSFER_NUMBER
-            if not destination:
-                 return "Error: No default transfer number configured."
-
-        # Handle SIP/TEL URI formatting
-        if "@" not in destination:
-            if Config.SIP_DOMAIN:
-                # Ensure clean number
-                clean_dest = destination.replace("tel:", "").replace("sip:", "")
-                destination = f"sip:{clean_dest}@{Config.SIP_DOMAIN}"
-            else:
-                # Fallback to tel URI
-                if not destination.startswith("tel:") and not destination.startswith("sip:"):
-                     destination = f"tel:{destination}"
-        elif not destination.startswith("sip:"):
-             destination = f"sip:{destination}"
-        
-        logger.info(f"Transferring call to {destination}")
-        
-        # Determine the participant identity
-        participant_identity = None
-        if self.phone_number:
-            participant_identity = f"sip_{self.phone_number}"
-        else:
-            # Try to find a participant that is NOT the agent
-            for p in self.ctx.room.remote_participants.values():
-                participant_identity = p.identity
-                break
-        
+        try:
+            uri = TRANSFERS.resolve(destination)
+        except ValueError as e:
+            known = f" Known departments: {', '.join(TRANSFERS.departments)}." if TRANSFERS.departments else ""
+            return f"Error: {e}.{known}"
+
+        participant_identity = self.participants.caller_identity()
         if not participant_identity:
             logger.error("Could not determine participant identity for transfer")
             return "Failed to transfer: could not identify the caller."
 
-        try:
-            logger.info(f"Transferring participant {participant_identity} to {destination}")
-            await self.ctx.api.sip.transfer_sip_participant(
-                api.TransferSIPParticipantRequest(
-                    room_name=self.ctx.room.name,
-                    participant_identity=participant_identity,
-                    transfer_to=destination,
-                    play_dialtone=False
-                )
-            )
+        logger.info(f"Transferring participant {participant_identity} to {uri}")
+        record = await transfer_participant(self.ctx.api, self.ctx.room.name, participant_identity, uri)
+        record["destination"] = destination or DEFAULT_DEPARTMENT
+        self.transfers.append(record)
+        if record["ok"]:
             return "Transfer initiated successfully."
-        except Exception as e:
-            logger.error(f"Transfer failed: {e}")
-            return f"Error executing transfer: {e}"
+        return f"Error executing transfer: {record['error']}"
 
 
 # --- Helpers ---
 class TranscriptManager:
     @staticmethod
-    async def save_transcript(ctx: agents.JobContext, session: AgentSession, phone_number: str):
-        """Saves transcript in both JSON and TXT format."""
+    def _messages_from_session(session: AgentSession) -> List[Dict[str, Any]]:
+        """Fallback when no journal was kept: walks the session's chat context."""
+        json_log = []
+        for msg in session.chat_context.messages:
+            content = ""
+            if isinstance(msg.content, list):
+                content = " ".join([str(c) for c in msg.content])
+            elif isinstance(msg.content, str):
+                content = msg.content
+
+            if not content or not content.strip():
+                continue
+
+            json_log.append({
+                "role": msg.role,
+                "display_role": display_role(msg.role),
+                "content": content,
+                "timestamp": datetime.fromtimestamp(msg.created_at).isoformat(),
+            })
+        return json_log
+
+    @staticmethod
+    async def write_transcript(meta_data: Dict[str, Any]):
+        """
+        Writes the TXT and JSON transcript files, indexes the call in the transcript store
+        and queues it for post-call analytics.
+        """
+        safe_job_id = "".join([c for c in meta_data["job_id"] if c.isalnum() or c in ("-", "_")])
+
+        # --- Save TXT ---
+        txt_filename = f"transcripts/call_{safe_job_id}.txt"
+        header = (
+            "Call Transcript\n"
+            f"Job ID: {meta_data['job_id']}\n"
+            f"Phone: {meta_data.get('phone_number') or 'Unknown'}\n"
+            f"Timestamp: {meta_data['timestamp']}\n\n"
+        )
+        lines = "".join(f"{m['display_role']}: {m['content']}\n" for m in meta_data["messages"])
+        await storage.write_text(txt_filename, header + lines)
+        logger.info(f"Saved text transcript to {txt_filename}")
+
+        # --- Save JSON ---
+        json_filename = f"transcripts_json/call_{safe_job_id}.json"
+        await storage.write_json(json_filename, meta_data)
+        logger.info(f"Saved JSON transcript to {json_filename}")
+
+        # --- Index in transcript store (what the API reads) ---
+        await storage.run_io(TranscriptStore.save, meta_data)
+        turns = meta_data.get("turns")
+        if turns:
+            provider_key = meta_data.get("metrics", {}).get("latency", {}).get("provider_key")
+            await storage.run_io(TranscriptStore.save_turn_metrics, meta_data["job_id"], provider_key, turns)
+
+        # Lead extraction runs in the backend's analytics workers; the call only queues it
+        if ANALYTICS_ENABLED:
+            await storage.run_io(CallAnalytics.enqueue, [meta_data["job_id"]])
+
+    @staticmethod
+    async def save_transcript(ctx: agents.JobContext, session: AgentSession, phone_number: str,
+                              started_at: Optional[datetime] = None, metrics: Optional[Dict[str, Any]] = None,
+                              turns: Optional[List[Dict[str, Any]]] = None,
+                              journal: Optional[TranscriptJournal] = None):
+        """
+        Compacts the call's journal (or, without one, the chat context) into the final JSON
+        and TXT transcripts, indexes them, and then removes the journal.
+        """
         try:
-            if not hasattr(session, "chat_context"):
+            if journal:
+                await journal.close()
+                messages = journal.messages
+            elif hasattr(session, "chat_context"):
+                messages = TranscriptManager._messages_from_session(session)
+            else:
                 logger.warning("Session has no chat_context, skipping transcript save.")
                 return
 
-            messages = session.chat_context.messages
-            conversation_log = []
-            json_log = []
-
-            for msg in messages:
-                role = msg.role
-                content = ""
-                
-                if isinstance(msg.content, list):
-                    content = " ".join([str(c) for c in msg.content])
-                elif isinstance(msg.content, str):
-                    content = msg.content
-
-                if not content or not content.strip():
-                    continue
-
-                role_map = {"assistant": "Agent", "user": "User", "system": "System"}
-                display_role = role_map.get(role, role.capitalize())
-                
-                # Text log entry
-                conversation_log.append(f"{display_role}: {content}")
-                
-                # JSON log entry
-                json_log.append({
-                    "role": role,
-                    "display_role": display_role,
-                    "content": content,
-                    "timestamp": datetime.now().isoformat() # Ideally capture real message timestamp if available
-                })
-
-            safe_job_id = "".join([c for c in ctx.job.id if c.isalnum() or c in ("-", "_")])
-            timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # --- Save TXT ---
-            txt_dir = "transcripts"
-            os.makedirs(txt_dir, exist_ok=True)
-            txt_filename = f"{txt_dir}/call_{safe_job_id}.txt"
-            
-            with open(txt_filename, "w", encoding="utf-8") as f:
-                f.write("Call Transcript\n")
-                f.write(f"Job ID: {ctx.job.id}\n")
-                f.write(f"Phone: {phone_number if phone_number else 'Unknown'}\n")
-                f.write(f"Timestamp: {timestamp_str}\n\n")
-                for line in conversation_log:
-                    f.write(f"{line}\n")
-            
-            logger.info(f"Saved text transcript to {txt_filename}")
-
-            # --- Save JSON ---
-            json_dir = "transcripts_json"
-            os.makedirs(json_dir, exist_ok=True)
-            json_filename = f"{json_dir}/call_{safe_job_id}.json"
-            
             meta_data = {
                 "job_id": ctx.job.id,
                 "phone_number": phone_number,
-                "timestamp": timestamp_str,
-                "messages": json_log
+                "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "duration_seconds": round((datetime.now() - started_at).total_seconds(), 1) if started_at else None,
+                "metrics": metrics or {},
+                "turns": turns or [],
+                "messages": messages
             }
-            
-            with open(json_filename, "w", encoding="utf-8") as f:
-                json.dump(meta_data, f, indent=2)
-                
-            logger.info(f"Saved JSON transcript to {json_filename}")
+            await TranscriptManager.write_transcript(meta_data)
+            if journal:
+                await journal.remove()
 
         except Exception as e:
             logger.error(f"Failed to save transcripts: {e}")
 
-
-class AudioRecorder:
-    def __init__(self, room: api.Room, job_id: str):
-        self.room = room
-        self.job_id = job_id
-        self.audio_frames = []
-        self.sample_rate = 48000
-        self.recording = True
-        self.task = None
-
-    async def start(self):
-        self.task = asyncio.create_task(self._record_loop())
-
-    async def _record_loop(self):
-        # Setup listener
-        @self.room.on("track_subscribed")
-        def on_track_subscribed(track, publication, participant):
-            if track.kind == "audio":
-                logger.info(f"Subscribed to user audio: {participant.identity}")
-                asyncio.create_task(self._capture_audio(track))
-
-    async def _capture_audio(self, track):
-        stream = api.AudioStream(track)
-        async for event in stream:
-            if not self.recording: break
-            # event.frame is an AudioFrame
-            data = np.frombuffer(event.frame.data, dtype=np.int16)
-            self.audio_frames.append(data)
-            self.sample_rate = event.frame.sample_rate
-
-    async def stop_and_save(self):
-        self.recording = False
-        if self.task:
-            self.task.cancel() # Or modify loop to check flag
-            try:
-                await self.task
-            except asyncio.CancelledError:
-                pass
-        
-        if self.audio_frames:
-            logger.info("Saving user audio recording...")
+    @staticmethod
+    async def recover_journals():
+        """Compacts journals left behind by workers that died mid-call."""
+        for path in await storage.run_io(TranscriptJournal.claim_orphans):
             try:
-                full_audio = np.concatenate(self.audio_frames)
-                os.makedirs("recordings_audio", exist_ok=True)
-                filename = f"recordings_audio/user_{self.job_id}_{int(datetime.now().timestamp())}.wav"
-                wav.write(filename, self.sample_rate, full_audio)
-                logger.info(f"✅ Saved user audio to: {filename}")
+                header, messages = await storage.run_io(TranscriptJournal.read, path)
+                if not header.get("job_id"):
+                    # Nothing to recover a transcript from; set aside instead of retrying forever
+                    logger.error(f"Transcript journal {path} has no header; renamed to .corrupt")
+                    await storage.run_io(TranscriptJournal.release, path, ".corrupt")
+                    continue
+                started_at = datetime.fromisoformat(header["started_at"])
+                last_at = datetime.fromisoformat(messages[-1]["timestamp"]) if messages else started_at
+                await TranscriptManager.write_transcript({
+                    "job_id": header["job_id"],
+                    "phone_number": header.get("phone_number"),
+                    "timestamp": started_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    "duration_seconds": round((last_at - started_at).total_seconds(), 1),
+                    "metrics": {"recovered_from_journal": True},
+                    "messages": messages,
+                })
+                await storage.run_io(os.remove, path)
+                logger.info(f"Recovered transcript for job {header['job_id']} from its journal")
             except Exception as e:
-                logger.error(f"Failed to write wav file: {e}")
-        else:
-            logger.warning("No audio frames captured from user.")
+                logger.error(f"Failed to recover transcript journal {path}, will retry: {e}")
+                try:
+                    await storage.run_io(TranscriptJournal.release, path)
+                except OSError as release_error:
+                    logger.error(f"Could not release transcript journal {path}: {release_error}")
+
+
+async def screen_answer(ctx: agents.JobContext, phone_number: str, vad, phrase_cache: Optional[PhraseCache]) -> Dict[str, Any]:
+    """
+    Answering machine detection on the callee's first seconds, before any provider is used.
+    A machine gets the voicemail message (AMD_MACHINE_ACTION=message) and the call is hung
+    up. Returns the detection result for the call's metrics.
+    """
+    participant = await ctx.wait_for_participant(identity=f"sip_{phone_number}")
+    leave_message = amd.AMD_MACHINE_ACTION == "message"
+    classifier = await asyncio.wait_for(
+        amd.screen(participant, vad, until_greeting_end=leave_message),
+        amd.AMD_MAX_SECONDS + (amd.AMD_VOICEMAIL_WAIT_SECONDS if leave_message else 0) + 5,
+    )
+    result = dict(classifier.result)
+    if result["label"] != amd.MACHINE:
+        return result
+
+    audio = await phrase_cache.get(VOICEMAIL_MESSAGE) if leave_message and phrase_cache else None
+    if audio:
+        await amd.play(ctx.room, audio)
+        result["voicemail_left"] = True
+    elif leave_message:
+        logger.warning("Voicemail message is not pre-rendered; hanging up without it")
+    try:
+        await storage.run_io(DialScheduler.record_answering_machine, ctx.room.name)
+    except Exception as e:
+        logger.warning(f"Could not record answering machine outcome: {e}")
+    logger.info("Answering machine detected, hanging up.")
+    try:
+        await ctx.api.room.delete_room(api.DeleteRoomRequest(room=ctx.room.name))
+    except Exception as e:
+        logger.warning(f"Could not delete room after answering machine: {e}")
+        ctx.shutdown()
+    return result
 
 
 # --- Main Agent ---
@@ -403,35 +506,114 @@ class OutboundAssistant(Agent):
     """
     An AI agent tailored for outbound calls.
     """
-    def __init__(self) -> None:
-        super().__init__(instructions=AGENT_INSTRUCTIONS)
+    def __init__(self, phrase_cache: Optional[PhraseCache] = None, tools: Optional[List[llm.Tool]] = None) -> None:
+        super().__init__(instructions=INSTRUCTIONS.text, tools=tools)
+        self.phrase_cache = phrase_cache
+        self.history = HistoryWindow()
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        """Sends the instructions plus a token-budgeted window of the conversation."""
+        async for chunk in Agent.default.llm_node(self, self.history.trim(chat_ctx), tools, model_settings):
+            yield chunk
+
+    async def tts_node(self, text, model_settings):
+        """Plays fixed lines from the phrase cache; everything else goes to the TTS provider."""
+        def synthesize(chunks):
+            return Agent.default.tts_node(self, chunks, model_settings)
+
+        frames = self.phrase_cache.tts_node(text, synthesize) if self.phrase_cache else synthesize(text)
+        async for frame in frames:
+            yield frame
 
 
 async def entrypoint(ctx: agents.JobContext):
     """
     Main entrypoint for the agent.
     """
+    job_accepted_at = time.perf_counter()
     logger.info(f"Connecting to room: {ctx.room.name}")
     
     # Parse metadata
     phone_number = None
+    # Trunk picked by the backend's admission control; the configured one otherwise
+    sip_trunk_id = Config.OUTBOUND_TRUNK_ID
     try:
         if ctx.job.metadata:
             data = json.loads(ctx.job.metadata)
             phone_number = data.get("phone_number")
+            sip_trunk_id = data.get("sip_trunk_id") or sip_trunk_id
     except Exception:
         logger.warning("No valid JSON metadata found. This might be an inbound call.")
 
     # Initialize function context with tools
     fnc_ctx = TransferFunctions(ctx, phone_number)
 
-    # Initialize Session
-    session = AgentSession(
-        stt=_build_stt(),
-        llm=_build_llm(),
-        tts=_build_tts(),
-        vad=silero.VAD.load(),
-    )
+    # While the phone rings only the room, the VAD (answering machine detection) and the
+    # phrase cache are in use; the STT/LLM/TTS pipeline is taken on answer
+    vad = _take_vad(ctx)
+    userdata = ctx.proc.userdata
+    if userdata.get("tts") is None:
+        userdata["tts"] = _build_tts()
+    phrase_cache = userdata.get("phrase_cache")
+    if phrase_cache is None and "phrase_cache" not in userdata:
+        phrase_cache = _build_phrase_cache(userdata["tts"])
+    if phrase_cache:
+        # Renders phrases missing from the disk tier while the phone rings
+        _spawn(phrase_cache.warm(userdata["tts"]), "phrase-cache-warm")
+    assistant = OutboundAssistant(phrase_cache, tools=list(fnc_ctx.function_tools.values()))
+    resources = CallResources(ctx.job.id)
+
+    # Latency from job accept (and from answer, for outbound) to the agent's first audio
+    call_metrics: Dict[str, Any] = {}
+    answered_at: Optional[float] = None
+
+    # Journal each conversation item as it is added, so a crash mid-call loses nothing
+    journal = TranscriptJournal(ctx.job.id, phone_number)
+    journal.start()
+    _spawn(TranscriptManager.recover_journals(), "recover-journals")
+
+    # Set once the pipeline is taken
+    session: Optional[AgentSession] = None
+    turn_metrics: Optional[TurnMetricsCollector] = None
+    plugins = ()
+
+    async def start_session():
+        nonlocal session, turn_metrics, plugins
+        started_at = time.monotonic()
+        plugins = _take_pipeline(ctx)
+        stt_plugin, llm_plugin, tts_plugin = plugins
+        session = AgentSession(
+            stt=stt_plugin,
+            llm=llm_plugin,
+            tts=tts_plugin,
+            vad=vad,
+        )
+
+        @session.on("agent_state_changed")
+        def on_agent_state_changed(ev):
+            if ev.new_state != "speaking" or "job_to_first_audio_ms" in call_metrics:
+                return
+            now = time.perf_counter()
+            call_metrics["job_to_first_audio_ms"] = round((now - job_accepted_at) * 1000)
+            if answered_at is not None:
+                call_metrics["answer_to_first_audio_ms"] = round((now - answered_at) * 1000)
+            logger.info(f"First agent audio: {call_metrics}")
+
+        # Per-turn latency (VAD end-of-speech, STT final, LLM TTFT, TTS TTFB, playout)
+        provider_key = "/".join(f"{p.provider}:{p.model}" for p in plugins)
+        turn_metrics = TurnMetricsCollector(provider_key)
+        turn_metrics.attach(session)
+        journal.attach(session)
+
+        await session.start(
+            room=ctx.room,
+            agent=assistant,
+            room_input_options=RoomInputOptions(
+                close_on_disconnect=True,
+            ),
+        )
+        resources.pipeline_started(started_at)
+        logger.info(f"Pipeline started in {resources.pipeline_start_ms} ms")
 
     disconnect_event = asyncio.Event()
     
@@ -440,53 +622,97 @@ async def entrypoint(ctx: agents.JobContext):
     
     # Transcript saving flag
     has_saved = False
+    # Call start time (reset to answer time for outbound calls)
+    call_started_at = datetime.now()
     
     async def save_once():
         nonlocal has_saved
         if not has_saved:
             has_saved = True
             logger.info("Executing transcript save...")
-            await TranscriptManager.save_transcript(ctx, session, phone_number)
+            resources.release()
+            call_metrics["resources"] = resources.summary()
+            if phone_number:
+                try:
+                    # Lets the backend free the trunk channel and the number without waiting for webhooks
+                    await storage.run_io(DialScheduler.record_ended, ctx.room.name)
+                    await storage.run_io(DialScheduler.record_resources, ctx.room.name, call_metrics["resources"])
+                except Exception as e:
+                    logger.warning(f"Could not record the end of the call: {e}")
+            if turn_metrics:
+                call_metrics["latency"] = turn_metrics.summary()
+            if phrase_cache:
+                call_metrics["tts_cache"] = phrase_cache.summary()
+            switches = provider_switches(*plugins) if plugins else None
+            if switches:
+                call_metrics["provider_switches"] = switches
+            if fnc_ctx.transfers:
+                call_metrics["transfers"] = fnc_ctx.transfers
+            call_metrics["prompt"] = {**INSTRUCTIONS.summary(), **assistant.history.summary()}
+            await TranscriptManager.save_transcript(ctx, session, phone_number, call_started_at, call_metrics,
+                                                    turn_metrics.turns() if turn_metrics else [], journal)
 
     @ctx.room.on("disconnected")
     def on_disconnected(reason=None):
         logger.info(f"Room disconnected (reason: {reason}). Saving transcript...")
-        asyncio.create_task(save_once())
+        _spawn(save_once(), "save-transcript")
         disconnect_event.set()
 
     # Audio Recording
-    recorder = AudioRecorder(ctx.room, ctx.job.id)
+    recorder = AudioRecorder(ctx.room, ctx.job.id, phone_number)
     await recorder.start()
 
-    # Start Session
-    await session.start(
-        room=ctx.room,
-        agent=OutboundAssistant(),
-        room_input_options=RoomInputOptions(
-            close_on_disconnect=True,
-        ),
-    )
-
     # Handle Outbound Logic
     if phone_number:
+        await ctx.connect()
         logger.info(f"Initiating outbound SIP call to {phone_number}...")
+        resources.dialing()
         try:
             await ctx.api.sip.create_sip_participant(
                 api.CreateSIPParticipantRequest(
                     room_name=ctx.room.name,
-                    sip_trunk_id=Config.OUTBOUND_TRUNK_ID,
+                    sip_trunk_id=sip_trunk_id,
                     sip_call_to=phone_number,
                     participant_identity=f"sip_{phone_number}", 
                     wait_until_answered=True, 
                 )
             )
-            logger.info("Call answered! Agent is now listening.")
+            call_started_at = datetime.now()
+            answered_at = time.perf_counter()
+            logger.info("Call answered!")
+            try:
+                await storage.run_io(DialScheduler.record_answered, ctx.room.name)
+            except Exception as e:
+                logger.warning(f"Could not record the answer: {e}")
         except Exception as e:
             logger.error(f"Failed to place outbound call: {e}")
+            # Lets the dial scheduler tell no-answer / busy (retried) from other failures
+            sip_status = getattr(e, "metadata", None) and e.metadata.get("sip_status_code")
+            if sip_status:
+                try:
+                    await storage.run_io(DialScheduler.record_sip_status, ctx.room.name, sip_status)
+                except Exception as db_error:
+                    logger.warning(f"Could not record SIP status {sip_status}: {db_error}")
             ctx.shutdown()
+        resources.dial_ended()
+
+        if answered_at is not None:
+            # Outbound calls are screened for answering machines before the pipeline is taken
+            if amd.AMD_ENABLED:
+                try:
+                    call_metrics["amd"] = await screen_answer(ctx, phone_number, vad, phrase_cache)
+                except Exception as e:
+                    logger.warning(f"Answering machine detection failed, treating callee as a person: {e}")
+                    call_metrics["amd"] = {"label": amd.UNSURE, "reason": "error"}
+            if call_metrics.get("amd", {}).get("label") != amd.MACHINE and not disconnect_event.is_set():
+                await start_session()
+                # The callee's "Hello?" was said before the session listened, so the agent speaks first
+                session.say(OUTBOUND_OPENER)
     else:
         logger.info("No phone number in metadata. Treating as inbound/web call.")
-        await session.generate_reply(instructions="Greet the user.")
+        await start_session()
+        # Fixed greeting, played straight from the phrase cache once it is warm
+        await session.say(INBOUND_GREETING)
 
     # Wait for completion
     logger.info("Session started. Waiting for disconnect...")
@@ -505,6 +731,12 @@ if __name__ == "__main__":
     agents.cli.run_app(
         agents.WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            request_fnc=WorkerLoad.request,
+            load_fnc=WorkerLoad.load,
+            load_threshold=LOAD_THRESHOLD,
+            num_idle_processes=Config.IDLE_PROCESSES,
+            port=Config.WORKER_PORT,
             agent_name="transcription-agent", 
         )
     )
@@ -0,0 +1,242 @@
+import os
+import math
+import asyncio
+import logging
+from typing import AsyncIterable, Dict, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad as agents_vad
+
+from agent_services.tts_cache import CachedAudio, PhraseCache
+
+logger = logging.getLogger("outbound-agent")
+
+# Answering machine detection on the first seconds of an answered outbound call. The
+# STT/LLM/TTS session only starts once the callee is not a machine.
+AMD_ENABLED = os.getenv("AMD_ENABLED", "true").lower() == "true"
+# "hangup", or "message" to leave the pre-rendered voicemail message after the greeting
+AMD_MACHINE_ACTION = os.getenv("AMD_MACHINE_ACTION", "hangup").lower()
+# Listening stops here with an "unsure" result, which is treated like a person
+AMD_MAX_SECONDS = float(os.getenv("AMD_MAX_SECONDS", "4.0"))
+# Nobody speaking this long after answer is also "unsure": the agent opens the conversation
+AMD_INITIAL_SILENCE_SECONDS = float(os.getenv("AMD_INITIAL_SILENCE_SECONDS", "2.5"))
+# A greeting with more speech (or more words) than this is a recording
+AMD_GREETING_SECONDS = float(os.getenv("AMD_GREETING_SECONDS", "1.8"))
+AMD_MAX_WORDS = int(os.getenv("AMD_MAX_WORDS", "4"))
+# A short greeting followed by this much silence is a person waiting for a reply
+AMD_AFTER_GREETING_SILENCE_SECONDS = float(os.getenv("AMD_AFTER_GREETING_SILENCE_SECONDS", "0.7"))
+# Longest wait for the beep / end of a machine's greeting before leaving the message anyway
+AMD_VOICEMAIL_WAIT_SECONDS = float(os.getenv("AMD_VOICEMAIL_WAIT_SECONDS", "15"))
+
+HUMAN = "human"
+MACHINE = "machine"
+UNSURE = "unsure"
+
+SAMPLE_RATE = 16000
+SPEECH_PROBABILITY = 0.5
+# Windows quieter than this, or this far below the loudest speech so far, are pauses
+SILENCE_DB = -45.0
+PAUSE_BELOW_PEAK_DB = 25.0
+MIN_WORD_SECONDS = 0.1
+BETWEEN_WORDS_SECONDS = 0.1
+# A machine's greeting is over after this much silence (when no beep was heard)
+GREETING_END_SILENCE_SECONDS = 1.5
+# Beep: one steady tone between 300 and 3000 Hz holding most of the window's energy
+BEEP_SECONDS = 0.15
+BEEP_MIN_DB = -35.0
+BEEP_PEAK_RATIO = 0.7
+
+
+class AmdClassifier:
+    """
+    Human / machine decision from the callee's first seconds of audio, fed one VAD window
+    at a time (samples plus Silero speech probability).
+
+    A person picks up with a short "Hello?" and waits; a voicemail greeting is a long
+    unbroken run of words, often ending in a beep. Cadence comes from the windows' energy
+    (pauses between words) gated by the VAD, so line noise does not count as speech.
+    Decisions depend only on the audio, not on wall-clock time, so offline evaluation
+    over recordings gives the same result as a live call.
+    """
+    def __init__(self):
+        self.elapsed = 0.0
+        self.first_speech_at: Optional[float] = None
+        self.speech_seconds = 0.0
+        self.silence_run = 0.0
+        self.words = 0
+        self.peak_db = SILENCE_DB
+        self.beep_at: Optional[float] = None
+        self._word_seconds = 0.0
+        self._gap_seconds = 0.0
+        self._tone_seconds = 0.0
+        self.result: Optional[Dict] = None
+
+    @staticmethod
+    def _tonal(samples: np.ndarray, db: float) -> bool:
+        if db < BEEP_MIN_DB or len(samples) < 64:
+            return False
+        power = np.abs(np.fft.rfft(samples * np.hanning(len(samples)))) ** 2
+        total = power.sum()
+        if total <= 0:
+            return False
+        freqs = np.fft.rfftfreq(len(samples), 1 / SAMPLE_RATE)
+        band = np.flatnonzero((freqs >= 300) & (freqs <= 3000))
+        peak = band[np.argmax(power[band])]
+        return power[max(peak - 1, 0):peak + 2].sum() / total >= BEEP_PEAK_RATIO
+
+    def _end_word(self):
+        if self._word_seconds >= MIN_WORD_SECONDS:
+            self.words += 1
+        self._word_seconds = 0.0
+
+    def update(self, samples: np.ndarray, probability: float, speaking: bool = False) -> Optional[Dict]:
+        """
+        Adds one window (float samples at 16 kHz) with its VAD probability and speaking
+        state; returns the result once decided.
+        """
+        duration = len(samples) / SAMPLE_RATE
+        self.elapsed += duration
+        rms = float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0
+        db = 20 * math.log10(max(rms, 1e-9))
+
+        tonal = self._tonal(samples, db)
+        self._tone_seconds = self._tone_seconds + duration if tonal else 0.0
+        if self._tone_seconds >= BEEP_SECONDS and self.beep_at is None:
+            self.beep_at = self.elapsed
+
+        # The VAD says whether it is a voice; energy finds the pauses between words
+        speech = (not tonal and (speaking or probability >= SPEECH_PROBABILITY)
+                  and db > max(SILENCE_DB, self.peak_db - PAUSE_BELOW_PEAK_DB))
+        if speech:
+            if self.first_speech_at is None:
+                self.first_speech_at = self.elapsed - duration
+            self.peak_db = max(self.peak_db, db)
+            self.speech_seconds += duration
+            self.silence_run = 0.0
+            self._gap_seconds = 0.0
+            self._word_seconds += duration
+        else:
+            self.silence_run += duration
+            self._gap_seconds += duration
+            if self._word_seconds and self._gap_seconds >= BETWEEN_WORDS_SECONDS:
+                self._end_word()
+
+        if self.result is None:
+            self._decide()
+            return self.result
+        return None
+
+    def _decide(self):
+        words = self.words + (self._word_seconds >= MIN_WORD_SECONDS)
+        if self.beep_at is not None:
+            self._result(MACHINE, "beep")
+        elif self.first_speech_at is None:
+            if self.elapsed >= AMD_INITIAL_SILENCE_SECONDS:
+                self._result(UNSURE, "initial_silence")
+        elif self.speech_seconds >= AMD_GREETING_SECONDS:
+            self._result(MACHINE, "long_greeting")
+        elif words > AMD_MAX_WORDS:
+            self._result(MACHINE, "too_many_words")
+        elif self.silence_run >= AMD_AFTER_GREETING_SILENCE_SECONDS:
+            self._result(HUMAN, "short_greeting")
+        if self.result is None and self.elapsed >= AMD_MAX_SECONDS:
+            self._result(UNSURE, "max_time")
+
+    def finish(self) -> Dict:
+        """Result when the audio ends before a decision."""
+        if self.result is None:
+            self._result(UNSURE, "audio_ended")
+        return self.result
+
+    def _result(self, label: str, reason: str):
+        self.result = {
+            "label": label,
+            "reason": reason,
+            "decision_ms": round(self.elapsed * 1000),
+            "initial_silence_ms": round((self.first_speech_at if self.first_speech_at is not None
+                                         else self.elapsed) * 1000),
+            "speech_ms": round(self.speech_seconds * 1000),
+            "words": self.words + (self._word_seconds >= MIN_WORD_SECONDS),
+        }
+
+    @property
+    def greeting_over(self) -> bool:
+        """A machine's greeting has ended: the beep finished, or it went quiet."""
+        if self.beep_at is not None:
+            return self._tone_seconds == 0.0
+        return self.first_speech_at is not None and self.silence_run >= GREETING_END_SILENCE_SECONDS
+
+
+async def classify(frames: AsyncIterable[rtc.AudioFrame], vad: agents_vad.VAD,
+                   until_greeting_end: bool = False) -> AmdClassifier:
+    """
+    Runs the classifier over 16 kHz mono frames through a Silero VAD stream. With
+    until_greeting_end, keeps listening after a machine decision until its greeting is over
+    (or AMD_VOICEMAIL_WAIT_SECONDS of audio), so a message is not talked over.
+    """
+    classifier = AmdClassifier()
+    stream = vad.stream()
+
+    async def push():
+        async for frame in frames:
+            stream.push_frame(frame)
+        stream.end_input()
+
+    push_task = asyncio.create_task(push())
+    try:
+        async for event in stream:
+            if event.type != agents_vad.VADEventType.INFERENCE_DONE or not event.frames:
+                continue
+            samples = np.frombuffer(bytes(event.frames[0].data), dtype=np.int16).astype(np.float32) / 32768
+            result = classifier.update(samples, event.probability, event.speaking)
+            if classifier.result is None:
+                continue
+            if result is not None:
+                logger.info(f"Answering machine detection: {result}")
+            if not until_greeting_end or classifier.result["label"] != MACHINE:
+                break
+            if classifier.greeting_over or classifier.elapsed >= AMD_VOICEMAIL_WAIT_SECONDS:
+                break
+    finally:
+        push_task.cancel()
+        await stream.aclose()
+    classifier.finish()
+    return classifier
+
+
+async def screen(participant: rtc.RemoteParticipant, vad: agents_vad.VAD,
+                 until_greeting_end: bool = False) -> AmdClassifier:
+    """Classifies the callee from their microphone track."""
+    audio = rtc.AudioStream.from_participant(
+        participant=participant,
+        track_source=rtc.TrackSource.SOURCE_MICROPHONE,
+        sample_rate=SAMPLE_RATE,
+        num_channels=1,
+    )
+
+    async def frames():
+        async for event in audio:
+            yield event.frame
+
+    try:
+        return await classify(frames(), vad, until_greeting_end)
+    finally:
+        await audio.aclose()
+
+
+async def play(room: rtc.Room, audio: CachedAudio):
+    """Plays pre-rendered audio into the room on its own track (no TTS session needed)."""
+    _, sample_rate, num_channels = audio
+    source = rtc.AudioSource(sample_rate, num_channels)
+    track = rtc.LocalAudioTrack.create_audio_track("voicemail", source)
+    publication = await room.local_participant.publish_track(
+        track, rtc.TrackPublishOptions(source=rtc.TrackSource.SOURCE_MICROPHONE)
+    )
+    try:
+        async for frame in PhraseCache.frames(audio):
+            await source.capture_frame(frame)
+        await source.wait_for_playout()
+    finally:
+        await room.local_participant.unpublish_track(publication.sid)
+        await source.aclose()
@@ -0,0 +1,384 @@
+import time
+import asyncio
+import logging
+import dataclasses
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from livekit import rtc
+from livekit.agents import (
+    APIConnectOptions,
+    APIConnectionError,
+    DEFAULT_API_CONNECT_OPTIONS,
+    llm,
+    stt,
+    tts,
+)
+
+logger = logging.getLogger("outbound-agent")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclasses.dataclass
+class BreakerOptions:
+    p95_limit_ms: float
+    error_rate: float = 0.5
+    min_samples: int = 5
+    window_seconds: float = 60
+    cooldown_seconds: float = 30
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one provider.
+
+    Opens when, over the last `window_seconds` (and at least `min_samples` requests), the
+    error rate reaches `error_rate` or the p95 latency exceeds `p95_limit_ms`. After
+    `cooldown_seconds` one trial request is let through (half-open); it closes the breaker
+    on success and re-opens it on failure.
+    """
+    def __init__(self, name: str, options: BreakerOptions):
+        self.name = name
+        self.options = options
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.reason: Optional[str] = None
+        self._trial_in_flight = False
+        self._samples: "deque[Tuple[float, float, bool]]" = deque()  # (time, latency_ms, ok)
+
+    def _trim(self, now: float):
+        while self._samples and now - self._samples[0][0] > self.options.window_seconds:
+            self._samples.popleft()
+
+    def p95_ms(self) -> Optional[float]:
+        latencies = sorted(s[1] for s in self._samples if s[2])
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def error_rate(self) -> float:
+        return sum(1 for s in self._samples if not s[2]) / len(self._samples) if self._samples else 0.0
+
+    def can_try(self) -> bool:
+        """Whether a request may go to this provider now (no side effects)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= self.options.cooldown_seconds
+        return not self._trial_in_flight
+
+    def acquire(self) -> bool:
+        """Takes the slot for a request about to be sent; half-open lets one trial through."""
+        if not self.can_try():
+            return False
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            self._trial_in_flight = True
+        return True
+
+    def record(self, latency_ms: float, ok: bool):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self._trial_in_flight = False
+            if ok and latency_ms <= self.options.p95_limit_ms:
+                self.state, self.reason = CLOSED, None
+                self._samples.clear()
+                logger.info(f"Circuit breaker for {self.name} closed after a successful trial")
+            else:
+                self._open(now, "trial request failed" if not ok else f"trial took {latency_ms:.0f} ms")
+            return
+
+        self._samples.append((now, latency_ms, ok))
+        self._trim(now)
+        if self.state != CLOSED or len(self._samples) < self.options.min_samples:
+            return
+        error_rate = self.error_rate()
+        p95 = self.p95_ms()
+        if error_rate >= self.options.error_rate:
+            self._open(now, f"error rate {error_rate:.0%}")
+        elif p95 is not None and p95 > self.options.p95_limit_ms:
+            self._open(now, f"p95 {p95:.0f} ms > {self.options.p95_limit_ms:.0f} ms")
+
+    def _open(self, now: float, reason: str):
+        self.state, self.opened_at, self.reason = OPEN, now, reason
+        logger.warning(f"Circuit breaker for {self.name} opened: {reason}")
+
+
+def _label(plugin) -> str:
+    return f"{plugin.provider}:{plugin.model}"
+
+
+class ProviderGroup:
+    """
+    Ordered providers of one kind with a breaker each. Breakers live in the job process,
+    so they track the providers over the course of one call.
+    """
+    def __init__(self, kind: str, plugins: List[Any], breaker: BreakerOptions, hedge_after_ms: float = 0):
+        self.kind = kind
+        self.plugins = plugins
+        self.breakers = [CircuitBreaker(_label(p), breaker) for p in plugins]
+        self.hedge_after_ms = hedge_after_ms
+        self.active = 0
+        self.switches: List[Dict[str, Any]] = []
+        self._settling = set()
+
+    def candidates(self) -> Tuple[List[int], bool]:
+        """Providers to try in order, and whether the breakers are bypassed (all open)."""
+        allowed = [i for i, b in enumerate(self.breakers) if b.can_try()]
+        # With every breaker open, keep trying in order rather than failing the call
+        return (allowed, False) if allowed else (list(range(len(self.plugins))), True)
+
+    def record(self, index: int, latency_ms: float, ok: bool):
+        self.breakers[index].record(latency_ms, ok)
+
+    def served_by(self, index: int, reason: str):
+        if index == self.active:
+            return
+        switch = {
+            "timestamp": datetime.now().isoformat(),
+            "kind": self.kind,
+            "from": _label(self.plugins[self.active]),
+            "to": _label(self.plugins[index]),
+            "reason": reason,
+        }
+        self.switches.append(switch)
+        self.active = index
+        logger.warning(f"{self.kind.upper()} provider switched from {switch['from']} to {switch['to']}: {reason}")
+
+    def _skip_reason(self, index: int) -> Optional[str]:
+        breaker = self.breakers[self.active]
+        if index != self.active and breaker.state != CLOSED:
+            return f"{breaker.name} circuit open ({breaker.reason})"
+        return None
+
+    async def first_response(self, start: Callable[[int], Any]) -> Tuple[int, Any, Any]:
+        """
+        Starts a request on the first healthy provider and returns (index, stream, first
+        event) for whichever attempt produces its first event first. A failed attempt fails
+        over to the next provider; with hedging enabled, an attempt still silent after
+        hedge_after_ms races against the next provider too, and the slower one is cancelled.
+        """
+        order, bypass = self.candidates()
+        attempts: Dict[asyncio.Task, Tuple[int, Any, float]] = {}
+        reasons: List[str] = []
+        hedged = False
+
+        def launch() -> bool:
+            # Only the provider actually called takes its breaker's (half-open trial) slot
+            while order and not (bypass or self.breakers[order[0]].acquire()):
+                order.pop(0)
+            if not order:
+                return False
+            index = order.pop(0)
+            stream = start(index)
+            task = asyncio.ensure_future(stream.__anext__())
+            attempts[task] = (index, stream, time.perf_counter())
+            return True
+
+        launch()
+        try:
+            while attempts:
+                timeout = self.hedge_after_ms / 1000 if self.hedge_after_ms > 0 and order and not hedged else None
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    reasons.append(f"hedged after {self.hedge_after_ms:.0f} ms")
+                    launch()
+                    continue
+
+                for task in done:
+                    index, stream, started = attempts.pop(task)
+                    latency_ms = (time.perf_counter() - started) * 1000
+                    error = task.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        self.record(index, latency_ms, True)
+                        self.served_by(index, self._skip_reason(index) or "; ".join(reasons) or "preferred provider available again")
+                        return index, stream, None if error else task.result()
+
+                    self.record(index, latency_ms, False)
+                    reasons.append(f"{_label(self.plugins[index])} failed: {error}")
+                    logger.warning(f"{self.kind.upper()} request to {_label(self.plugins[index])} failed: {error}")
+                    await stream.aclose()
+                    if not attempts:
+                        launch()
+            raise APIConnectionError(f"all {self.kind} providers failed: {'; '.join(reasons)}")
+        finally:
+            # The losing hedge keeps running in the background just long enough to learn its
+            # real latency for the breaker; its output is discarded
+            for task, (index, stream, started) in attempts.items():
+                settle = asyncio.create_task(self._settle(task, index, stream, started))
+                self._settling.add(settle)
+                settle.add_done_callback(self._settling.discard)
+
+    async def _settle(self, task: asyncio.Future, index: int, stream, started: float):
+        cap = self.breakers[index].options.p95_limit_ms * 2 / 1000
+        ok = True
+        try:
+            await asyncio.wait_for(task, cap)
+        except (asyncio.TimeoutError, StopAsyncIteration):
+            pass
+        except Exception:
+            ok = False
+        self.record(index, (time.perf_counter() - started) * 1000, ok)
+        await stream.aclose()
+
+
+class FailoverLLM(llm.LLM):
+    """LLM over an ordered provider list with circuit breakers and optional hedging (on TTFT)."""
+    def __init__(self, plugins: List[llm.LLM], breaker: BreakerOptions, hedge_after_ms: float = 0):
+        super().__init__()
+        self.group = ProviderGroup("llm", plugins, breaker, hedge_after_ms)
+
+    @property
+    def model(self) -> str:
+        return "+".join(_label(p) for p in self.group.plugins)
+
+    @property
+    def provider(self) -> str:
+        return "failover"
+
+    @property
+    def switches(self) -> List[Dict[str, Any]]:
+        return self.group.switches
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools: Optional[list] = None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs: Any) -> "FailoverLLMStream":
+        return FailoverLLMStream(self, chat_ctx=chat_ctx, tools=tools or [],
+                                 conn_options=dataclasses.replace(conn_options, max_retry=0), kwargs=kwargs)
+
+    def prewarm(self, *, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.group.plugins[0].prewarm(loop=loop)
+
+
+class FailoverLLMStream(llm.LLMStream):
+    def __init__(self, owner: FailoverLLM, *, chat_ctx, tools, conn_options, kwargs: Dict[str, Any]):
+        super().__init__(owner, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._group = owner.group
+        self._kwargs = kwargs
+
+    def _start(self, index: int):
+        return self._group.plugins[index].chat(
+            chat_ctx=self._chat_ctx, tools=self._tools, conn_options=self._conn_options, **self._kwargs,
+        )
+
+    async def _run(self) -> None:
+        index, stream, first = await self._group.first_response(self._start)
+        try:
+            if first is None:
+                return
+            self._event_ch.send_nowait(first)
+            async for chunk in stream:
+                self._event_ch.send_nowait(chunk)
+        except Exception:
+            # Part of the reply is already out; it cannot be retried on another provider
+            self._group.record(index, 0, False)
+            raise
+        finally:
+            await stream.aclose()
+
+
+class FailoverTTS(tts.TTS):
+    """
+    TTS over an ordered provider list with circuit breakers and optional hedging (on time
+    to first audio). Requests are per sentence (the session adds a sentence tokenizer),
+    so a provider can be switched between sentences of the same reply.
+    """
+    def __init__(self, plugins: List[tts.TTS], breaker: BreakerOptions, hedge_after_ms: float = 0):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False),
+                         sample_rate=plugins[0].sample_rate, num_channels=plugins[0].num_channels)
+        self.group = ProviderGroup("tts", plugins, breaker, hedge_after_ms)
+
+    @property
+    def model(self) -> str:
+        return "+".join(_label(p) for p in self.group.plugins)
+
+    @property
+    def provider(self) -> str:
+        return "failover"
+
+    @property
+    def switches(self) -> List[Dict[str, Any]]:
+        return self.group.switches
+
+    def synthesize(self, text: str, *,
+                   conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> "FailoverChunkedStream":
+        return FailoverChunkedStream(tts=self, input_text=text,
+                                     conn_options=dataclasses.replace(conn_options, max_retry=0))
+
+    def prewarm(self) -> None:
+        self.group.plugins[0].prewarm()
+
+
+class FailoverChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        group: ProviderGroup = self._tts.group
+
+        def start(index: int):
+            return group.plugins[index].synthesize(self.input_text, conn_options=self._conn_options)
+
+        index, stream, first = await group.first_response(start)
+        output_emitter.initialize(
+            request_id=first.request_id if first else "",
+            sample_rate=self._tts.sample_rate,
+            num_channels=self._tts.num_channels,
+            mime_type="audio/pcm",
+        )
+        resampler: Optional[rtc.AudioResampler] = None
+        source = group.plugins[index]
+        if source.sample_rate != self._tts.sample_rate:
+            resampler = rtc.AudioResampler(input_rate=source.sample_rate, output_rate=self._tts.sample_rate,
+                                           num_channels=self._tts.num_channels)
+
+        def push(frame: rtc.AudioFrame):
+            for out in (resampler.push(frame) if resampler else [frame]):
+                output_emitter.push(bytes(out.data))
+
+        try:
+            if first is not None:
+                push(first.frame)
+                async for ev in stream:
+                    push(ev.frame)
+            if resampler:
+                for out in resampler.flush():
+                    output_emitter.push(bytes(out.data))
+            output_emitter.flush()
+        except Exception:
+            group.record(index, 0, False)
+            raise
+        finally:
+            await stream.aclose()
+
+
+class FailoverSTT(stt.FallbackAdapter):
+    """
+    Ordered STT failover (LiveKit's FallbackAdapter, which fails a live stream over to
+    the next provider and probes failed ones for recovery) with switches recorded for the
+    call record. Streaming recognition is not hedged.
+    """
+    def __init__(self, plugins: List[stt.STT], **kwargs):
+        super().__init__(plugins, **kwargs)
+        self.plugins = plugins
+        self.switches: List[Dict[str, Any]] = []
+        self.on("stt_availability_changed", self._on_availability_changed)
+
+    def _on_availability_changed(self, ev):
+        switch = {
+            "timestamp": datetime.now().isoformat(),
+            "kind": "stt",
+            "provider": _label(ev.stt),
+            "available": ev.available,
+            "reason": "recovered" if ev.available else "failed, using next provider",
+        }
+        self.switches.append(switch)
+        logger.warning(f"STT provider {switch['provider']} {switch['reason']}")
+
+
+def provider_switches(*plugins) -> List[Dict[str, Any]]:
+    """All switches recorded by the failover wrappers among `plugins`, oldest first."""
+    switches = [s for p in plugins for s in getattr(p, "switches", [])]
+    return sorted(switches, key=lambda s: s["timestamp"])
@@ -0,0 +1,148 @@
+"""
+Local stand-ins for the STT, LLM and TTS providers, used for load testing without
+paid APIs. Select them with STT_PROVIDER=fake, LLM_PROVIDER=fake and TTS_PROVIDER=fake.
+Latency and jitter are configurable so benchmarks can model a given provider mix.
+"""
+import os
+import uuid
+import random
+import asyncio
+from typing import Any, Optional
+
+import numpy as np
+from livekit.agents import (
+    APIConnectOptions,
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    NotGivenOr,
+    llm,
+    stt,
+    tts,
+)
+from livekit.agents.language import LanguageCode
+from livekit.agents.utils import AudioBuffer
+
+STT_LATENCY_MS = float(os.getenv("FAKE_STT_LATENCY_MS", "150"))
+LLM_TTFT_MS = float(os.getenv("FAKE_LLM_TTFT_MS", "300"))
+LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "200"))
+TTS_TTFB_MS = float(os.getenv("FAKE_TTS_TTFB_MS", "200"))
+# Audio is produced this many times faster than real time
+TTS_SPEED = float(os.getenv("FAKE_TTS_SPEED", "4"))
+# Uniform +/- jitter applied to every latency above
+JITTER_MS = float(os.getenv("FAKE_JITTER_MS", "50"))
+
+TTS_SAMPLE_RATE = 24000
+TTS_SECONDS_PER_WORD = 0.3
+
+USER_PHRASES = [
+    "Hello, who is this?",
+    "I wanted to ask about your website development services.",
+    "What would something like that cost?",
+    "Can someone from your team call me back tomorrow?",
+    "Okay, thank you.",
+]
+AGENT_REPLY = (
+    "Thank you for your interest in Mansa InfoTech. Our team builds websites, mobile apps "
+    "and custom software. May I know a convenient time for our specialist to call you back?"
+)
+
+
+async def _delay(ms: float):
+    await asyncio.sleep(max(0.0, ms + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+
+
+class FakeSTT(stt.STT):
+    """Non-streaming STT; the session pairs it with VAD, so each utterance is one request."""
+    def __init__(self):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self._turn = 0
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @property
+    def provider(self) -> str:
+        return "fake"
+
+    async def _recognize_impl(self, buffer: AudioBuffer, *, language: NotGivenOr[str] = NOT_GIVEN,
+                              conn_options: APIConnectOptions) -> stt.SpeechEvent:
+        await _delay(STT_LATENCY_MS)
+        text = USER_PHRASES[self._turn % len(USER_PHRASES)]
+        self._turn += 1
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            request_id=uuid.uuid4().hex,
+            alternatives=[stt.SpeechData(language=LanguageCode("en"), text=text, confidence=1.0)],
+        )
+
+
+class FakeLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        request_id = uuid.uuid4().hex
+        await _delay(LLM_TTFT_MS)
+        words = AGENT_REPLY.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(1 / LLM_TOKENS_PER_SECOND)
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", content=word if i == 0 else " " + word),
+            ))
+        prompt_tokens = sum(len(str(item).split()) for item in self._chat_ctx.items)
+        self._event_ch.send_nowait(llm.ChatChunk(
+            id=request_id,
+            usage=llm.CompletionUsage(completion_tokens=len(words), prompt_tokens=prompt_tokens,
+                                      total_tokens=prompt_tokens + len(words)),
+        ))
+
+
+class FakeLLM(llm.LLM):
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @property
+    def provider(self) -> str:
+        return "fake"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools: Optional[list] = None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs: Any) -> FakeLLMStream:
+        return FakeLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        await _delay(TTS_TTFB_MS)
+        output_emitter.initialize(
+            request_id=uuid.uuid4().hex,
+            sample_rate=TTS_SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        seconds = max(0.3, len(self.input_text.split()) * TTS_SECONDS_PER_WORD)
+        chunk_samples = TTS_SAMPLE_RATE // 10
+        t = np.arange(chunk_samples) / TTS_SAMPLE_RATE
+        chunk = (np.sin(2 * np.pi * 220 * t) * 2000).astype(np.int16).tobytes()
+        for _ in range(int(seconds * 10)):
+            output_emitter.push(chunk)
+            await asyncio.sleep(0.1 / TTS_SPEED)
+        output_emitter.flush()
+
+
+class FakeTTS(tts.TTS):
+    def __init__(self):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False),
+                         sample_rate=TTS_SAMPLE_RATE, num_channels=1)
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    @property
+    def provider(self) -> str:
+        return "fake"
+
+    def synthesize(self, text: str, *,
+                   conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> FakeChunkedStream:
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
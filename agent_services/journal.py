@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from backend.services import storage
+
+logger = logging.getLogger("outbound-agent")
+
+# Append-only per-call journals; removed once the final transcript has been written
+JOURNAL_DIR = os.getenv("TRANSCRIPTS_JOURNAL_DIR", "transcripts_journal")
+# A journal untouched for this long is treated as orphaned even if its worker pid is alive
+JOURNAL_STALE_SECONDS = float(os.getenv("TRANSCRIPTS_JOURNAL_STALE_SECONDS", "3600"))
+
+# Claimed journals are renamed to "<journal>.<claimer pid>.recovering"
+RECOVERING_SUFFIX = ".recovering"
+
+ROLE_NAMES = {"assistant": "Agent", "user": "User", "system": "System"}
+
+
+def display_role(role: str) -> str:
+    return ROLE_NAMES.get(role, role.capitalize())
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else (e.g. EPERM)
+        return True
+    return True
+
+
+class TranscriptJournal:
+    """
+    Crash-safe, append-only JSONL journal of one call's conversation.
+
+    The first line is a header with the call's metadata; each following line is one
+    conversation item written when the session adds it, with the time it was spoken.
+    Lines are appended and fsynced by a single writer task on the storage pool, so the
+    event loop never blocks and ordering is preserved.
+    """
+    def __init__(self, job_id: str, phone_number: Optional[str] = None):
+        safe_job_id = "".join([c for c in job_id if c.isalnum() or c in ("-", "_")])
+        self.path = os.path.join(JOURNAL_DIR, f"call_{safe_job_id}.jsonl")
+        self.job_id = job_id
+        self.phone_number = phone_number
+        self.messages: List[Dict] = []
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        self._file = None
+
+    def start(self):
+        header = {
+            "type": "call",
+            "job_id": self.job_id,
+            "phone_number": self.phone_number,
+            "started_at": datetime.now().isoformat(),
+            "pid": os.getpid(),
+        }
+        self._queue.put_nowait(json.dumps(header))
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def attach(self, session):
+        session.on("conversation_item_added", self.on_conversation_item_added)
+
+    def on_conversation_item_added(self, ev):
+        item = ev.item
+        if getattr(item, "type", None) != "message":
+            return
+        content = item.text_content
+        if not content or not content.strip():
+            return
+        entry = {
+            "role": item.role,
+            "display_role": display_role(item.role),
+            "content": content,
+            "timestamp": datetime.fromtimestamp(item.created_at).isoformat(),
+        }
+        if item.interrupted:
+            entry["interrupted"] = True
+        self.messages.append(entry)
+        self._queue.put_nowait(json.dumps({"type": "message", **entry}))
+
+    def _open(self):
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _append(self, lines: List[str]):
+        if self._file is None:
+            self._open()
+        self._file.write("".join(line + "\n" for line in lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def _write_loop(self):
+        done = False
+        while not done:
+            lines = [await self._queue.get()]
+            # Batch whatever else queued up while the last write was in flight
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+            if None in lines:
+                lines = lines[:lines.index(None)]
+                done = True
+            if lines:
+                try:
+                    await storage.run_io(self._append, lines)
+                except Exception as e:
+                    logger.error(f"Failed to append to transcript journal {self.path}: {e}")
+
+    async def close(self):
+        """Flushes pending lines and closes the journal file (it stays on disk)."""
+        if self._writer:
+            self._queue.put_nowait(None)
+            await self._writer
+            self._writer = None
+        if self._file is not None:
+            await storage.run_io(self._file.close)
+            self._file = None
+
+    async def remove(self):
+        """Deletes the journal once the final transcript is safely written."""
+        await self.close()
+        try:
+            await storage.run_io(os.remove, self.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def read(path: str) -> Tuple[Dict, List[Dict]]:
+        """Returns (header, messages) from a journal, skipping a torn last line."""
+        header, messages = {}, []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = entry.pop("type", None)
+                if kind == "call":
+                    header = entry
+                elif kind == "message":
+                    messages.append(entry)
+        return header, messages
+
+    @staticmethod
+    def read_header(path: str) -> Dict:
+        """The journal's header (first line) without reading the conversation."""
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                entry = json.loads(f.readline())
+            except json.JSONDecodeError:
+                return {}
+        return entry if isinstance(entry, dict) and entry.get("type") == "call" else {}
+
+    @staticmethod
+    def _claimer(filename: str) -> Tuple[str, Optional[int]]:
+        """'call_x.jsonl.123.recovering' -> ('call_x.jsonl', 123)."""
+        base = filename[:-len(RECOVERING_SUFFIX)]
+        journal_name, _, pid = base.rpartition(".")
+        if journal_name.endswith(".jsonl") and pid.isdigit():
+            return journal_name, int(pid)
+        return base, None
+
+    @staticmethod
+    def claim_orphans() -> List[str]:
+        """
+        Finds journals whose worker is gone (or that went stale) and claims each one by
+        renaming it to carry this worker's pid, so concurrent workers never compact the same
+        journal twice. Claims held by a worker that died (or went stale) are taken over.
+        """
+        if not os.path.isdir(JOURNAL_DIR):
+            return []
+        claimed = []
+        now = time.time()
+        for filename in os.listdir(JOURNAL_DIR):
+            path = os.path.join(JOURNAL_DIR, filename)
+            try:
+                if filename.endswith(".jsonl"):
+                    journal_name, owner = filename, TranscriptJournal.read_header(path).get("pid")
+                elif filename.endswith(RECOVERING_SUFFIX):
+                    journal_name, owner = TranscriptJournal._claimer(filename)
+                else:
+                    continue
+                stale = now - os.path.getmtime(path) > JOURNAL_STALE_SECONDS
+                if _pid_alive(owner) and not stale:
+                    continue
+                claimed_path = os.path.join(JOURNAL_DIR, f"{journal_name}.{os.getpid()}{RECOVERING_SUFFIX}")
+                os.rename(path, claimed_path)
+                # The claim's age, not the call's, decides when another worker may take it over
+                os.utime(claimed_path)
+                claimed.append(claimed_path)
+            except OSError:
+                # Removed or claimed by another worker in the meantime
+                continue
+        return claimed
+
+    @staticmethod
+    def release(claimed_path: str, suffix: str = ""):
+        """Hands a claimed journal back (renamed to .jsonl, plus `suffix`) after a failed recovery."""
+        journal_name, _ = TranscriptJournal._claimer(os.path.basename(claimed_path))
+        os.rename(claimed_path, os.path.join(JOURNAL_DIR, journal_name + suffix))
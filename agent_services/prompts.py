@@ -0,0 +1,166 @@
+import os
+import hashlib
+import logging
+from string import Template
+from typing import Any, Dict, List
+
+from livekit.agents import llm
+
+# Exact counts when tiktoken is installed; otherwise ~4 characters per token
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger("outbound-agent")
+
+# Instruction templates live in PROMPT_DIR as agent_<version>.txt (default: prompts/ in the repo)
+PROMPT_DIR = os.getenv("PROMPT_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "v2")
+# Conversation history sent to the LLM each turn (instructions excluded). Past this, the
+# oldest turns are folded into a short summary.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+
+def dedupe(text: str) -> str:
+    """Drops repeated lines (case and whitespace-insensitive) and runs of blank lines."""
+    seen = set()
+    lines: List[str] = []
+    for line in text.splitlines():
+        key = " ".join(line.split()).lower()
+        if not key:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line.rstrip())
+    return "\n".join(lines).strip() + "\n"
+
+
+class Instructions:
+    """
+    Agent instructions rendered from a versioned template. The text is fixed for the life
+    of the worker and holds nothing call-specific, so every LLM request starts with the
+    same prefix and provider-side prompt caching applies.
+    """
+    def __init__(self, version: str = PROMPT_VERSION, **values: str):
+        path = os.path.join(PROMPT_DIR, f"agent_{version}.txt")
+        with open(path, "r", encoding="utf-8") as f:
+            raw = Template(f.read()).substitute(values)
+        self.version = version
+        self.text = dedupe(raw)
+        self.tokens = count_tokens(self.text)
+        self.sha = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:12]
+        logger.info(
+            f"Loaded instructions {version} ({self.sha}): {self.tokens} tokens, "
+            f"{count_tokens(raw) - self.tokens} removed as duplicates"
+            + ("" if tiktoken else " (estimated)")
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {"version": self.version, "sha": self.sha, "tokens": self.tokens}
+
+
+def _item_text(item: Any) -> str:
+    if item.type == "message":
+        return item.text_content or ""
+    if item.type == "function_call":
+        return f"{item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return item.output
+    return ""
+
+
+class HistoryWindow:
+    """
+    Token-budgeted sliding window over one call's chat history.
+
+    Leading system messages (the instructions) are always kept. When the rest goes over
+    HISTORY_TOKEN_BUDGET, the oldest items are evicted until it is back to half the budget
+    and their messages are folded into a summary placed after the instructions. Evicting in
+    chunks keeps instructions + summary identical for several turns in a row, so the cached
+    prompt prefix keeps matching between evictions.
+    """
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, summary_tokens: int = HISTORY_SUMMARY_TOKENS):
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.summary_lines: List[str] = []
+        self._evicted: set = set()
+        self._tokens: Dict[str, int] = {}
+        self.stats = {"evicted_items": 0, "summaries": 0, "max_history_tokens": 0}
+
+    def _count(self, item: Any) -> int:
+        tokens = self._tokens.get(item.id)
+        if tokens is None:
+            tokens = self._tokens[item.id] = count_tokens(_item_text(item)) + 4
+        return tokens
+
+    def trim(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        items = chat_ctx.items
+        prefix_len = 0
+        while prefix_len < len(items) and items[prefix_len].type == "message" \
+                and items[prefix_len].role in ("system", "developer"):
+            prefix_len += 1
+        prefix = items[:prefix_len]
+        history = [i for i in items[prefix_len:] if i.id not in self._evicted]
+
+        total = sum(self._count(i) for i in history)
+        if total > self.budget:
+            keep_from = 0
+            while keep_from < len(history) and total > self.budget // 2:
+                total -= self._count(history[keep_from])
+                keep_from += 1
+            # Never separate a tool result from its call
+            while keep_from < len(history) and history[keep_from].type == "function_call_output":
+                total -= self._count(history[keep_from])
+                keep_from += 1
+            self._fold(history[:keep_from])
+            history = history[keep_from:]
+        self.stats["max_history_tokens"] = max(self.stats["max_history_tokens"], total)
+
+        if not self.summary_lines:
+            return llm.ChatContext(prefix + history)
+        summary = llm.ChatMessage(
+            id="history_summary",
+            role="system",
+            content=["Summary of the earlier part of this call:\n" + "\n".join(self.summary_lines)],
+        )
+        return llm.ChatContext(prefix + [summary] + history)
+
+    def _fold(self, evicted: List[Any]):
+        for item in evicted:
+            self._evicted.add(item.id)
+            self._tokens.pop(item.id, None)
+            if item.type != "message" or item.role not in ("user", "assistant"):
+                continue
+            text = " ".join((item.text_content or "").split())
+            if item.role == "assistant":
+                # The caller's words carry the lead details; the agent's only need the gist
+                words = text.split(" ")
+                text = " ".join(words[:20]) + (" ..." if len(words) > 20 else "")
+            if text:
+                self.summary_lines.append(f"{'Caller' if item.role == 'user' else 'Agent'}: {text}")
+        # Over the cap, the agent's oldest lines go first, then the caller's
+        while len(self.summary_lines) > 1 and count_tokens("\n".join(self.summary_lines)) > self.summary_tokens:
+            agent_lines = [i for i, line in enumerate(self.summary_lines) if line.startswith("Agent:")]
+            self.summary_lines.pop(agent_lines[0] if agent_lines else 0)
+        self.stats["evicted_items"] += len(evicted)
+        self.stats["summaries"] += 1
+        logger.info(f"Folded {len(evicted)} chat items into the history summary")
+
+    def summary(self) -> Dict[str, Any]:
+        return dict(self.stats)
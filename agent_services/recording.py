@@ -0,0 +1,406 @@
+import os
+import time
+import struct
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple
+
+import numpy as np
+from livekit import rtc
+
+from backend.services.transcript_store import TranscriptStore
+from backend.services import storage
+
+# PyAV ships with livekit-agents; only needed for compressed formats
+try:
+    import av
+except ImportError:
+    av = None
+
+logger = logging.getLogger("outbound-agent")
+
+RECORDINGS_DIR = os.getenv("RECORDINGS_AUDIO_DIR", "recordings_audio")
+# Buffered audio is written (and the WAV header patched) once this much is pending
+FLUSH_SECONDS = float(os.getenv("RECORDING_FLUSH_SECONDS", "1.0"))
+
+# Output format: wav (raw PCM), flac (lossless) or opus (OGG/Opus, voice)
+RECORDING_FORMAT = os.getenv("RECORDING_FORMAT", "wav").lower()
+# Capture rate per track; set to 16000 to downsample (channel layout: RECORDING_CHANNELS)
+RECORDING_SAMPLE_RATE = int(os.getenv("RECORDING_SAMPLE_RATE", "48000"))
+OPUS_BITRATE = int(os.getenv("RECORDING_OPUS_BITRATE", "24000"))
+KEEP_WAV = os.getenv("RECORDING_KEEP_WAV", "false").lower() == "true"
+ENCODER_THREADS = int(os.getenv("RECORDING_ENCODER_THREADS", "2"))
+
+# Channel layout of the final file: stereo (caller left, agent right),
+# multichannel (one channel per track) or mono (everything mixed together)
+RECORDING_CHANNELS = os.getenv("RECORDING_CHANNELS", "stereo").lower()
+KEEP_TRACKS = os.getenv("RECORDING_KEEP_TRACKS", "false").lower() == "true"
+TRACKS_DIR = os.path.join(RECORDINGS_DIR, "tracks")
+# Arrival-time gaps longer than this are filled with silence
+GAP_TOLERANCE_SECONDS = 0.2
+MIXDOWN_BLOCK_SECONDS = 10
+WAV_HEADER_BYTES = 44
+
+CALLER = "caller"
+AGENT = "agent"
+
+# format -> (container, codec, file extension)
+CODECS = {
+    "flac": ("flac", "flac", ".flac"),
+    "opus": ("ogg", "libopus", ".ogg"),
+}
+
+# Encoding runs here so it never blocks the agent's event loop
+_encoder_pool = ThreadPoolExecutor(max_workers=ENCODER_THREADS, thread_name_prefix="recording-encoder")
+
+
+def encode_recording(wav_path: str, fmt: str) -> str:
+    """
+    Transcodes a finished WAV recording to FLAC or OGG/Opus and returns the new path.
+    Blocking; run it in the encoder pool.
+    """
+    container, codec, extension = CODECS[fmt]
+    out_path = os.path.splitext(wav_path)[0] + extension
+    with av.open(wav_path) as src, av.open(out_path, "w", format=container) as dst:
+        in_stream = src.streams.audio[0]
+        out_stream = dst.add_stream(codec, rate=in_stream.rate, layout=in_stream.layout.name)
+        if fmt == "opus":
+            out_stream.bit_rate = OPUS_BITRATE
+        for frame in src.decode(in_stream):
+            frame.pts = None
+            for packet in out_stream.encode(frame):
+                dst.mux(packet)
+        for packet in out_stream.encode(None):
+            dst.mux(packet)
+    return out_path
+
+
+class WavStreamWriter:
+    """
+    Incremental 16-bit PCM WAV writer. Samples are appended as they arrive and the
+    RIFF/data sizes in the header are patched on every flush, so the file on disk is
+    always a valid WAV up to the last flushed chunk (even if the worker crashes).
+    Memory use is bounded by the flush size, not the call length.
+    """
+    def __init__(self, path: str, sample_rate: int, num_channels: int = 1,
+                 flush_seconds: float = FLUSH_SECONDS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.flush_bytes = max(int(sample_rate * num_channels * 2 * flush_seconds), 1)
+        self.data_bytes = 0
+        self._pending = bytearray()
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        byte_rate = self.sample_rate * self.num_channels * 2
+        header = struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + self.data_bytes, b"WAVE",
+            b"fmt ", 16, 1, self.num_channels, self.sample_rate, byte_rate, self.num_channels * 2, 16,
+            b"data", self.data_bytes,
+        )
+        self._file.seek(0)
+        self._file.write(header)
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, pcm: bytes):
+        self._pending += pcm
+        if len(self._pending) >= self.flush_bytes:
+            self.flush()
+
+    def write_silence(self, num_samples: int):
+        """Appends silence in flush-sized chunks so long gaps don't allocate large buffers."""
+        remaining = num_samples * self.num_channels * 2
+        while remaining > 0:
+            chunk = min(remaining, self.flush_bytes)
+            self.write(bytes(chunk))
+            remaining -= chunk
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self._pending)
+            self.data_bytes += len(self._pending)
+            self._pending.clear()
+            self._write_header()
+        # Hand the chunk to the OS so it survives a process crash
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.data_bytes + len(self._pending)) / (self.sample_rate * self.num_channels * 2)
+
+
+def mixdown_tracks(tracks: List[Tuple[str, int]], out_path: str, num_channels: int,
+                   sample_rate: int) -> float:
+    """
+    Mixes time-aligned mono track WAVs into one interleaved WAV, where `tracks` maps each
+    track file to an output channel. Tracks sharing a channel are summed with clipping.
+    Works block by block over memory-mapped inputs, so memory stays constant.
+    Blocking; run it in the encoder pool. Returns the duration in seconds.
+    """
+    sources = []
+    for path, channel in tracks:
+        # A track that never received audio has no file
+        if os.path.exists(path) and os.path.getsize(path) > WAV_HEADER_BYTES:
+            sources.append((np.memmap(path, dtype="<i2", mode="r", offset=WAV_HEADER_BYTES), channel))
+    total = max((len(data) for data, _ in sources), default=0)
+
+    block = sample_rate * MIXDOWN_BLOCK_SECONDS
+    writer = WavStreamWriter(out_path, sample_rate, num_channels)
+    try:
+        for start in range(0, total, block):
+            end = min(total, start + block)
+            mix = np.zeros((end - start, num_channels), dtype=np.int32)
+            for data, channel in sources:
+                segment = data[start:end]
+                mix[:len(segment), channel] += segment
+            np.clip(mix, -32768, 32767, out=mix)
+            # Row-major (samples, channels) is the interleaved WAV layout
+            writer.write(mix.astype("<i2").tobytes())
+    finally:
+        writer.close()
+    return total / sample_rate
+
+
+class TrackRecorder:
+    """
+    Streams one audio track to its own mono WAV, aligned to the recording start.
+    Frames are placed by arrival time: leading silence covers the time before the track
+    appeared and gaps (mute, reconnects) are filled with silence.
+
+    Audio is buffered on the event loop and each flushed chunk (or silence gap) is queued
+    to a single writer task, which creates the file and writes it on the storage pool.
+    """
+    def __init__(self, path: str, side: str, identity: str, sample_rate: int, started_at: float):
+        self.path = path
+        self.side = side
+        self.identity = identity
+        self.sample_rate = sample_rate
+        self.started_at = started_at
+        self.samples_written = 0
+        self.gap_tolerance = int(GAP_TOLERANCE_SECONDS * sample_rate)
+        self.flush_bytes = max(int(sample_rate * 2 * FLUSH_SECONDS), 1)
+        self.writer: Optional[WavStreamWriter] = None
+        self._pending = bytearray()
+        # PCM chunks, silence gaps (sample counts) and None to finish
+        self._queue: "asyncio.Queue[Optional[bytes | int]]" = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    def write_frame(self, pcm: bytes):
+        num_samples = len(pcm) // 2
+        # Position of the first sample of this frame on the recording timeline
+        position = int((time.monotonic() - self.started_at) * self.sample_rate) - num_samples
+        if position - self.samples_written > self.gap_tolerance:
+            self._flush_pending()
+            self._queue.put_nowait(position - self.samples_written)
+            self.samples_written = position
+        self._pending += pcm
+        self.samples_written += num_samples
+        if len(self._pending) >= self.flush_bytes:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if self._pending:
+            self._queue.put_nowait(bytes(self._pending))
+            self._pending.clear()
+
+    def _append(self, items: List):
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.writer = WavStreamWriter(self.path, self.sample_rate)
+        for item in items:
+            if isinstance(item, int):
+                self.writer.write_silence(item)
+            else:
+                self.writer.write(item)
+        self.writer.flush()
+
+    async def _write_loop(self):
+        done = False
+        while not done:
+            items = [await self._queue.get()]
+            # Batch whatever else queued up while the last write was in flight
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            if None in items:
+                items = items[:items.index(None)]
+                done = True
+            if items:
+                try:
+                    await storage.run_io(self._append, items)
+                except Exception as e:
+                    logger.error(f"Failed to write recording track {self.path}: {e}")
+
+    async def close(self):
+        """Writes what is still buffered and closes the track file."""
+        if self._writer_task:
+            self._flush_pending()
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+        if self.writer is not None:
+            await storage.run_io(self.writer.close)
+
+
+class AudioRecorder:
+    """
+    Records every audio track in the call (caller tracks and the agent's own TTS output).
+    Each track streams to its own time-aligned WAV under recordings_audio/tracks/ while the
+    call runs; at the end they are mixed down into recordings_audio/user_{job_id}_{unix_ts}.wav
+    (stereo caller/agent by default) and optionally transcoded, all off the event loop.
+    """
+    def __init__(self, room: rtc.Room, job_id: str, phone_number: Optional[str] = None,
+                 sample_rate: int = RECORDING_SAMPLE_RATE, output_format: str = RECORDING_FORMAT,
+                 channels: str = RECORDING_CHANNELS):
+        self.room = room
+        self.job_id = job_id
+        self.phone_number = phone_number
+        self.sample_rate = sample_rate
+        self.output_format = output_format
+        self.channels = channels
+        self.recording = True
+        self.started_at = time.monotonic()
+        self.filename = os.path.join(
+            RECORDINGS_DIR, f"user_{job_id}_{int(datetime.now().timestamp())}.wav"
+        )
+        self.tracks: Dict[str, TrackRecorder] = {}
+        self.tasks = set()
+
+    async def start(self):
+        self.started_at = time.monotonic()
+        self.room.on("track_subscribed", self._on_track_subscribed)
+        self.room.on("local_track_published", self._on_local_track_published)
+
+        # Tracks that already exist when recording starts
+        for participant in self.room.remote_participants.values():
+            for publication in participant.track_publications.values():
+                if publication.track:
+                    self._on_track_subscribed(publication.track, publication, participant)
+        for publication in self.room.local_participant.track_publications.values():
+            if publication.track:
+                self._on_local_track_published(publication, publication.track)
+
+    def _on_track_subscribed(self, track: rtc.Track, publication, participant: rtc.RemoteParticipant):
+        if track.kind == rtc.TrackKind.KIND_AUDIO:
+            logger.info(f"Recording caller audio: {participant.identity}")
+            self._add_track(track, CALLER, participant.identity)
+
+    def _on_local_track_published(self, publication, track: rtc.Track):
+        if track.kind == rtc.TrackKind.KIND_AUDIO:
+            logger.info("Recording agent audio")
+            self._add_track(track, AGENT, self.room.local_participant.identity)
+
+    def _add_track(self, track: rtc.Track, side: str, identity: str):
+        if not self.recording or track.sid in self.tracks:
+            return
+        safe_identity = "".join(c for c in identity if c.isalnum() or c in ("-", "_"))
+        path = os.path.join(TRACKS_DIR, f"{self.job_id}_{side}_{safe_identity}_{track.sid}.wav")
+        recorder = TrackRecorder(path, side, identity, self.sample_rate, self.started_at)
+        recorder.start()
+        self.tracks[track.sid] = recorder
+
+        task = asyncio.create_task(self._capture_audio(track, recorder))
+        self.tasks.add(task)
+        task.add_done_callback(lambda done: self._capture_done(done, recorder))
+
+    def _capture_done(self, task: asyncio.Task, recorder: TrackRecorder):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Recording of {recorder.side} track {recorder.path} stopped: {task.exception()!r}")
+
+    async def _capture_audio(self, track: rtc.Track, recorder: TrackRecorder):
+        # AudioStream resamples every track to the recorder's fixed mono format
+        stream = rtc.AudioStream(track, sample_rate=self.sample_rate, num_channels=1)
+        try:
+            async for event in stream:
+                if not self.recording:
+                    break
+                recorder.write_frame(bytes(event.frame.data))
+        finally:
+            await stream.aclose()
+
+    def _channel_map(self) -> Tuple[List[Tuple[str, int]], int]:
+        """Assigns each track file to an output channel for the configured layout."""
+        tracks = list(self.tracks.values())
+        if self.channels == "multichannel":
+            return [(t.path, i) for i, t in enumerate(tracks)], max(len(tracks), 1)
+        if self.channels == "mono":
+            return [(t.path, 0) for t in tracks], 1
+        return [(t.path, 0 if t.side == CALLER else 1) for t in tracks], 2
+
+    async def stop_and_save(self):
+        self.recording = False
+        self.room.off("track_subscribed", self._on_track_subscribed)
+        self.room.off("local_track_published", self._on_local_track_published)
+        for task in list(self.tasks):
+            task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        for track in self.tracks.values():
+            await track.close()
+        if not any(t.samples_written for t in self.tracks.values()):
+            logger.warning("No audio frames captured for this call.")
+            await storage.run_io(self._remove_tracks)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+            tracks, num_channels = self._channel_map()
+            duration = await loop.run_in_executor(
+                _encoder_pool, mixdown_tracks, tracks, self.filename, num_channels, self.sample_rate
+            )
+            filename = await self._encode(self.filename)
+            logger.info(f"✅ Saved call audio ({num_channels} ch) to: {filename}")
+            size_bytes = await storage.run_io(os.path.getsize, filename)
+            await storage.run_io(
+                TranscriptStore.save_recording,
+                os.path.basename(filename), self.job_id, size_bytes,
+                phone_number=self.phone_number,
+                duration_seconds=round(duration, 1),
+            )
+            await storage.run_io(self._remove_tracks)
+        except Exception as e:
+            logger.error(f"Failed to finalize recording (track files kept in {TRACKS_DIR}): {e}")
+
+    def _remove_tracks(self):
+        if KEEP_TRACKS:
+            return
+        for track in self.tracks.values():
+            try:
+                os.remove(track.path)
+            except OSError:
+                pass
+
+    async def _encode(self, wav_path: str) -> str:
+        """Returns the path of the final recording (the WAV itself if no codec applies)."""
+        if self.output_format not in CODECS:
+            return wav_path
+        if av is None:
+            logger.warning(f"PyAV not installed, keeping {self.output_format} recording as WAV.")
+            return wav_path
+
+        loop = asyncio.get_running_loop()
+        try:
+            out_path = await loop.run_in_executor(_encoder_pool, encode_recording, wav_path, self.output_format)
+        except Exception as e:
+            logger.error(f"Failed to encode recording as {self.output_format}, keeping WAV: {e}")
+            return wav_path
+
+        if not KEEP_WAV:
+            await storage.run_io(os.remove, wav_path)
+        return out_path
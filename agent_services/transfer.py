@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from livekit import api, rtc
+
+logger = logging.getLogger("outbound-agent")
+
+# Departments the agent can transfer to, as "name=number" pairs separated by commas,
+# e.g. "sales=+911234567890,support=sip:helpdesk@pbx.example.com"
+TRANSFER_DIRECTORY = os.getenv("TRANSFER_DIRECTORY", "")
+# Seconds to wait for LiveKit to accept one transfer attempt
+TRANSFER_TIMEOUT_SECONDS = float(os.getenv("TRANSFER_TIMEOUT_SECONDS", "10"))
+# Extra attempts after a timeout or server error (client errors are not retried)
+TRANSFER_RETRIES = int(os.getenv("TRANSFER_RETRIES", "2"))
+TRANSFER_RETRY_BACKOFF_MS = float(os.getenv("TRANSFER_RETRY_BACKOFF_MS", "500"))
+
+DEFAULT_DEPARTMENT = "default"
+
+_PHONE_RE = re.compile(r"^\+?\d{6,15}$")
+_SIP_RE = re.compile(r"^sip:[^@\s]+@[A-Za-z0-9.\-]+(:\d+)?(;[^\s]*)?$")
+
+
+@lru_cache(maxsize=256)
+def normalize_destination(destination: str, sip_domain: Optional[str] = None) -> str:
+    """
+    Turns a phone number or SIP address into the URI LiveKit transfers to: sip:<number>@<domain>
+    when a SIP domain is configured, tel:<number> otherwise. Raises ValueError if it is
+    neither a valid number nor a valid SIP URI.
+    """
+    value = destination.strip()
+    if "@" in value:
+        uri = value if value.startswith("sip:") else f"sip:{value}"
+        if not _SIP_RE.match(uri):
+            raise ValueError(f"invalid SIP address '{destination}'")
+        return uri
+
+    number = re.sub(r"[\s\-().]", "", value.replace("tel:", "").replace("sip:", ""))
+    if not _PHONE_RE.match(number):
+        raise ValueError(f"invalid phone number '{destination}'")
+    return f"sip:{number}@{sip_domain}" if sip_domain else f"tel:{number}"
+
+
+class TransferDirectory:
+    """
+    Department -> transfer URI map, validated and normalized once when the worker starts so
+    a transfer mid-call is a dictionary lookup. Invalid entries are logged and skipped.
+    """
+    def __init__(self, entries: Dict[str, str], sip_domain: Optional[str] = None):
+        self.sip_domain = sip_domain
+        self.uris: Dict[str, str] = {}
+        for department, destination in entries.items():
+            try:
+                self.uris[department.strip().lower()] = normalize_destination(destination, sip_domain)
+            except ValueError as e:
+                logger.error(f"Ignoring transfer destination for '{department}': {e}")
+
+    @classmethod
+    def from_env(cls, default_number: Optional[str], sip_domain: Optional[str] = None) -> "TransferDirectory":
+        entries: Dict[str, str] = {}
+        if default_number:
+            entries[DEFAULT_DEPARTMENT] = default_number
+        for pair in TRANSFER_DIRECTORY.split(","):
+            if not pair.strip():
+                continue
+            department, sep, destination = pair.partition("=")
+            if not sep or not department.strip() or not destination.strip():
+                logger.error(f"Ignoring malformed TRANSFER_DIRECTORY entry '{pair.strip()}'")
+                continue
+            entries[department] = destination
+        directory = cls(entries, sip_domain)
+        logger.info(f"Transfer directory: {directory.uris or 'empty'}")
+        return directory
+
+    @property
+    def departments(self) -> List[str]:
+        return [d for d in self.uris if d != DEFAULT_DEPARTMENT]
+
+    def resolve(self, destination: Optional[str]) -> str:
+        """Department name, phone number or SIP address (None = default) -> transfer URI."""
+        if not destination or not destination.strip():
+            if DEFAULT_DEPARTMENT not in self.uris:
+                raise ValueError("no default transfer number configured")
+            return self.uris[DEFAULT_DEPARTMENT]
+        uri = self.uris.get(destination.strip().lower())
+        if uri:
+            return uri
+        return normalize_destination(destination, self.sip_domain)
+
+
+class ParticipantIndex:
+    """Remote participants of the room by identity, kept current from join/leave events."""
+    def __init__(self, room: rtc.Room, expected_identity: Optional[str] = None):
+        self.expected_identity = expected_identity
+        self.participants: Dict[str, rtc.RemoteParticipant] = dict(room.remote_participants)
+        room.on("participant_connected", self._on_connected)
+        room.on("participant_disconnected", self._on_disconnected)
+
+    def _on_connected(self, participant: rtc.RemoteParticipant):
+        self.participants[participant.identity] = participant
+
+    def _on_disconnected(self, participant: rtc.RemoteParticipant):
+        self.participants.pop(participant.identity, None)
+
+    def caller_identity(self) -> Optional[str]:
+        """The dialled participant for outbound calls, otherwise the first SIP participant."""
+        if self.expected_identity in self.participants:
+            return self.expected_identity
+        for identity, participant in self.participants.items():
+            if participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP:
+                return identity
+        # Not joined (yet); LiveKit reports it if the identity is wrong
+        return self.expected_identity or next(iter(self.participants), None)
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, api.TwirpError):
+        return error.status >= 500
+    return True
+
+
+async def transfer_participant(lkapi: api.LiveKitAPI, room_name: str, identity: str, uri: str) -> Dict[str, Any]:
+    """
+    Runs a SIP transfer with a per-attempt timeout and retries. Returns a record of the
+    attempt (outcome, attempts, latency) for the call's metrics; never raises.
+    """
+    record: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(),
+        "participant_identity": identity,
+        "transfer_to": uri,
+        "attempts": 0,
+        "ok": False,
+    }
+    started = time.perf_counter()
+    for attempt in range(TRANSFER_RETRIES + 1):
+        record["attempts"] = attempt + 1
+        try:
+            await asyncio.wait_for(
+                lkapi.sip.transfer_sip_participant(
+                    api.TransferSIPParticipantRequest(
+                        room_name=room_name,
+                        participant_identity=identity,
+                        transfer_to=uri,
+                        play_dialtone=False,
+                    )
+                ),
+                TRANSFER_TIMEOUT_SECONDS,
+            )
+            record["ok"] = True
+            record.pop("error", None)
+            break
+        except Exception as e:
+            record["error"] = f"timed out after {TRANSFER_TIMEOUT_SECONDS:g}s" \
+                if isinstance(e, asyncio.TimeoutError) else str(e)
+            logger.warning(f"Transfer attempt {attempt + 1} to {uri} failed: {record['error']}")
+            if not _retryable(e) or attempt == TRANSFER_RETRIES:
+                break
+            await asyncio.sleep(TRANSFER_RETRY_BACKOFF_MS * 2**attempt / 1000)
+
+    record["latency_ms"] = round((time.perf_counter() - started) * 1000)
+    log = logger.info if record["ok"] else logger.error
+    log(f"Transfer of {identity} to {uri}: {'ok' if record['ok'] else 'failed'} "
+        f"after {record['attempts']} attempt(s), {record['latency_ms']} ms")
+    return record
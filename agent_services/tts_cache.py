@@ -0,0 +1,212 @@
+import io
+import os
+import wave
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+from livekit import rtc
+from livekit.agents import tts
+
+from backend.services import storage
+
+logger = logging.getLogger("outbound-agent")
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+# Rendered phrases shared by every worker on the host (one WAV per phrase)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+# In-memory tier per job process; least recently used phrases are dropped beyond this
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "32"))
+
+FRAME_MS = 20
+
+# (pcm s16le, sample_rate, num_channels)
+CachedAudio = Tuple[bytes, int, int]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class PhraseCache:
+    """
+    Content-addressed cache of pre-rendered TTS audio for the agent's fixed lines.
+
+    Entries are keyed by (provider, model, voice, text), so changing the voice or model
+    never replays stale audio. Lookups go to an in-memory LRU first, then to the WAV files
+    in TTS_CACHE_DIR. Only exact (whitespace-normalized) matches of the configured phrases
+    are served; everything else is synthesized as usual.
+    """
+    def __init__(self, provider: str, model: str, voice: str, phrases: Iterable[str]):
+        self.provider = provider
+        self.model = model
+        self.voice = voice
+        self.phrases = {normalize(p) for p in phrases}
+        self._memory: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._memory_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0}
+
+    # --- Storage tiers ---
+
+    def key(self, text: str) -> str:
+        raw = "\n".join((self.provider, self.model, self.voice, normalize(text)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _path(key: str) -> str:
+        return os.path.join(TTS_CACHE_DIR, f"{key}.wav")
+
+    def _remember(self, key: str, audio: CachedAudio):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key)[0])
+        self._memory[key] = audio
+        self._memory_bytes += len(audio[0])
+        limit = TTS_CACHE_MEMORY_MB * 2**20
+        while self._memory_bytes > limit and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted[0])
+
+    @classmethod
+    def _read_disk(cls, key: str) -> Optional[CachedAudio]:
+        try:
+            with wave.open(cls._path(key), "rb") as f:
+                return f.readframes(f.getnframes()), f.getframerate(), f.getnchannels()
+        except FileNotFoundError:
+            return None
+        except (wave.Error, EOFError) as e:
+            logger.warning(f"Ignoring unreadable TTS cache entry {key}: {e}")
+            return None
+
+    @classmethod
+    def _write_disk(cls, key: str, audio: CachedAudio):
+        pcm, sample_rate, num_channels = audio
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as f:
+            f.setnchannels(num_channels)
+            f.setsampwidth(2)
+            f.setframerate(sample_rate)
+            f.writeframes(pcm)
+        storage.atomic_write_bytes(cls._path(key), buf.getvalue())
+
+    def load_disk(self) -> int:
+        """Loads every phrase already on disk into memory. Blocking; called from prewarm."""
+        loaded = 0
+        for phrase in self.phrases:
+            key = self.key(phrase)
+            audio = self._read_disk(key)
+            if audio:
+                self._remember(key, audio)
+                loaded += 1
+        return loaded
+
+    async def get(self, text: str) -> Optional[CachedAudio]:
+        key = self.key(text)
+        audio = self._memory.get(key)
+        if audio:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return audio
+        audio = await storage.run_io(self._read_disk, key)
+        if audio:
+            self._remember(key, audio)
+            self.stats["disk_hits"] += 1
+            return audio
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, text: str, audio: CachedAudio):
+        key = self.key(text)
+        self._remember(key, audio)
+        await storage.run_io(self._write_disk, key, audio)
+        self.stats["stored"] += 1
+
+    # --- Rendering ---
+
+    async def warm(self, tts_plugin: tts.TTS):
+        """Renders any configured phrase that is not cached yet (run in the background)."""
+        for phrase in self.phrases:
+            key = self.key(phrase)
+            if key in self._memory:
+                continue
+            audio = await storage.run_io(self._read_disk, key)
+            if audio:
+                self._remember(key, audio)
+                continue
+            try:
+                frames = [ev.frame async for ev in tts_plugin.synthesize(phrase)]
+            except Exception as e:
+                logger.warning(f"Could not pre-render TTS phrase '{phrase[:40]}...': {e}")
+                continue
+            if frames:
+                await self.put(phrase, self._join(frames))
+                logger.info(f"Pre-rendered TTS phrase '{phrase[:40]}...'")
+
+    @staticmethod
+    def _join(frames: Iterable[rtc.AudioFrame]) -> CachedAudio:
+        frames = list(frames)
+        pcm = b"".join(bytes(f.data) for f in frames)
+        return pcm, frames[0].sample_rate, frames[0].num_channels
+
+    @staticmethod
+    async def frames(audio: CachedAudio) -> AsyncIterator[rtc.AudioFrame]:
+        pcm, sample_rate, num_channels = audio
+        samples = sample_rate * FRAME_MS // 1000
+        step = samples * num_channels * 2
+        for offset in range(0, len(pcm), step):
+            chunk = pcm[offset:offset + step]
+            yield rtc.AudioFrame(chunk, sample_rate, num_channels, len(chunk) // (2 * num_channels))
+
+    # --- Agent pipeline ---
+
+    def _could_match(self, text: str) -> bool:
+        text = normalize(text)
+        return any(p.startswith(text) for p in self.phrases)
+
+    async def tts_node(self, text: AsyncIterable[str],
+                       synthesize: Callable[[AsyncIterable[str]], AsyncIterable[rtc.AudioFrame]]
+                       ) -> AsyncIterator[rtc.AudioFrame]:
+        """
+        Wraps an Agent.tts_node. Text is held back only while it is still a prefix of a
+        cached phrase; as soon as it diverges it streams to `synthesize` unchanged. A reply
+        that turns out to be an exact phrase is played from the cache, or synthesized and
+        stored on a miss.
+        """
+        chunks = text.__aiter__()
+        buffered = ""
+        complete = True
+        async for chunk in chunks:
+            buffered += chunk
+            if not self._could_match(buffered):
+                complete = False
+                break
+
+        if complete and normalize(buffered) in self.phrases:
+            audio = await self.get(buffered)
+            if audio:
+                async for frame in self.frames(audio):
+                    yield frame
+                return
+            rendered = []
+            async for frame in synthesize(self._replay(buffered, None)):
+                rendered.append(frame)
+                yield frame
+            if rendered:
+                await self.put(buffered, self._join(rendered))
+            return
+
+        async for frame in synthesize(self._replay(buffered, None if complete else chunks)):
+            yield frame
+
+    @staticmethod
+    async def _replay(buffered: str, rest: Optional[AsyncIterator[str]]) -> AsyncIterator[str]:
+        if buffered:
+            yield buffered
+        if rest is not None:
+            async for chunk in rest:
+                yield chunk
+
+    def summary(self) -> Dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {**self.stats, "hit_rate": round(hits / lookups, 3) if lookups else None}
@@ -0,0 +1,104 @@
+import time
+from typing import Dict, List, Optional, Any
+
+from livekit.agents import metrics
+
+# Per-turn stages, in pipeline order (all in milliseconds)
+STAGES = ("eou_delay_ms", "stt_final_ms", "llm_ttft_ms", "tts_ttfb_ms", "turn_latency_ms", "perceived_latency_ms")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class TurnMetricsCollector:
+    """
+    Collects per-turn voice latency for one call from AgentSession events.
+
+    Component timings come from `metrics_collected` and are grouped by speech_id:
+    end-of-utterance delay (VAD end of speech -> turn committed), STT final transcript delay,
+    LLM time-to-first-token and TTS time-to-first-byte. `turn_latency_ms` is
+    eou + ttft + ttfb. `perceived_latency_ms` is measured from the user's end of speech to
+    the agent actually starting playout (user/agent state changes), so it includes playout.
+    """
+    def __init__(self, provider_key: str):
+        self.provider_key = provider_key
+        self._turns: Dict[str, Dict[str, Any]] = {}
+        self._order: List[str] = []
+        self._user_stopped_at: Optional[float] = None
+        self._perceived: List[float] = []
+        self.llm_prompt_tokens = 0
+        self.llm_completion_tokens = 0
+
+    def attach(self, session):
+        session.on("metrics_collected", self.on_metrics_collected)
+        session.on("user_state_changed", self.on_user_state_changed)
+        session.on("agent_state_changed", self.on_agent_state_changed)
+
+    def _turn(self, speech_id: str) -> Dict[str, Any]:
+        if speech_id not in self._turns:
+            self._turns[speech_id] = {"speech_id": speech_id, "timestamp": time.time()}
+            self._order.append(speech_id)
+        return self._turns[speech_id]
+
+    def on_metrics_collected(self, ev):
+        m = ev.metrics
+        speech_id = getattr(m, "speech_id", None)
+        if isinstance(m, metrics.LLMMetrics):
+            self.llm_prompt_tokens += m.prompt_tokens
+            self.llm_completion_tokens += m.completion_tokens
+        if not speech_id:
+            return
+
+        turn = self._turn(speech_id)
+        if isinstance(m, metrics.EOUMetrics):
+            turn["eou_delay_ms"] = round(m.end_of_utterance_delay * 1000)
+            turn["stt_final_ms"] = round(m.transcription_delay * 1000)
+        elif isinstance(m, metrics.LLMMetrics) and "llm_ttft_ms" not in turn:
+            turn["llm_ttft_ms"] = round(m.ttft * 1000)
+        elif isinstance(m, metrics.TTSMetrics) and "tts_ttfb_ms" not in turn:
+            turn["tts_ttfb_ms"] = round(m.ttfb * 1000)
+
+        if "turn_latency_ms" not in turn and all(k in turn for k in ("eou_delay_ms", "llm_ttft_ms", "tts_ttfb_ms")):
+            turn["turn_latency_ms"] = turn["eou_delay_ms"] + turn["llm_ttft_ms"] + turn["tts_ttfb_ms"]
+
+    def on_user_state_changed(self, ev):
+        if ev.old_state == "speaking" and ev.new_state == "listening":
+            self._user_stopped_at = time.perf_counter()
+
+    def on_agent_state_changed(self, ev):
+        if ev.new_state == "speaking" and self._user_stopped_at is not None:
+            self._perceived.append(round((time.perf_counter() - self._user_stopped_at) * 1000))
+            self._user_stopped_at = None
+
+    def turns(self) -> List[Dict[str, Any]]:
+        """Turns in order, with the measured perceived latency attached where known."""
+        turns = [dict(self._turns[sid]) for sid in self._order]
+        # One perceived latency is measured per user turn, in the order the user turns happen
+        user_turns = [t for t in turns if "eou_delay_ms" in t]
+        for turn, perceived in zip(user_turns, self._perceived):
+            turn["perceived_latency_ms"] = perceived
+        return turns
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-call aggregates stored alongside the transcript."""
+        turns = self.turns()
+        summary: Dict[str, Any] = {
+            "provider_key": self.provider_key,
+            "turn_count": len(turns),
+            "llm_prompt_tokens": self.llm_prompt_tokens,
+            "llm_completion_tokens": self.llm_completion_tokens,
+        }
+        for stage in STAGES:
+            values = [t[stage] for t in turns if stage in t]
+            if values:
+                summary[stage] = {
+                    "avg": round(sum(values) / len(values)),
+                    "p50": _percentile(values, 50),
+                    "p95": _percentile(values, 95),
+                    "max": max(values),
+                }
+        return summary
@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import psutil
+from livekit.agents import JobRequest
+
+logger = logging.getLogger("outbound-agent")
+
+# Talking calls (with an STT/LLM/TTS pipeline) one worker process accepts before it refuses new ones
+MAX_JOBS_PER_WORKER = int(os.getenv("AGENT_MAX_JOBS", "6"))
+# A call that is still ringing or being screened holds no pipeline and counts as this
+# fraction of a talking call
+RINGING_JOB_WEIGHT = float(os.getenv("AGENT_RINGING_JOB_WEIGHT", "0.25"))
+# Job processes mark the calls holding a pipeline here (one empty file per job), since
+# jobs run in their own processes and the worker cannot see their state otherwise
+PIPELINE_STATE_DIR = os.getenv("AGENT_PIPELINE_STATE_DIR", os.path.join(tempfile.gettempdir(), "agent_pipelines"))
+# Host CPU / memory utilization (0-1) above which new jobs are rejected to protect live audio
+CPU_LIMIT = float(os.getenv("AGENT_CPU_LIMIT", "0.85"))
+MEMORY_LIMIT = float(os.getenv("AGENT_MEMORY_LIMIT", "0.9"))
+# Reported load above which LiveKit stops offering jobs to this worker
+LOAD_THRESHOLD = float(os.getenv("AGENT_LOAD_THRESHOLD", "0.8"))
+
+SAMPLE_INTERVAL_SECONDS = 0.5
+SMOOTHING = 0.3  # weight of the newest sample in the moving average
+
+
+class WorkerLoad:
+    """
+    Load reporting and admission for one agent worker.
+
+    The load sent to LiveKit is the most constrained of: active jobs vs MAX_JOBS_PER_WORKER
+    (ringing jobs weighted by RINGING_JOB_WEIGHT), host CPU vs CPU_LIMIT and memory vs
+    MEMORY_LIMIT. LiveKit offers jobs to the least
+    loaded worker and stops offering to workers above LOAD_THRESHOLD; request() is the hard
+    limit that rejects a job offer when the worker is already full, so LiveKit retries it on
+    another worker.
+    """
+    _server = None
+    _cpu: Optional[float] = None
+    _sampler: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _sample_loop(cls):
+        psutil.cpu_percent(interval=None)
+        while True:
+            sample = psutil.cpu_percent(interval=SAMPLE_INTERVAL_SECONDS) / 100
+            cls._cpu = sample if cls._cpu is None else SMOOTHING * sample + (1 - SMOOTHING) * cls._cpu
+
+    @classmethod
+    def _ensure_sampler(cls):
+        if cls._sampler is None:
+            with cls._lock:
+                if cls._sampler is None:
+                    cls._sampler = threading.Thread(target=cls._sample_loop, daemon=True, name="agent_load_sampler")
+                    cls._sampler.start()
+
+    @classmethod
+    def active_jobs(cls) -> int:
+        return len(cls._server.active_jobs) if cls._server is not None else 0
+
+    @classmethod
+    def pipeline_jobs(cls) -> int:
+        """Active jobs of this worker that hold a pipeline (stale markers are ignored)."""
+        if cls._server is None:
+            return 0
+        try:
+            marked = set(os.listdir(PIPELINE_STATE_DIR))
+        except FileNotFoundError:
+            return 0
+        return sum(1 for job in cls._server.active_jobs if job.job.id in marked)
+
+    @classmethod
+    def weighted_jobs(cls) -> float:
+        talking = cls.pipeline_jobs()
+        return talking + (cls.active_jobs() - talking) * RINGING_JOB_WEIGHT
+
+    @classmethod
+    def utilization(cls) -> dict:
+        cls._ensure_sampler()
+        return {
+            "jobs": cls.weighted_jobs() / max(MAX_JOBS_PER_WORKER, 1),
+            "cpu": (cls._cpu or 0.0) / CPU_LIMIT,
+            "memory": psutil.virtual_memory().percent / 100 / MEMORY_LIMIT,
+        }
+
+    @classmethod
+    def load(cls, server) -> float:
+        """load_fnc for WorkerOptions; called by the worker every ~0.5 s."""
+        cls._server = server
+        return min(1.0, max(cls.utilization().values()))
+
+    @classmethod
+    async def request(cls, req: JobRequest):
+        """request_fnc for WorkerOptions: accept unless the worker is at capacity."""
+        utilization = cls.utilization()
+        saturated = {name: round(value, 2) for name, value in utilization.items() if value >= 1.0}
+        if saturated:
+            logger.warning(f"Rejecting job {req.id}: worker at capacity {saturated} "
+                           f"(active jobs {cls.active_jobs()}, {cls.pipeline_jobs()} talking, "
+                           f"max {MAX_JOBS_PER_WORKER})")
+            await req.reject()
+            return
+        await req.accept()
+
+
+class CallResources:
+    """
+    Where one call's time went: ringing, then holding the STT/LLM/TTS pipeline. The
+    pipeline is only taken once a person answers, so every second of the job spent without
+    it (ringing, failed dials, answering machine screening) is saved compared to starting
+    the session at job accept. While the pipeline is held the job is marked in
+    PIPELINE_STATE_DIR for WorkerLoad.
+    """
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.monotonic()
+        self.ring_started_at: Optional[float] = None
+        self.ring_seconds: Optional[float] = None
+        self.pipeline_at: Optional[float] = None
+        self.pipeline_start_ms: Optional[int] = None
+        self.ended_at: Optional[float] = None
+
+    def _marker(self) -> str:
+        return os.path.join(PIPELINE_STATE_DIR, "".join(c for c in self.job_id if c.isalnum() or c in "-_"))
+
+    def dialing(self):
+        self.ring_started_at = time.monotonic()
+
+    def dial_ended(self):
+        if self.ring_started_at is not None:
+            self.ring_seconds = time.monotonic() - self.ring_started_at
+
+    def pipeline_started(self, started_at: float):
+        """The pipeline is held from `started_at` (monotonic) until release()."""
+        self.pipeline_at = started_at
+        self.pipeline_start_ms = round((time.monotonic() - started_at) * 1000)
+        try:
+            os.makedirs(PIPELINE_STATE_DIR, exist_ok=True)
+            open(self._marker(), "w").close()
+        except OSError as e:
+            logger.warning(f"Could not mark pipeline for job {self.job_id}: {e}")
+
+    def release(self):
+        if self.ended_at is not None:
+            return
+        self.ended_at = time.monotonic()
+        if self.pipeline_at is not None:
+            try:
+                os.remove(self._marker())
+            except OSError:
+                pass
+
+    def summary(self) -> Dict:
+        ended_at = self.ended_at or time.monotonic()
+        job_seconds = ended_at - self.started_at
+        pipeline_seconds = ended_at - self.pipeline_at if self.pipeline_at is not None else 0.0
+        return {
+            "job_seconds": round(job_seconds, 2),
+            "ring_seconds": round(self.ring_seconds, 2) if self.ring_seconds is not None else None,
+            "pipeline_seconds": round(pipeline_seconds, 2),
+            # Pipeline-seconds an eager start at job accept would have used on top
+            "saved_seconds": round(job_seconds - pipeline_seconds, 2),
+            "pipeline_start_ms": self.pipeline_start_ms,
+        }
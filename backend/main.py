@@ -1,11 +1,9 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-import pandas as pd
-import io
-import shutil
+import tempfile
 import os
 import aiofiles
 from fastapi.staticfiles import StaticFiles
@@ -22,13 +20,36 @@ AGENT_AVAILABLE = False
 
 # Import our service logic
 from backend.services.call_manager import CallManager
+from backend.services.campaign_manager import CampaignManager
+from backend.services.livekit_client import LiveKitClient
+from backend.services.media import RangeFileResponse
+from backend.services.metrics import LatencyMetrics
+from backend.services.lead_lists import LeadListStore
+from backend.services import storage
+from backend.services.call_status import CallStatusTracker
+from backend.services.dial_scheduler import DialScheduler
+from backend.services.trunk_admission import TrunkAdmission
+from backend.services.call_analytics import CallAnalytics
+from backend.services.events import EventBroker, format_sse
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     print("INFO: API Backend Started. Ensure 'python agent.py dev' is running for call handling.")
+    if LiveKitClient.is_configured():
+        await LiveKitClient.start()
+    CallStatusTracker.add_listener(CallManager.call_finished)
+    await CallStatusTracker.start()
+    await DialScheduler.start(CallManager.dispatch_call)
+    await CallAnalytics.start()
     yield
-    # Shutdown logic if needed
+    # Shutdown logic: stop any campaigns still dispatching, then release pooled connections
+    await DialScheduler.stop()
+    await CallAnalytics.stop()
+    await CampaignManager.shutdown()
+    await LiveKitClient.close()
+    await CallStatusTracker.stop()
+    storage.shutdown()
 
 app = FastAPI(title="Mansa Infotech AI Calling Platform API", lifespan=lifespan)
 
@@ -47,7 +68,19 @@ class SingleCallRequest(BaseModel):
     phone_number: str
 
 class BulkCallRequest(BaseModel):
-    phone_numbers: List[str]
+    phone_numbers: Optional[List[str]] = None
+    lead_list_id: Optional[str] = None  # List stored by /api/upload-excel (takes precedence)
+    concurrency: Optional[int] = None  # Max calls dispatched in parallel
+    calls_per_second: Optional[float] = None  # Dispatch rate limit
+
+class ReprocessRequest(BaseModel):
+    job_ids: Optional[List[str]] = None  # Default: every call in the date range
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    force: bool = False  # Re-extract even when the stored result is current
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+SSE_KEEPALIVE_SECONDS = 15
 
 # --- Endpoints ---
 
@@ -59,48 +92,33 @@ def read_root():
 @app.post("/api/upload-excel")
 async def upload_excel(file: UploadFile = File(...)):
     """
-    Parses an uploaded Excel/CSV file and extracts phone numbers.
-    Returns a list of valid phone numbers found in columns like 'phone', 'mobile', 'contact', etc.
+    Parses an uploaded Excel/CSV lead sheet and stores the normalized (E.164, deduplicated)
+    numbers server-side. Returns the `lead_list_id` to start a campaign with, a preview,
+    and duplicate/invalid row counts.
     """
-    if not file.filename.endswith(('.xlsx', '.csv')):
+    filename = file.filename or ""
+    if not filename.lower().endswith(('.xlsx', '.csv')):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload .xlsx or .csv")
 
-    contents = await file.read()
-    
+    # Spool the upload to disk in chunks instead of holding it in memory
+    fd, spool_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1].lower())
+    os.close(fd)
     try:
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        else:
-            df = pd.read_excel(io.BytesIO(contents))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Could not parse file: {str(e)}")
-
-    # Try to find a phone number column
-    possible_columns = ['phone', 'mobile', 'cell', 'contact', 'number', 'phone_number', 'phonenumber']
-    phone_col = None
-    
-    # Case-insensitive match
-    for col in df.columns:
-        if col.lower() in possible_columns:
-            phone_col = col
-            break
-            
-    if not phone_col:
-        # Fallback: check if any column looks like phone numbers (regex or simple check)
-        # For simplicity, if no obvious column, take the first column
-        phone_col = df.columns[0]
-    
-    # Extract and clean numbers
-    numbers = df[phone_col].astype(str).tolist()
-    cleaned_numbers = []
-    for num in numbers:
-        num = num.strip()
-        if not num: continue
-        # Basic cleanup: remove spaces, ensure it has some digits
-        # Optional: Add '+' if missing (handled by calling logic validation usually)
-        cleaned_numbers.append(num)
-
-    return {"phone_numbers": cleaned_numbers, "total_count": len(cleaned_numbers)}
+        async with aiofiles.open(spool_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                await out.write(chunk)
+        return await storage.run_io(LeadListStore.ingest, spool_path, filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(spool_path)
+
+@app.get("/api/lead-lists/{lead_list_id}")
+async def get_lead_list(lead_list_id: str):
+    summary = await storage.run_io(LeadListStore.get_summary, lead_list_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="Lead list not found")
+    return summary
 
 @app.post("/api/call-single")
 async def call_single(request: SingleCallRequest):
@@ -108,69 +126,232 @@ async def call_single(request: SingleCallRequest):
     Triggers a single outbound call.
     """
     result = await CallManager.dispatch_call(request.phone_number)
+    if result.get("reason"):
+        # In a call already, cooling down, retry pending or outside calling hours
+        return JSONResponse(status_code=409, content=result)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     return result
 
-@app.post("/api/bulk-call")
+@app.post("/api/bulk-call", status_code=202)
 async def bulk_call(request: BulkCallRequest):
     """
-    Triggers multiple outbound calls sequentially (or parallel, simplistic loop for now).
+    Starts a background campaign for the given numbers and returns its id immediately.
+    Progress is available from /api/campaigns/{campaign_id}.
     """
-    results = []
-    # In a real production app, this should be a background task (Celery/RQ)
-    # For now, we'll just loop and dispatch. 
-    # Warning: If list is huge, this request might timeout. 
-    # Better to return "Accepted" and process in bg. 
-    
-    # Dispatching is fast (just an API call to LiveKit), so 100 numbers might take 30-60s.
-    # We'll limit strictly for safety or use BackgroundTasks? 
-    # Since we want return status, we might just do it.
-    
-    for phone in request.phone_numbers:
-        # Check calling rate limits if necessary
-        res = await CallManager.dispatch_call(phone)
-        results.append({
-            "phone": phone,
-            "status": "dispatched" if "dispatch_id" in res else "failed", 
-            "details": res
-        })
-        
-    return {"results": results, "total_processed": len(results)}
+    phone_numbers = request.phone_numbers
+    if request.lead_list_id:
+        try:
+            phone_numbers = await storage.run_io(LeadListStore.load, request.lead_list_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Lead list not found")
+    if not phone_numbers:
+        raise HTTPException(status_code=400, detail="No phone numbers provided")
+
+    campaign = CampaignManager.create_campaign(
+        phone_numbers,
+        concurrency=request.concurrency,
+        calls_per_second=request.calls_per_second,
+    )
+    return campaign.summary()
+
+def _get_campaign_or_404(campaign_id: str):
+    campaign = CampaignManager.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+@app.get("/api/campaigns")
+async def list_campaigns():
+    """Returns a summary of every campaign started since the API booted."""
+    return CampaignManager.list_campaigns()
+
+@app.get("/api/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    """Returns campaign progress including the status of each number."""
+    campaign = _get_campaign_or_404(campaign_id)
+    resources = await storage.run_io(DialScheduler.resource_usage, campaign_id)
+    return {**campaign.summary(), "resources": resources, "results": campaign.entries}
+
+@app.post("/api/campaigns/{campaign_id}/pause")
+async def pause_campaign(campaign_id: str):
+    return CampaignManager.pause(_get_campaign_or_404(campaign_id))
+
+@app.post("/api/campaigns/{campaign_id}/resume")
+async def resume_campaign(campaign_id: str):
+    return CampaignManager.resume(_get_campaign_or_404(campaign_id))
+
+@app.post("/api/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    return CampaignManager.cancel(_get_campaign_or_404(campaign_id))
 
 @app.get("/api/transcripts")
-async def get_transcripts():
-    """Returns list of all transcripts."""
-    return CallManager.get_transcripts()
+async def get_transcripts(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    phone_number: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    min_duration: Optional[float] = None,
+    fields: str = Query("summary", pattern="^(summary|full)$"),
+):
+    """
+    Returns one page of transcripts (newest first) and a `next_cursor` for the next page.
+    The default summary projection leaves out message bodies; use /api/transcripts/{job_id}.
+    """
+    try:
+        return await CallManager.get_transcripts(limit, cursor, phone_number, date_from, date_to, min_duration, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/transcripts/{job_id}")
+async def get_transcript(job_id: str):
+    """Returns the full transcript, including messages, for a single call."""
+    transcript = await CallManager.get_transcript(job_id)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return transcript
+
+@app.get("/api/leads")
+async def get_leads(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    phone_number: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    intent: Optional[str] = None,
+    outcome: Optional[str] = None,
+    customer_type: Optional[str] = None,
+):
+    """Returns one page of leads extracted from call transcripts (newest first) and a `next_cursor`."""
+    try:
+        return await storage.run_io(CallAnalytics.query, limit, cursor, phone_number, date_from, date_to,
+                                    intent, outcome, customer_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/leads/{job_id}")
+async def get_lead(job_id: str):
+    """Returns the extracted lead for one call and the state of its analytics job."""
+    lead = await storage.run_io(CallAnalytics.get, job_id)
+    if not lead:
+        raise HTTPException(status_code=404, detail="No analytics for this call")
+    return lead
+
+@app.get("/api/analytics")
+async def analytics_summary():
+    """Analytics queue depth, extractor in use, and lead counts by intent and outcome."""
+    return await storage.run_io(CallAnalytics.summary)
+
+@app.post("/api/analytics/reprocess", status_code=202)
+async def reprocess_analytics(request: ReprocessRequest):
+    """
+    Queues calls for extraction again. Calls whose transcript and extractor are unchanged
+    keep their result unless `force` is set.
+    """
+    if request.job_ids:
+        queued = await storage.run_io(CallAnalytics.enqueue, request.job_ids, request.force)
+    else:
+        queued = await storage.run_io(CallAnalytics.enqueue_calls, request.date_from, request.date_to,
+                                      request.force)
+    return {"queued": queued}
 
 @app.get("/api/recordings")
-async def get_recordings():
-    """Returns list of all recordings metadata."""
-    return CallManager.get_recordings()
+async def get_recordings(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    phone_number: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    min_duration: Optional[float] = None,
+):
+    """Returns one page of recording metadata (newest first) and a `next_cursor`."""
+    try:
+        return await CallManager.get_recordings(limit, cursor, phone_number, date_from, date_to, min_duration)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/recordings/{filename}")
+@app.api_route("/api/recordings/{filename}", methods=["GET", "HEAD"])
 async def download_recording(filename: str):
-    """Serves a specific recording file."""
+    """Serves a recording (WAV, FLAC or OGG/Opus) with Range and conditional request support."""
     # Security check: filename shouldn't contain paths
     if ".." in filename or "/" in filename or "\\" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
 
+    media_type = CallManager.recording_media_type(filename)
+    if not media_type:
+        raise HTTPException(status_code=400, detail="Unsupported recording format")
+
     file_path = os.path.join(CallManager.RECORDINGS_AUDIO_DIR, filename)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
         
-    return FileResponse(file_path, media_type="audio/wav", filename=filename)
+    return RangeFileResponse(file_path, media_type=media_type, filename=filename)
 
 @app.get("/api/call-status")
 async def call_status():
-    """Mock status endpoint for live logs."""
-    # In a real app, implementation would depend on Webhooks from LiveKit
-    # For now, return static or random status for UI demo
-    return {"active_calls": 0, "completed_calls": len(CallManager.get_transcripts())}
+    """Live call counters maintained from LiveKit webhooks (O(1), no transcript scan)."""
+    return CallStatusTracker.counts()
+
+@app.post("/api/livekit/webhook")
+async def livekit_webhook(request: Request):
+    """
+    Receives LiveKit webhooks (room/participant events) and advances the per-room call state.
+    Configure the LiveKit project to POST to this URL; requests are signature-verified.
+    """
+    body = (await request.body()).decode("utf-8")
+    try:
+        event = CallStatusTracker.verify(body, request.headers.get("Authorization"))
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Invalid webhook: {e}")
+    CallStatusTracker.handle_webhook(event)
+    return {"ok": True}
+
+@app.get("/api/call-events")
+async def call_events(request: Request):
+    """
+    Server-sent events for the console: a `snapshot` on connect, then `call`, `counts`
+    and `campaign` updates as they happen.
+    """
+    subscriber = EventBroker.subscribe()
+
+    async def stream():
+        try:
+            yield format_sse("snapshot", {
+                **CallStatusTracker.snapshot(),
+                "campaigns": CampaignManager.list_campaigns(),
+            })
+            while not await request.is_disconnected():
+                events = await subscriber.next(timeout=SSE_KEEPALIVE_SECONDS)
+                if not events:
+                    yield ": keep-alive\n\n"
+                for event, data in events:
+                    yield format_sse(event, data)
+        finally:
+            EventBroker.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint: per-turn voice latency histograms and SIP trunk usage."""
+    return PlainTextResponse(LatencyMetrics.render() + TrunkAdmission.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/trunks")
+def trunk_usage():
+    """In-flight legs, adaptive ceiling, utilization and answer/congestion rates per SIP trunk."""
+    return TrunkAdmission.summary()
+
+@app.get("/api/metrics/latency")
+def latency_summary():
+    """Estimated p95 turn latency per STT/LLM/TTS provider combination."""
+    return {"providers": LatencyMetrics.p95()}
 
 # --- Static Files & Frontend Serving ---
-# Mount the assets folder (JS/CSS)
-app.mount("/assets", StaticFiles(directory="frontend/dist/assets"), name="assets")
+# Mount the assets folder (JS/CSS) when the frontend has been built
+if os.path.isdir("frontend/dist/assets"):
+    app.mount("/assets", StaticFiles(directory="frontend/dist/assets"), name="assets")
 
 # Serve index.html for the root and any other path (for React Router)
 @app.get("/{full_path:path}")
@@ -0,0 +1,643 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+from backend.services import storage
+from backend.services.transcript_store import TranscriptStore, _filters
+
+load_dotenv(".env")
+
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "true").lower() == "true"
+# Concurrent extraction workers in the API backend
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", "2"))
+# Transcripts claimed per worker round and extracted concurrently; their results are written in one transaction
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "10"))
+ANALYTICS_POLL_SECONDS = float(os.getenv("ANALYTICS_POLL_SECONDS", "2"))
+# Failed extractions are retried with exponential backoff; the last attempt falls back to rules
+ANALYTICS_MAX_ATTEMPTS = int(os.getenv("ANALYTICS_MAX_ATTEMPTS", "3"))
+ANALYTICS_RETRY_BACKOFF_SECONDS = float(os.getenv("ANALYTICS_RETRY_BACKOFF_SECONDS", "30"))
+# Claimed jobs not finished within this long (e.g. backend restart) are picked up again
+ANALYTICS_CLAIM_TIMEOUT_SECONDS = float(os.getenv("ANALYTICS_CLAIM_TIMEOUT_SECONDS", "300"))
+# auto | groq | openai | rules. auto uses the agent's first LLM provider when its API key is set
+ANALYTICS_PROVIDER = os.getenv("ANALYTICS_PROVIDER", "auto").lower()
+ANALYTICS_MODEL = os.getenv("ANALYTICS_MODEL", "")
+ANALYTICS_TIMEOUT_SECONDS = float(os.getenv("ANALYTICS_TIMEOUT_SECONDS", "30"))
+# Longest transcript text sent to the LLM (the start of the call holds the lead details)
+ANALYTICS_MAX_CHARS = int(os.getenv("ANALYTICS_MAX_CHARS", "12000"))
+
+# Bumped when the prompt or the rules change, so reprocessing picks up every call again
+EXTRACTOR_VERSION = 1
+
+PROVIDERS = {
+    "groq": ("https://api.groq.com/openai/v1/chat/completions", "GROQ_API_KEY",
+             os.getenv("LLM_MODEL", "llama-3.1-8b-instant")),
+    "openai": ("https://api.openai.com/v1/chat/completions", "OPENAI_API_KEY",
+               os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini")),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    force INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analytics_jobs_pending ON analytics_jobs (not_before) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_analytics_jobs_running ON analytics_jobs (claimed_at) WHERE status = 'running';
+
+CREATE TABLE IF NOT EXISTS call_analytics (
+    job_id TEXT PRIMARY KEY,
+    phone_number TEXT,
+    timestamp TEXT NOT NULL,
+    name TEXT,
+    email TEXT,
+    contact_number TEXT,
+    customer_type TEXT,
+    requirement TEXT,
+    intent TEXT,
+    outcome TEXT,
+    consultation INTEGER,
+    summary TEXT,
+    extractor TEXT NOT NULL,
+    transcript_hash TEXT NOT NULL,
+    processed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_call_analytics_timestamp ON call_analytics (timestamp DESC, job_id DESC);
+DROP INDEX IF EXISTS idx_call_analytics_phone;
+CREATE INDEX IF NOT EXISTS idx_call_analytics_phone_page ON call_analytics (phone_number, timestamp DESC, job_id DESC);
+DROP INDEX IF EXISTS idx_call_analytics_intent;
+CREATE INDEX IF NOT EXISTS idx_call_analytics_intent_page ON call_analytics (intent, timestamp DESC, job_id DESC);
+DROP INDEX IF EXISTS idx_call_analytics_outcome;
+CREATE INDEX IF NOT EXISTS idx_call_analytics_outcome_page ON call_analytics (outcome, timestamp DESC, job_id DESC);
+DROP INDEX IF EXISTS idx_call_analytics_customer_type;
+CREATE INDEX IF NOT EXISTS idx_call_analytics_customer_type_page ON call_analytics (customer_type, timestamp DESC, job_id DESC);
+"""
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+LEAD_FIELDS = ("name", "email", "contact_number", "customer_type", "requirement", "intent", "outcome",
+               "consultation", "summary")
+LEAD_COLUMNS = "job_id, phone_number, timestamp, " + ", ".join(LEAD_FIELDS) + ", extractor, processed_at"
+
+CUSTOMER_TYPES = ("business", "personal")
+INTENTS = ("interested", "not_interested", "callback", "wrong_number", "unknown")
+OUTCOMES = ("consultation_requested", "lead_captured", "partial_lead", "not_interested", "callback_requested",
+            "transferred", "voicemail", "no_conversation")
+
+EXTRACTION_PROMPT = f"""You read transcripts of sales calls made by a virtual receptionist for a technology
+services company and extract the lead. Reply with one JSON object with exactly these keys:
+"name": the caller's full name or null,
+"email": their email address (spoken forms like "john at gmail dot com" written as an address) or null,
+"contact_number": the contact number they gave, digits with an optional leading +, or null,
+"customer_type": one of {list(CUSTOMER_TYPES)} or null,
+"requirement": one short sentence describing what they want built, or null,
+"intent": one of {list(INTENTS)},
+"outcome": one of {list(OUTCOMES[:5])},
+"consultation": true if they accepted a consultation call, false if they declined, null if not asked,
+"summary": at most two sentences summarising the call.
+Only use information the caller actually gave. Do not guess."""
+
+# --- Rule-based extraction (no LLM configured, or the LLM kept failing) ---
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+DIGITS_PATTERN = re.compile(r"\+?\d[\d\s-]{8,}\d")
+NAME_PATTERN = re.compile(r"\b(?:my name is|this is|i am|i'm|it's|its|name's)\s+([a-z][a-z'-]+(?:\s+[a-z][a-z'-]+){0,2})",
+                          re.IGNORECASE)
+NAME_STOPWORDS = {"a", "an", "the", "not", "looking", "interested", "calling", "fine", "good", "busy", "here",
+                  "sure", "yes", "yeah", "ok", "okay", "sorry", "from", "just", "very", "really", "in", "on",
+                  "for", "and", "so", "but", "with", "at", "to", "of", "please"}
+AFFIRMATIVE = re.compile(r"\b(yes|yeah|yep|sure|okay|ok|of course|please do|why not|definitely|go ahead)\b",
+                         re.IGNORECASE)
+NEGATIVE = re.compile(r"\b(no|nope|not now|not really|no thanks|no thank you)\b", re.IGNORECASE)
+NOT_INTERESTED = re.compile(r"\b(not interested|no need|don't need|do not need|don't call|do not call|"
+                            r"stop calling|remove my number)\b", re.IGNORECASE)
+CALLBACK = re.compile(r"\b(call (me )?(back|later|tomorrow)|busy (right )?now|in a meeting|another time)\b",
+                      re.IGNORECASE)
+WRONG_NUMBER = re.compile(r"\b(wrong number|who is this|didn't sign up|never heard)\b", re.IGNORECASE)
+BUSINESS = re.compile(r"\b(business|company|startup|firm|agency|clients?|customers|office|enterprise|"
+                      r"organi[sz]ation)\b", re.IGNORECASE)
+PERSONAL = re.compile(r"\b(personal|myself|my own|for me|individual|hobby)\b", re.IGNORECASE)
+SERVICES = ("ai agent", "voice agent", "calling system", "call center", "chatbot", "telephony", "crm",
+            "llm", "app", "website", "automation", "software", "integration")
+SPOKEN_EMAIL = ((re.compile(r"\s+at\s+", re.IGNORECASE), "@"), (re.compile(r"\s+dot\s+", re.IGNORECASE), "."))
+
+
+def _question_topic(text: str) -> Optional[str]:
+    """Which lead detail the agent is asking for."""
+    text = text.lower()
+    if "consultation" in text:
+        return "consultation"
+    if "email" in text:
+        return "email"
+    if "contact number" in text or "phone number" in text:
+        return "contact_number"
+    if "name" in text:
+        return "name"
+    if "business or personal" in text:
+        return "customer_type"
+    if "type of solution" in text or "requirement" in text or "technology needs" in text or "assist" in text:
+        return "requirement"
+    return None
+
+
+def _name_from(text: str, asked: bool) -> Optional[str]:
+    match = NAME_PATTERN.search(text)
+    if match:
+        words = match.group(1).split()
+    elif asked:
+        words = re.sub(r"[^\w\s'-]", " ", text).split()
+        words = [w for w in words if w.lower() not in {"sure", "yes", "yeah", "ok", "okay", "it", "is", "its"}]
+    else:
+        return None
+    name = []
+    for word in words[:3]:
+        if word.lower() in NAME_STOPWORDS or any(c.isdigit() for c in word):
+            break
+        name.append(word.capitalize())
+    return " ".join(name) or None
+
+
+def _email_from(text: str) -> Optional[str]:
+    match = EMAIL_PATTERN.search(text)
+    if not match:
+        spoken = text
+        for pattern, replacement in SPOKEN_EMAIL:
+            spoken = pattern.sub(replacement, spoken)
+        match = EMAIL_PATTERN.search(spoken.replace(" ", "") if "@" in spoken else spoken)
+    return match.group(0).lower().rstrip(".") if match else None
+
+
+def _number_from(text: str) -> Optional[str]:
+    match = DIGITS_PATTERN.search(text)
+    if not match:
+        return None
+    raw = match.group(0)
+    return ("+" if raw.startswith("+") else "") + re.sub(r"\D", "", raw)
+
+
+def extract_rules(record: Dict) -> Dict:
+    """Lead fields from the agent's scripted questions and the caller's answers."""
+    lead: Dict = {field: None for field in LEAD_FIELDS}
+    requirement_parts: List[str] = []
+    caller_text: List[str] = []
+    topic = None
+    for message in record.get("messages") or []:
+        content = (message.get("content") or "").strip()
+        if message.get("role") != "user":
+            topic = _question_topic(content) or topic
+            continue
+        caller_text.append(content)
+        if topic == "name" and not lead["name"]:
+            lead["name"] = _name_from(content, asked=True)
+        elif not lead["name"]:
+            lead["name"] = _name_from(content, asked=False)
+        lead["email"] = lead["email"] or _email_from(content)
+        number = _number_from(content)
+        if number:
+            lead["contact_number"] = lead["contact_number"] or number
+        elif topic == "contact_number" and AFFIRMATIVE.search(content) and not lead["contact_number"]:
+            # "Yes, this number is fine"
+            lead["contact_number"] = record.get("phone_number")
+        if topic == "consultation" and lead["consultation"] is None:
+            if AFFIRMATIVE.search(content):
+                lead["consultation"] = True
+            elif NEGATIVE.search(content):
+                lead["consultation"] = False
+        if topic == "requirement" or any(service in content.lower() for service in SERVICES):
+            if len(content.split()) > 2 and not (NOT_INTERESTED.search(content) or WRONG_NUMBER.search(content)):
+                requirement_parts.append(content)
+
+    text = " ".join(caller_text)
+    if BUSINESS.search(text):
+        lead["customer_type"] = "business"
+    elif PERSONAL.search(text):
+        lead["customer_type"] = "personal"
+    if requirement_parts:
+        lead["requirement"] = " ".join(requirement_parts)[:300]
+
+    if WRONG_NUMBER.search(text):
+        lead["intent"] = "wrong_number"
+    elif NOT_INTERESTED.search(text):
+        lead["intent"] = "not_interested"
+    elif CALLBACK.search(text):
+        lead["intent"] = "callback"
+    elif lead["consultation"] or lead["requirement"]:
+        lead["intent"] = "interested"
+    else:
+        lead["intent"] = "unknown"
+    return lead
+
+
+# --- Outcome and normalisation (shared by both extractors) ---
+
+def _outcome(record: Dict, lead: Dict) -> str:
+    """Call outcome; what the agent recorded (voicemail, transfer) wins over the transcript."""
+    metrics = record.get("metrics") or {}
+    if (metrics.get("amd") or {}).get("label") == "machine":
+        return "voicemail"
+    if not any(m.get("role") == "user" for m in record.get("messages") or []):
+        return "no_conversation"
+    if metrics.get("transfers"):
+        return "transferred"
+    if str(lead.get("outcome")).strip().lower() in OUTCOMES:
+        return str(lead["outcome"]).strip().lower()
+    if lead["intent"] == "not_interested":
+        return "not_interested"
+    if lead["intent"] == "callback":
+        return "callback_requested"
+    if lead["consultation"]:
+        return "consultation_requested"
+    if lead["name"] and lead["contact_number"] and lead["requirement"]:
+        return "lead_captured"
+    return "partial_lead"
+
+
+def _normalize(record: Dict, lead: Dict) -> Dict:
+    result = {field: lead.get(field) for field in LEAD_FIELDS}
+    for field in ("name", "email", "contact_number", "requirement", "summary"):
+        value = result[field]
+        result[field] = str(value).strip()[:500] if value not in (None, "", "null") else None
+    for field in ("customer_type", "intent"):
+        if isinstance(result[field], str):
+            result[field] = result[field].strip().lower().replace(" ", "_")
+    if result["customer_type"] not in CUSTOMER_TYPES:
+        result["customer_type"] = None
+    if result["intent"] not in INTENTS:
+        result["intent"] = "unknown"
+    if isinstance(result["consultation"], str):
+        result["consultation"] = {"true": True, "yes": True, "false": False, "no": False}.get(
+            result["consultation"].strip().lower())
+    elif result["consultation"] is not None:
+        result["consultation"] = bool(result["consultation"])
+    result["outcome"] = _outcome(record, result)
+    return result
+
+
+def transcript_text(record: Dict) -> str:
+    lines = [f"{m.get('display_role') or m.get('role')}: {m.get('content')}" for m in record.get("messages") or []]
+    return "\n".join(lines)[:ANALYTICS_MAX_CHARS]
+
+
+def transcript_hash(record: Dict) -> str:
+    """Changes when anything the extraction reads changes."""
+    metrics = record.get("metrics") or {}
+    relevant = {
+        "messages": [(m.get("role"), m.get("content")) for m in record.get("messages") or []],
+        "phone_number": record.get("phone_number"),
+        "amd": (metrics.get("amd") or {}).get("label"),
+        "transfers": bool(metrics.get("transfers")),
+    }
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _provider() -> Optional[Tuple[str, str, str]]:
+    """(url, api key, model) of the extraction LLM, or None for rule-based extraction."""
+    if ANALYTICS_PROVIDER == "rules":
+        return None
+    if ANALYTICS_PROVIDER == "auto":
+        names = [n.strip() for n in (os.getenv("LLM_PROVIDERS") or os.getenv("LLM_PROVIDER", "groq")).split(",")]
+    else:
+        names = [ANALYTICS_PROVIDER]
+    for name in names:
+        if name in PROVIDERS and os.getenv(PROVIDERS[name][1]):
+            url, key_env, model = PROVIDERS[name]
+            return url, os.getenv(key_env), ANALYTICS_MODEL or model
+    if ANALYTICS_PROVIDER != "auto":
+        print(f"WARNING: Analytics provider '{ANALYTICS_PROVIDER}' has no API key, using rule-based extraction")
+    return None
+
+
+class CallAnalytics:
+    """
+    Post-call lead extraction, off the live-call path.
+
+    The agent only enqueues a call's job id after its transcript is stored (one primary-key
+    insert). Worker tasks in the API backend claim pending jobs in batches from the
+    SQLite queue, extract the lead fields, intent and outcome (LLM with JSON output, or
+    rules), and write each batch's results to the indexed `call_analytics` table in one
+    transaction. Results are keyed by job id and remember the transcript hash and
+    extractor they came from, so enqueuing a call again is a no-op unless the transcript
+    or the extractor changed (or the reprocess is forced).
+    """
+    _schema_ready = False
+    _workers: List[asyncio.Task] = []
+    _wake: Optional[asyncio.Event] = None
+    _http: Optional[aiohttp.ClientSession] = None
+    _provider: Optional[Tuple[str, str, str]] = None
+    _stats = {"processed": 0, "skipped": 0, "llm_errors": 0, "rule_fallbacks": 0}
+
+    @classmethod
+    def connection(cls):
+        conn = TranscriptStore.connection()
+        if not cls._schema_ready:
+            with TranscriptStore._lock:
+                conn.executescript(SCHEMA)
+            cls._schema_ready = True
+        return conn
+
+    @classmethod
+    def extractor(cls) -> str:
+        provider = cls._provider
+        return f"llm:{provider[2]}:v{EXTRACTOR_VERSION}" if provider else f"rules:v{EXTRACTOR_VERSION}"
+
+    # --- Queue ---
+
+    @classmethod
+    def enqueue(cls, job_ids: List[str], force: bool = False) -> int:
+        """Queues calls for extraction (again). Safe to call for calls already processed."""
+        if not job_ids:
+            return 0
+        conn = cls.connection()
+        now = time.time()
+        with TranscriptStore._lock, conn:
+            conn.executemany(
+                "INSERT INTO analytics_jobs (job_id, status, force, enqueued_at) VALUES (?, 'pending', ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET status = 'pending', force = MAX(force, excluded.force), "
+                "attempts = 0, not_before = 0, enqueued_at = excluded.enqueued_at, claimed_at = NULL, error = NULL",
+                [(job_id, int(force), now) for job_id in job_ids],
+            )
+        if cls._wake is not None:
+            cls._wake.set()
+        return len(job_ids)
+
+    @classmethod
+    def enqueue_calls(cls, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                      force: bool = False, missing_only: bool = False) -> int:
+        """Queues every stored call in the date range (or only those never queued)."""
+        clauses, params = _filters(None, date_from, date_to, None)
+        if missing_only:
+            clauses.append("job_id NOT IN (SELECT job_id FROM analytics_jobs)")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = cls.connection()
+        with TranscriptStore._lock:
+            job_ids = [row[0] for row in conn.execute(f"SELECT job_id FROM calls {where}", params)]
+        return cls.enqueue(job_ids, force)
+
+    @classmethod
+    def claim(cls, limit: int) -> List[Tuple[str, int, int, float]]:
+        """Marks up to `limit` due jobs as running; returns (job_id, force, attempts, claimed_at)."""
+        conn = cls.connection()
+        now = time.time()
+        with TranscriptStore._lock, conn:
+            conn.execute(
+                "UPDATE analytics_jobs SET status = 'pending', claimed_at = NULL "
+                "WHERE status = 'running' AND claimed_at < ?",
+                (now - ANALYTICS_CLAIM_TIMEOUT_SECONDS,),
+            )
+            rows = conn.execute(
+                "SELECT job_id, force, attempts FROM analytics_jobs WHERE status = 'pending' AND not_before <= ? "
+                "ORDER BY not_before, enqueued_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE analytics_jobs SET status = 'running', claimed_at = ?, attempts = attempts + 1 "
+                "WHERE job_id = ?",
+                [(now, row["job_id"]) for row in rows],
+            )
+        return [(row["job_id"], row["force"], row["attempts"] + 1, now) for row in rows]
+
+    @classmethod
+    def complete(cls, results: List[Dict], retries: List[Tuple[str, float, str]], claimed_at: float):
+        """
+        Writes a batch: results (done) and retries (job_id, delay, error). Jobs queued
+        again while they were running stay pending and run once more.
+        """
+        conn = cls.connection()
+        now = time.time()
+        with TranscriptStore._lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO call_analytics "
+                f"({LEAD_COLUMNS}, transcript_hash) VALUES ({', '.join('?' * (len(LEAD_FIELDS) + 6))})",
+                [(r["job_id"], r["phone_number"], r["timestamp"], *(r[f] for f in LEAD_FIELDS), r["extractor"],
+                  r["processed_at"], r["transcript_hash"]) for r in results if not r.get("skipped")],
+            )
+            conn.executemany(
+                "UPDATE analytics_jobs SET status = 'done', finished_at = ?, error = ?, force = 0 "
+                "WHERE job_id = ? AND status = 'running' AND claimed_at = ?",
+                [(now, r.get("error"), r["job_id"], claimed_at) for r in results],
+            )
+            conn.executemany(
+                "UPDATE analytics_jobs SET status = 'pending', not_before = ?, error = ?, claimed_at = NULL "
+                "WHERE job_id = ? AND status = 'running' AND claimed_at = ?",
+                [(now + delay, error, job_id, claimed_at) for job_id, delay, error in retries],
+            )
+
+    @classmethod
+    def fail(cls, job_id: str, error: str, claimed_at: float):
+        conn = cls.connection()
+        with TranscriptStore._lock, conn:
+            conn.execute(
+                "UPDATE analytics_jobs SET status = 'failed', finished_at = ?, error = ? "
+                "WHERE job_id = ? AND status = 'running' AND claimed_at = ?",
+                (time.time(), error, job_id, claimed_at),
+            )
+
+    @classmethod
+    def _current(cls, job_id: str) -> Optional[Tuple[str, str]]:
+        conn = cls.connection()
+        with TranscriptStore._lock:
+            row = conn.execute("SELECT transcript_hash, extractor FROM call_analytics WHERE job_id = ?",
+                               (job_id,)).fetchone()
+        return (row["transcript_hash"], row["extractor"]) if row else None
+
+    # --- Extraction ---
+
+    @classmethod
+    async def _extract_llm(cls, record: Dict) -> Dict:
+        url, api_key, model = cls._provider
+        if cls._http is None:
+            cls._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=ANALYTICS_TIMEOUT_SECONDS))
+        payload = {
+            "model": model,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": EXTRACTION_PROMPT},
+                {"role": "user", "content": f"Dialled number: {record.get('phone_number') or 'unknown'}\n\n"
+                                            f"{transcript_text(record)}"},
+            ],
+        }
+        async with cls._http.post(url, json=payload, headers={"Authorization": f"Bearer {api_key}"}) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status}: {(await resp.text())[:200]}")
+            body = await resp.json()
+        lead = json.loads(body["choices"][0]["message"]["content"])
+        if not isinstance(lead, dict):
+            raise ValueError("extraction is not a JSON object")
+        return lead
+
+    @classmethod
+    async def process(cls, job_id: str, force: bool, attempts: int) -> Dict:
+        """
+        Extracts one call. Returns the result row, or {"skipped": True} when the stored
+        result is already current. Raises to have the job retried.
+        """
+        record = await storage.run_io(TranscriptStore.get, job_id)
+        if record is None:
+            raise LookupError("transcript not found")
+        digest = transcript_hash(record)
+        extractor = cls.extractor()
+        if not force and await storage.run_io(cls._current, job_id) == (digest, extractor):
+            cls._stats["skipped"] += 1
+            return {"job_id": job_id, "skipped": True}
+
+        error = None
+        has_caller = any(m.get("role") == "user" for m in record.get("messages") or [])
+        if cls._provider and has_caller:
+            try:
+                lead = await cls._extract_llm(record)
+            except Exception as e:
+                cls._stats["llm_errors"] += 1
+                if attempts < ANALYTICS_MAX_ATTEMPTS:
+                    raise
+                # Out of retries: keep a rule-based result rather than nothing
+                error = f"LLM extraction failed, used rules: {e}"
+                cls._stats["rule_fallbacks"] += 1
+                lead, extractor = extract_rules(record), f"rules:v{EXTRACTOR_VERSION}"
+        else:
+            lead = extract_rules(record)
+
+        cls._stats["processed"] += 1
+        return {
+            "job_id": job_id,
+            "phone_number": record.get("phone_number"),
+            "timestamp": record.get("timestamp") or "",
+            **_normalize(record, lead),
+            "extractor": extractor,
+            "transcript_hash": digest,
+            "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "error": error,
+        }
+
+    @classmethod
+    async def _run_batch(cls) -> int:
+        claimed = await storage.run_io(cls.claim, ANALYTICS_BATCH_SIZE)
+        if not claimed:
+            return 0
+        results, retries = [], []
+        claimed_at = claimed[0][3]
+        # Extract the batch concurrently so it takes about one request timeout, well inside the claim
+        outcomes = await asyncio.gather(
+            *(cls.process(job_id, bool(force), attempts) for job_id, force, attempts, _ in claimed),
+            return_exceptions=True,
+        )
+        for (job_id, _, attempts, _), outcome in zip(claimed, outcomes):
+            if not isinstance(outcome, Exception):
+                results.append(outcome)
+            elif isinstance(outcome, LookupError):
+                await storage.run_io(cls.fail, job_id, str(outcome), claimed_at)
+            elif attempts >= ANALYTICS_MAX_ATTEMPTS:
+                print(f"WARNING: Analytics for {job_id} failed after {attempts} attempts: {outcome}")
+                await storage.run_io(cls.fail, job_id, str(outcome), claimed_at)
+            else:
+                retries.append((job_id, ANALYTICS_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), str(outcome)))
+        await storage.run_io(cls.complete, results, retries, claimed_at)
+        return len(claimed)
+
+    @classmethod
+    async def _worker(cls):
+        while True:
+            try:
+                if await cls._run_batch():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"WARNING: Analytics worker error: {e}")
+            cls._wake.clear()
+            try:
+                await asyncio.wait_for(cls._wake.wait(), ANALYTICS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    @classmethod
+    async def start(cls):
+        if not ANALYTICS_ENABLED or cls._workers:
+            return
+        cls._provider = _provider()
+        cls._wake = asyncio.Event()
+        # Calls stored while the backend was down, or imported with import_transcripts.py
+        queued = await storage.run_io(cls.enqueue_calls, missing_only=True)
+        print(f"INFO: Call analytics started ({ANALYTICS_WORKERS} workers, extractor {cls.extractor()}, "
+              f"{queued} calls queued)")
+        if ANALYTICS_CLAIM_TIMEOUT_SECONDS <= 2 * ANALYTICS_TIMEOUT_SECONDS:
+            print(f"WARNING: ANALYTICS_CLAIM_TIMEOUT_SECONDS ({ANALYTICS_CLAIM_TIMEOUT_SECONDS:g}) should be well above "
+                  f"ANALYTICS_TIMEOUT_SECONDS ({ANALYTICS_TIMEOUT_SECONDS:g}); slow batches will be claimed "
+                  f"again and their results discarded")
+        cls._workers = [asyncio.create_task(cls._worker()) for _ in range(max(ANALYTICS_WORKERS, 1))]
+
+    @classmethod
+    async def stop(cls):
+        for task in cls._workers:
+            task.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+        if cls._http is not None:
+            await cls._http.close()
+            cls._http = None
+
+    # --- Queries ---
+
+    @classmethod
+    def query(cls, limit: int = 50, cursor: Optional[str] = None, phone_number: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None, intent: Optional[str] = None,
+              outcome: Optional[str] = None, customer_type: Optional[str] = None) -> Dict:
+        """One page of extracted leads (newest call first) plus `next_cursor`."""
+        cls.connection()
+        clauses, params = _filters(phone_number, date_from, date_to, None)
+        for column, value in (("intent", intent), ("outcome", outcome), ("customer_type", customer_type)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        page = TranscriptStore._page("call_analytics", LEAD_COLUMNS, "job_id", limit, cursor, clauses, params)
+        page["items"] = [cls._lead(row) for row in page["items"]]
+        return page
+
+    @staticmethod
+    def _lead(row) -> Dict:
+        lead = dict(row)
+        if lead.get("consultation") is not None:
+            lead["consultation"] = bool(lead["consultation"])
+        return lead
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[Dict]:
+        conn = cls.connection()
+        with TranscriptStore._lock:
+            row = conn.execute(f"SELECT {LEAD_COLUMNS} FROM call_analytics WHERE job_id = ?", (job_id,)).fetchone()
+            job = conn.execute("SELECT status, attempts, error FROM analytics_jobs WHERE job_id = ?",
+                               (job_id,)).fetchone()
+        if row is None and job is None:
+            return None
+        return {**(cls._lead(row) if row else {"job_id": job_id}), "job": dict(job) if job else None}
+
+    @classmethod
+    def summary(cls) -> Dict:
+        """Queue depth by status and lead counts by intent and outcome."""
+        conn = cls.connection()
+        with TranscriptStore._lock:
+            queue = dict(conn.execute("SELECT status, COUNT(*) FROM analytics_jobs GROUP BY status").fetchall())
+            intents = dict(conn.execute("SELECT intent, COUNT(*) FROM call_analytics GROUP BY intent").fetchall())
+            outcomes = dict(conn.execute("SELECT outcome, COUNT(*) FROM call_analytics GROUP BY outcome").fetchall())
+        return {
+            "enabled": ANALYTICS_ENABLED,
+            "workers": len(cls._workers),
+            "extractor": cls.extractor(),
+            "queue": {status: queue.get(status, 0) for status in (PENDING, RUNNING, DONE, FAILED)},
+            "intents": intents,
+            "outcomes": outcomes,
+            **cls._stats,
+        }
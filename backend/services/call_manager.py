@@ -1,11 +1,17 @@
 import os
-import random
 import json
 import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
 from livekit import api
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from backend.services.livekit_client import LiveKitClient
+from backend.services.transcript_store import TranscriptStore
+from backend.services import storage
+from backend.services.call_status import CallStatusTracker
+from backend.services.dial_scheduler import ANSWERED, DialScheduler
+from backend.services.trunk_admission import TrunkAdmission
 
 # Assumes .env is in the project root
 load_dotenv(".env")
@@ -16,14 +22,25 @@ LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 
 # Project Root Directories
 TRANSCRIPTS_JSON_DIR = "transcripts_json"
-RECORDINGS_AUDIO_DIR = "recordings_audio"
+RECORDINGS_AUDIO_DIR = os.getenv("RECORDINGS_AUDIO_DIR", "recordings_audio")
 LOGS_DIR = "logs"
 
+# Recording formats written by the agent (see RECORDING_FORMAT)
+RECORDING_MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".ogg": "audio/ogg",
+}
+
 class CallManager:
+    RECORDINGS_AUDIO_DIR = RECORDINGS_AUDIO_DIR
+
     @staticmethod
-    async def dispatch_call(phone_number: str) -> Dict:
+    async def dispatch_call(phone_number: str, campaign_id: Optional[str] = None, retry: bool = False) -> Dict:
         """
-        Dispatches a single call to the LiveKit agent.
+        Dispatches a single call to the LiveKit agent. The dial scheduler refuses numbers that
+        are already in a call, cooling down, waiting for a retry or outside calling hours;
+        the result then carries its `reason` and `not_before`.
         """
         if not phone_number.startswith("+"):
             return {"error": "Phone number must start with '+' and country code."}
@@ -34,28 +51,41 @@ class CallManager:
         print(f"DEBUG: Dispatching call to {phone_number}...")
         print(f"DEBUG: Using LiveKit URL: {LIVEKIT_URL}")
         
-        lk_api = api.LiveKitAPI(url=LIVEKIT_URL, api_key=LIVEKIT_API_KEY, api_secret=LIVEKIT_API_SECRET)
+        # Shared pooled client (owned by the FastAPI lifespan), not closed per call
+        lk_api = await LiveKitClient.get()
         
-        # Unique Room Name
-        safe_phone = phone_number.replace('+', '')
-        room_name = f"call-{safe_phone}-{random.randint(1000, 9999)}"
+        slot = await DialScheduler.acquire(phone_number, campaign_id, retry)
+        if "room_name" not in slot:
+            return {"success": False, "error": f"Not dialled: {slot['reason']}", "phone_number": phone_number, **slot}
+        room_name = slot["room_name"]
+
+        # Waits for a free channel on one of the outbound trunks
+        trunk_id = await TrunkAdmission.admit(room_name)
+        if trunk_id is None:
+            await DialScheduler.dispatch_failed(room_name, retry)
+            return {"success": False, "error": "No free SIP trunk channel (admission timed out)", "phone_number": phone_number}
+        metadata = {"phone_number": phone_number}
+        if trunk_id:
+            metadata["sip_trunk_id"] = trunk_id
         
         try:
             dispatch_request = api.CreateAgentDispatchRequest(
                 agent_name="transcription-agent", 
                 room=room_name,
-                metadata=json.dumps({"phone_number": phone_number})
+                metadata=json.dumps(metadata)
             )
             
             print(f"DEBUG: Sending dispatch request for room {room_name}...")
             dispatch = await lk_api.agent_dispatch.create_dispatch(dispatch_request)
             print(f"DEBUG: Dispatch successful: {dispatch}")
+            CallStatusTracker.dispatched(room_name, phone_number, dispatch.id)
             
             return {
                 "success": True,
                 "dispatch_id": dispatch.id,
                 "room_name": room_name,
                 "phone_number": phone_number,
+                "sip_trunk_id": trunk_id or None,
                 "status": "ring_initiated",
                 "timestamp": datetime.now().isoformat()
             }
@@ -64,66 +94,54 @@ class CallManager:
             import traceback
             traceback.print_exc()
             print(f"ERROR in dispatch_call: {e}")
+            TrunkAdmission.release(room_name)
+            await DialScheduler.dispatch_failed(room_name, retry)
             return {"success": False, "error": str(e)}
-        finally:
-            await lk_api.aclose()
 
     @staticmethod
-    def get_transcripts() -> List[Dict]:
+    async def call_finished(room_name: str, answered: bool, reason: Optional[str] = None):
+        """CallStatusTracker listener: updates the dial schedule and frees the trunk channel."""
+        result = await DialScheduler.call_finished(room_name, answered, reason)
+        outcome = result["outcome"] if result else (ANSWERED if answered else None)
+        TrunkAdmission.call_finished(room_name, outcome, result and result["sip_status"], reason)
+
+    @staticmethod
+    async def get_transcripts(limit: int = 50, cursor: Optional[str] = None, phone_number: Optional[str] = None,
+                              date_from: Optional[str] = None, date_to: Optional[str] = None,
+                              min_duration: Optional[float] = None, fields: str = "summary") -> Dict:
         """
-        Returns a list of call transcripts from JSON files.
+        Returns one page of call transcripts (newest first) from the transcript store.
+        `fields="summary"` leaves out the message bodies.
         """
-        transcripts = []
-        if not os.path.exists(TRANSCRIPTS_JSON_DIR):
-            return []
-            
-        for filename in os.listdir(TRANSCRIPTS_JSON_DIR):
-            if filename.endswith(".json"):
-                filepath = os.path.join(TRANSCRIPTS_JSON_DIR, filename)
-                try:
-                    with open(filepath, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        transcripts.append(data)
-                except Exception:
-                    continue
-        
-        # Sort by timestamp (newest first)
-        transcripts.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        return transcripts
+        return await storage.run_io(
+            TranscriptStore.query,
+            limit=limit, cursor=cursor, phone_number=phone_number, date_from=date_from,
+            date_to=date_to, min_duration=min_duration, include_messages=(fields == "full"),
+        )
 
     @staticmethod
-    def get_recordings() -> List[Dict]:
+    async def get_transcript(job_id: str) -> Optional[Dict]:
+        """Returns the full transcript (including messages) for one call."""
+        return await storage.run_io(TranscriptStore.get, job_id)
+
+    @staticmethod
+    async def count_transcripts() -> int:
+        return await storage.run_io(TranscriptStore.count)
+
+    @staticmethod
+    def recording_media_type(filename: str) -> Optional[str]:
+        """Returns the media type for a supported recording file, else None."""
+        return RECORDING_MEDIA_TYPES.get(os.path.splitext(filename)[1].lower())
+
+    @staticmethod
+    async def get_recordings(limit: int = 50, cursor: Optional[str] = None, phone_number: Optional[str] = None,
+                             date_from: Optional[str] = None, date_to: Optional[str] = None,
+                             min_duration: Optional[float] = None) -> Dict:
         """
-        Returns a list of audio recordings (metadata).
+        Returns one page of audio recording metadata (newest first).
         """
-        recordings = []
-        if not os.path.exists(RECORDINGS_AUDIO_DIR):
-            return []
-            
-        for filename in os.listdir(RECORDINGS_AUDIO_DIR):
-            if filename.endswith(".wav"):
-                # Extract info from filename: user_{job_id}_{timestamp}.wav
-                parts = filename.replace(".wav", "").split("_")
-                job_id = "unknown"
-                ts = 0
-                
-                if len(parts) >= 3:
-                     # e.g., user_jobid123_1739...
-                     job_id = parts[1]
-                     try:
-                        ts = int(parts[-1])
-                     except:
-                        pass
-                
-                filepath = os.path.join(RECORDINGS_AUDIO_DIR, filename)
-                recordings.append({
-                    "filename": filename,
-                    "filepath": filepath,
-                    "job_id": job_id,
-                    "timestamp": datetime.fromtimestamp(ts).isoformat() if ts > 0 else "Unknown",
-                    "size_bytes": os.path.getsize(filepath)
-                })
-        
-        recordings.sort(key=lambda x: x["timestamp"], reverse=True)
-        return recordings
-
+        return await storage.run_io(
+            TranscriptStore.query_recordings,
+            limit=limit, cursor=cursor, phone_number=phone_number, date_from=date_from,
+            date_to=date_to, min_duration=min_duration,
+        )
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from livekit import api
+from livekit.protocol import models
+
+from backend.services import storage
+from backend.services.events import EventBroker
+from backend.services.dial_scheduler import DialScheduler
+from backend.services.transcript_store import TranscriptStore
+
+load_dotenv(".env")
+
+LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
+LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
+
+# Compact JSON snapshot the tracker is rebuilt from after a restart
+SNAPSHOT_PATH = os.getenv("CALL_STATUS_SNAPSHOT_PATH", "call_status_snapshot.json")
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("CALL_STATUS_SNAPSHOT_SECONDS", "2"))
+# Finished calls kept for the console; counters stay cumulative after eviction
+MAX_FINISHED_CALLS = int(os.getenv("CALL_STATUS_MAX_FINISHED", "500"))
+# Calls still "active" this long after their last update are assumed lost (e.g. missed webhook)
+STALE_CALL_SECONDS = float(os.getenv("CALL_STATUS_STALE_SECONDS", "7200"))
+# How often active calls are checked for staleness
+STALE_SWEEP_SECONDS = 60
+
+# Call states
+DISPATCHED = "dispatched"
+RINGING = "ringing"
+ANSWERED = "answered"
+ENDED = "ended"
+FAILED = "failed"
+
+ACTIVE_STATES = (DISPATCHED, RINGING, ANSWERED)
+TERMINAL_STATES = (ENDED, FAILED)
+# Transitions only move forward; late or duplicated webhooks are ignored
+STATE_ORDER = {DISPATCHED: 0, RINGING: 1, ANSWERED: 2, ENDED: 3, FAILED: 3}
+
+
+class CallStatusTracker:
+    """
+    Live per-room call state, driven by agent dispatches, LiveKit webhooks and what the
+    agent records in the dial scheduler (a SIP participant joins while still dialling and
+    no webhook fires when it is answered, so the answer comes from the agent).
+
+    Counters are maintained on every transition, so status reads are O(1). Active states
+    count calls currently in that state; ended/failed are cumulative. Changes are pushed to
+    the console through the EventBroker and periodically written to a compact snapshot.
+    """
+    _calls: "OrderedDict[str, Dict]" = OrderedDict()
+    _counts: Dict[str, int] = {state: 0 for state in STATE_ORDER}
+    _finished = 0
+    _webhooks = 0  # received since the snapshot was first written
+    _dirty = False
+    _snapshot_task: Optional[asyncio.Task] = None
+    _receiver: Optional[api.WebhookReceiver] = None
+    # Async callbacks (room_name, answered, reason) run when a call reaches ended/failed
+    _listeners: List[Callable[[str, bool, Optional[str]], Awaitable[None]]] = []
+    _tasks = set()
+
+    # --- State machine ---
+
+    @classmethod
+    def transition(cls, room_name: str, state: str, **fields) -> bool:
+        """Moves a call to `state`, creating it if unknown. Returns False when ignored."""
+        call = cls._calls.get(room_name)
+        if call is None:
+            call = {"room_name": room_name, "state": None, "created_at": datetime.now().isoformat()}
+            cls._calls[room_name] = call
+        elif STATE_ORDER[state] <= STATE_ORDER[call["state"]]:
+            return False
+
+        previous = call["state"]
+        if previous in ACTIVE_STATES:
+            cls._counts[previous] -= 1
+        cls._counts[state] += 1
+        call["state"] = state
+        call["updated_at"] = datetime.now().isoformat()
+        call["updated_ts"] = time.time()
+        call.update({k: v for k, v in fields.items() if v is not None})
+
+        if state in TERMINAL_STATES:
+            cls._finished += 1
+            cls._calls.move_to_end(room_name)
+            cls._evict()
+            for listener in cls._listeners:
+                cls._spawn(listener(room_name, state == ENDED, call.get("reason")))
+
+        cls._dirty = True
+        EventBroker.publish(f"call:{room_name}", "call", cls._public(call))
+        EventBroker.publish("counts", "counts", cls.counts())
+        return True
+
+    @classmethod
+    def _evict(cls):
+        """Drops the oldest finished calls beyond MAX_FINISHED_CALLS."""
+        if cls._finished <= MAX_FINISHED_CALLS:
+            return
+        for room_name in list(cls._calls):
+            if cls._calls[room_name]["state"] in TERMINAL_STATES:
+                del cls._calls[room_name]
+                cls._finished -= 1
+                if cls._finished <= MAX_FINISHED_CALLS:
+                    break
+
+    @classmethod
+    def _spawn(cls, coro):
+        task = asyncio.create_task(coro)
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @staticmethod
+    def _public(call: Dict) -> Dict:
+        return {k: v for k, v in call.items() if k != "updated_ts"}
+
+    @classmethod
+    def add_listener(cls, callback: Callable[[str, bool, Optional[str]], Awaitable[None]]):
+        if callback not in cls._listeners:
+            cls._listeners.append(callback)
+
+    @classmethod
+    def dispatched(cls, room_name: str, phone_number: str, dispatch_id: str):
+        cls.transition(room_name, DISPATCHED, phone_number=phone_number, dispatch_id=dispatch_id)
+
+    # --- Webhooks ---
+
+    @classmethod
+    def verify(cls, body: str, auth_header: Optional[str]) -> api.WebhookEvent:
+        """Checks the webhook's signed JWT and body hash. Raises on any mismatch."""
+        if not (LIVEKIT_API_KEY and LIVEKIT_API_SECRET):
+            raise RuntimeError("LiveKit credentials missing in environment variables.")
+        if not auth_header:
+            raise ValueError("Missing Authorization header")
+        if cls._receiver is None:
+            cls._receiver = api.WebhookReceiver(api.TokenVerifier(LIVEKIT_API_KEY, LIVEKIT_API_SECRET))
+        return cls._receiver.receive(body, auth_header.removeprefix("Bearer ").strip())
+
+    @classmethod
+    def handle_webhook(cls, event: api.WebhookEvent):
+        cls._webhooks += 1
+        room_name = event.room.name
+        if not room_name:
+            return
+        call = cls._calls.get(room_name)
+        answered = call is not None and call["state"] == ANSWERED
+        kind = event.participant.kind
+
+        if event.event == "room_started":
+            cls.transition(room_name, DISPATCHED)
+        elif event.event == "participant_joined":
+            if kind == models.ParticipantInfo.Kind.AGENT:
+                # The agent dials as soon as it has joined
+                cls.transition(room_name, RINGING)
+            elif kind == models.ParticipantInfo.Kind.SIP:
+                status = event.participant.attributes.get("sip.callStatus")
+                cls.transition(room_name, ANSWERED if status in (None, "active") else RINGING,
+                               phone_number=event.participant.attributes.get("sip.phoneNumber"))
+        elif event.event == "participant_left" and kind == models.ParticipantInfo.Kind.SIP:
+            reason = models.DisconnectReason.Name(event.participant.disconnect_reason)
+            cls._end(room_name, answered, reason)
+        elif event.event == "room_finished":
+            cls._end(room_name, answered, "room_finished")
+
+    @classmethod
+    def _end(cls, room_name: str, answered: bool, reason: str):
+        if answered:
+            cls.transition(room_name, ENDED, reason=reason)
+        else:
+            # The agent may have recorded the answer since the last reconcile
+            cls._spawn(cls._end_checked(room_name, reason))
+
+    @classmethod
+    async def _end_checked(cls, room_name: str, reason: str):
+        answered = False
+        try:
+            reports = await storage.run_io(DialScheduler.agent_reports, [room_name])
+            answered = bool(reports.get(room_name, {}).get("answered_at"))
+        except Exception as e:
+            print(f"WARNING: Could not read the agent's report for {room_name}: {e}")
+        cls.transition(room_name, ENDED if answered else FAILED, reason=reason)
+
+    @classmethod
+    async def reconcile(cls):
+        """Moves calls forward from what their agents recorded in the dial scheduler."""
+        rooms = [room for room, call in cls._calls.items() if call["state"] in ACTIVE_STATES]
+        if not rooms:
+            return
+        reports = await storage.run_io(DialScheduler.agent_reports, rooms)
+        for room_name, report in reports.items():
+            if report["answered_at"]:
+                cls.transition(room_name, ANSWERED)
+            # The agent's job ended: frees the trunk channel and the number even when the
+            # room_finished webhook is late or never arrives
+            if report["ended_at"]:
+                answered = cls._calls[room_name]["state"] == ANSWERED
+                cls.transition(room_name, ENDED if answered else FAILED, reason="agent_ended")
+
+    # --- Reads ---
+
+    @classmethod
+    def counts(cls) -> Dict:
+        return {
+            "active_calls": sum(cls._counts[state] for state in ACTIVE_STATES),
+            "completed_calls": cls._counts[ENDED],
+            **cls._counts,
+        }
+
+    @classmethod
+    def active_calls(cls) -> List[Dict]:
+        return [cls._public(c) for c in cls._calls.values() if c["state"] in ACTIVE_STATES]
+
+    @classmethod
+    def snapshot(cls) -> Dict:
+        return {"counts": cls.counts(), "calls": [cls._public(c) for c in cls._calls.values()]}
+
+    # --- Persistence ---
+
+    @classmethod
+    def _serialize(cls) -> str:
+        return json.dumps({
+            "saved_at": time.time(),
+            "counts": cls._counts,
+            "webhooks": cls._webhooks,
+            "calls": list(cls._calls.values()),
+        })
+
+    @staticmethod
+    def _load_snapshot() -> Optional[Dict]:
+        if not os.path.exists(SNAPSHOT_PATH):
+            return None
+        with open(SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def _restore(cls, data: Dict):
+        cls._counts = {state: int(data.get("counts", {}).get(state, 0)) for state in STATE_ORDER}
+        cls._calls = OrderedDict((c["room_name"], c) for c in data.get("calls", []))
+        cls._finished = sum(1 for c in cls._calls.values() if c["state"] in TERMINAL_STATES)
+        cls._webhooks = int(data.get("webhooks", 0))
+
+        # Calls that stopped receiving updates while we were down are closed out
+        cls.sweep_stale()
+
+    @classmethod
+    def sweep_stale(cls) -> int:
+        """Fails active calls with no update for STALE_CALL_SECONDS (e.g. a missed room_finished)."""
+        cutoff = time.time() - STALE_CALL_SECONDS
+        stale = [room_name for room_name, call in cls._calls.items()
+                 if call["state"] in ACTIVE_STATES and call.get("updated_ts", 0) < cutoff]
+        for room_name in stale:
+            cls.transition(room_name, FAILED, reason="stale")
+        return len(stale)
+
+    @classmethod
+    async def start(cls):
+        """Rebuilds state from the snapshot (or seeds counters from the store) and starts saving."""
+        try:
+            data = await storage.run_io(cls._load_snapshot)
+        except Exception as e:
+            print(f"WARNING: Could not read call status snapshot: {e}")
+            data = None
+        if data:
+            cls._restore(data)
+        else:
+            cls._counts[ENDED] = await storage.run_io(TranscriptStore.count)
+        if not cls._webhooks:
+            print("WARNING: No LiveKit webhook has been received. Set the LiveKit project's webhook URL to "
+                  "https://<backend>/api/livekit/webhook for live call events; until then calls are only "
+                  "closed (and their trunk channels freed) from the agent's reports, every "
+                  f"{SNAPSHOT_INTERVAL_SECONDS:.0f}s.")
+        cls._snapshot_task = asyncio.create_task(cls._snapshot_loop())
+
+    @classmethod
+    async def _snapshot_loop(cls):
+        last_sweep = time.time()
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)
+            if time.time() - last_sweep >= STALE_SWEEP_SECONDS:
+                last_sweep = time.time()
+                swept = cls.sweep_stale()
+                if swept:
+                    print(f"WARNING: Marked {swept} calls failed after {STALE_CALL_SECONDS:.0f}s without an update")
+            try:
+                await cls.reconcile()
+            except Exception as e:
+                print(f"WARNING: Could not reconcile call status with agent reports: {e}")
+            await cls._save_if_dirty()
+
+    @classmethod
+    async def _save_if_dirty(cls):
+        if not cls._dirty:
+            return
+        cls._dirty = False
+        try:
+            # Serialized on the loop (state is only mutated there), written off it
+            await storage.write_text(SNAPSHOT_PATH, cls._serialize())
+        except Exception as e:
+            cls._dirty = True
+            print(f"WARNING: Could not write call status snapshot: {e}")
+
+    @classmethod
+    async def stop(cls):
+        if cls._snapshot_task:
+            cls._snapshot_task.cancel()
+            cls._snapshot_task = None
+        await cls._save_if_dirty()
@@ -0,0 +1,238 @@
+import os
+import time
+import uuid
+import asyncio
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from backend.services.call_manager import CallManager
+from backend.services.dial_scheduler import OUTSIDE_HOURS
+from backend.services.events import EventBroker
+from backend.services.trunk_admission import load_trunks
+
+# Defaults can be overridden per campaign in the /api/bulk-call request body
+DEFAULT_CONCURRENCY = int(os.getenv("CAMPAIGN_MAX_CONCURRENCY", "10"))
+DEFAULT_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "5"))
+# Finished campaigns kept in memory for /api/campaigns; the oldest are dropped first
+CAMPAIGN_HISTORY = int(os.getenv("CAMPAIGN_HISTORY", "100"))
+
+# Campaign states
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+COMPLETED = "completed"
+
+# Per-number states
+PENDING = "pending"
+DISPATCHING = "dispatching"
+DISPATCHED = "dispatched"
+FAILED = "failed"
+SKIPPED = "cancelled"
+# Refused by the dial scheduler: already in a call, cooling down or retry pending
+DEDUPED = "skipped"
+# Outside calling hours; the dial scheduler dials it when the window opens
+SCHEDULED = "scheduled"
+
+
+class TokenBucket:
+    """
+    Simple asyncio token bucket used to cap the dispatch rate (calls per second).
+    Burst size equals one second worth of tokens.
+    """
+    def __init__(self, rate: float):
+        self.rate = max(rate, 0.01)
+        self.capacity = max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def max_concurrency() -> int:
+    """A campaign cannot usefully dispatch more calls at once than the trunks have channels."""
+    return max(1, sum(channels for _, channels, _ in load_trunks()))
+
+
+class Campaign:
+    def __init__(self, phone_numbers: List[str], concurrency: int, calls_per_second: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.concurrency = min(max(1, concurrency), max_concurrency())
+        self.calls_per_second = calls_per_second
+        self.status = RUNNING
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.entries = [
+            {"phone": phone, "status": PENDING, "details": None, "updated_at": None}
+            for phone in phone_numbers
+        ]
+        self.counts = {PENDING: len(self.entries), DISPATCHING: 0, DISPATCHED: 0, FAILED: 0, SKIPPED: 0,
+                       DEDUPED: 0, SCHEDULED: 0}
+
+        self.queue: asyncio.Queue = asyncio.Queue()
+        for index in range(len(self.entries)):
+            self.queue.put_nowait(index)
+        self.bucket = TokenBucket(calls_per_second)
+        # Set while the campaign may dispatch; cleared on pause
+        self.resume_event = asyncio.Event()
+        self.resume_event.set()
+        self.workers: List[asyncio.Task] = []
+        self.runner: Optional[asyncio.Task] = None
+
+    def set_entry_status(self, index: int, status: str, details: Optional[Dict] = None):
+        entry = self.entries[index]
+        self.counts[entry["status"]] -= 1
+        self.counts[status] += 1
+        entry["status"] = status
+        entry["details"] = details
+        entry["updated_at"] = datetime.now().isoformat()
+        self.notify()
+
+    def notify(self):
+        """Pushes the campaign summary to live console streams (coalesced per campaign)."""
+        EventBroker.publish(f"campaign:{self.id}", "campaign", self.summary())
+
+    def summary(self) -> Dict:
+        return {
+            "campaign_id": self.id,
+            "status": self.status,
+            "concurrency": self.concurrency,
+            "calls_per_second": self.calls_per_second,
+            "total": len(self.entries),
+            "counts": dict(self.counts),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class CampaignManager:
+    """
+    Runs bulk campaigns in the background. Each campaign gets a pool of worker tasks
+    (bounded by `concurrency`) that share a token bucket limiting calls per second.
+    """
+    _campaigns: Dict[str, Campaign] = {}
+
+    @classmethod
+    def create_campaign(cls, phone_numbers: List[str], concurrency: Optional[int] = None,
+                        calls_per_second: Optional[float] = None) -> Campaign:
+        campaign = Campaign(
+            phone_numbers,
+            concurrency or DEFAULT_CONCURRENCY,
+            calls_per_second or DEFAULT_CALLS_PER_SECOND,
+        )
+        cls._campaigns[campaign.id] = campaign
+        cls._evict()
+        campaign.runner = asyncio.create_task(cls._run(campaign))
+        print(f"INFO: Campaign {campaign.id} started with {len(campaign.entries)} numbers "
+              f"(concurrency={campaign.concurrency}, cps={campaign.calls_per_second})")
+        return campaign
+
+    @classmethod
+    def _evict(cls):
+        """Drops the oldest finished campaigns beyond CAMPAIGN_HISTORY."""
+        finished = [c for c in cls._campaigns.values() if c.finished_at]
+        finished.sort(key=lambda c: c.finished_at)
+        for campaign in finished[:max(0, len(finished) - CAMPAIGN_HISTORY)]:
+            del cls._campaigns[campaign.id]
+
+    @classmethod
+    def get_campaign(cls, campaign_id: str) -> Optional[Campaign]:
+        return cls._campaigns.get(campaign_id)
+
+    @classmethod
+    def list_campaigns(cls) -> List[Dict]:
+        campaigns = [c.summary() for c in cls._campaigns.values()]
+        campaigns.sort(key=lambda c: c["created_at"], reverse=True)
+        return campaigns
+
+    @classmethod
+    async def _run(cls, campaign: Campaign):
+        workers = min(campaign.concurrency, len(campaign.entries)) or 1
+        campaign.workers = [asyncio.create_task(cls._worker(campaign)) for _ in range(workers)]
+        await asyncio.gather(*campaign.workers, return_exceptions=True)
+        if campaign.status != CANCELLED:
+            campaign.status = COMPLETED
+        campaign.finished_at = datetime.now().isoformat()
+        campaign.notify()
+        print(f"INFO: Campaign {campaign.id} finished: {campaign.counts}")
+        cls._evict()
+
+    @staticmethod
+    async def _worker(campaign: Campaign):
+        while True:
+            try:
+                index = campaign.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            await campaign.resume_event.wait()
+            await campaign.bucket.acquire()
+            # Pause may have been requested while waiting for a token
+            await campaign.resume_event.wait()
+            if campaign.status == CANCELLED:
+                return
+
+            campaign.set_entry_status(index, DISPATCHING)
+            try:
+                res = await CallManager.dispatch_call(campaign.entries[index]["phone"], campaign_id=campaign.id)
+            except Exception as e:
+                res = {"success": False, "error": str(e)}
+            if "dispatch_id" in res:
+                status = DISPATCHED
+            elif res.get("reason") == OUTSIDE_HOURS:
+                status = SCHEDULED
+            else:
+                status = DEDUPED if res.get("reason") else FAILED
+            campaign.set_entry_status(index, status, res)
+
+    @staticmethod
+    def pause(campaign: Campaign) -> Dict:
+        if campaign.status == RUNNING:
+            campaign.status = PAUSED
+            campaign.resume_event.clear()
+            campaign.notify()
+        return campaign.summary()
+
+    @staticmethod
+    def resume(campaign: Campaign) -> Dict:
+        if campaign.status == PAUSED:
+            campaign.status = RUNNING
+            campaign.resume_event.set()
+            campaign.notify()
+        return campaign.summary()
+
+    @staticmethod
+    def cancel(campaign: Campaign) -> Dict:
+        """
+        Skips every number not yet dispatched. Dispatches already in flight finish and
+        keep their real status; workers stop before taking the next number.
+        """
+        if campaign.status in (RUNNING, PAUSED):
+            campaign.status = CANCELLED
+            # Wake paused workers so they see the cancellation and exit
+            campaign.resume_event.set()
+            for index, entry in enumerate(campaign.entries):
+                if entry["status"] == PENDING:
+                    campaign.set_entry_status(index, SKIPPED)
+            campaign.notify()
+        return campaign.summary()
+
+    @classmethod
+    async def shutdown(cls):
+        """Cancels all running campaigns (called from the FastAPI lifespan)."""
+        runners = []
+        for campaign in cls._campaigns.values():
+            cls.cancel(campaign)
+            if campaign.runner:
+                runners.append(campaign.runner)
+        if runners:
+            await asyncio.gather(*runners, return_exceptions=True)
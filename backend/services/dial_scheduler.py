@@ -0,0 +1,521 @@
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+from backend.services import storage
+
+load_dotenv(".env")
+
+# Shared by the API backend (scheduling) and the agent worker (SIP results)
+DIAL_DB_PATH = os.getenv("DIAL_SCHEDULER_DB_PATH", "dial_scheduler.db")
+# Attempts per number before giving up on no-answer / busy
+MAX_ATTEMPTS = int(os.getenv("DIAL_MAX_ATTEMPTS", "3"))
+# Delay before the first retry; doubles with every further attempt
+RETRY_BACKOFF_SECONDS = float(os.getenv("DIAL_RETRY_BACKOFF_SECONDS", "300"))
+# A number is not dialled again for this long after a call ends (answered or given up; 0 = off)
+COOLDOWN_SECONDS = float(os.getenv("DIAL_COOLDOWN_SECONDS", "0"))
+# Calls that never report an end (e.g. missed webhook) stop blocking their number after this
+IN_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("DIAL_IN_FLIGHT_TIMEOUT_SECONDS", "3600"))
+# Local time window for dialling, e.g. "09:00-21:00" (empty = any time)
+CALLING_HOURS = os.getenv("CALLING_HOURS", "")
+# Timezone of numbers whose country code is not in CALLING_TIMEZONES
+DEFAULT_TIMEZONE = os.getenv("CALLING_TIMEZONE", "Asia/Kolkata")
+# Country code -> timezone, e.g. "1=America/New_York,44=Europe/London"
+CALLING_TIMEZONES = os.getenv("CALLING_TIMEZONES", "")
+RETRY_POLL_SECONDS = float(os.getenv("DIAL_RETRY_POLL_SECONDS", "5"))
+# Retries dispatched at once; each may wait for a trunk channel without holding up the rest
+RETRY_CONCURRENCY = int(os.getenv("DIAL_RETRY_CONCURRENCY", "20"))
+RETRY_BATCH = 100
+# Rooms per query when reading agent reports (SQLite variable limit)
+REPORT_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS numbers (
+    phone_number TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_outcome TEXT,
+    last_attempt_at REAL,
+    not_before REAL,
+    retry_pending INTEGER NOT NULL DEFAULT 0,
+    campaign_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_numbers_retry ON numbers (not_before) WHERE retry_pending = 1;
+
+CREATE TABLE IF NOT EXISTS attempts (
+    room_name TEXT PRIMARY KEY,
+    phone_number TEXT NOT NULL,
+    campaign_id TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    outcome TEXT,
+    sip_status TEXT,
+    answered_at REAL,
+    ended_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_phone ON attempts (phone_number, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_attempts_open ON attempts (started_at) WHERE finished_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_attempts_campaign ON attempts (campaign_id) WHERE campaign_id IS NOT NULL;
+
+-- Written by the agent when a call ends: how long the job ran and how much of it held
+-- an STT/LLM/TTS pipeline
+CREATE TABLE IF NOT EXISTS call_resources (
+    room_name TEXT PRIMARY KEY,
+    job_seconds REAL NOT NULL,
+    ring_seconds REAL,
+    pipeline_seconds REAL NOT NULL,
+    saved_seconds REAL NOT NULL
+);
+"""
+
+# Call outcomes
+ANSWERED = "answered"
+NO_ANSWER = "no_answer"
+BUSY = "busy"
+DECLINED = "declined"
+FAILED = "failed"
+# Picked up by voicemail (answering machine detection in the agent)
+MACHINE = "machine"
+RETRYABLE = (NO_ANSWER, BUSY, MACHINE)
+
+# Reasons a dial is refused
+IN_FLIGHT = "in_flight"
+COOLDOWN = "cooldown"
+RETRY_SCHEDULED = "retry_scheduled"
+OUTSIDE_HOURS = "outside_calling_hours"
+
+SIP_OUTCOMES = {
+    "408": NO_ANSWER, "480": NO_ANSWER, "487": NO_ANSWER,
+    "486": BUSY, "600": BUSY,
+    "603": DECLINED,
+}
+DISCONNECT_OUTCOMES = {"USER_UNAVAILABLE": NO_ANSWER, "USER_REJECTED": BUSY}
+
+
+def _parse_hours(value: str) -> Optional[Tuple[int, int]]:
+    """'09:00-21:00' -> (540, 1260) minutes after midnight; None for any time."""
+    if not value.strip():
+        return None
+    minutes = []
+    for hhmm in value.split("-"):
+        hours, mins = hhmm.strip().split(":")
+        minutes.append(int(hours) * 60 + int(mins))
+    return minutes[0], minutes[1]
+
+
+def _parse_timezones(value: str) -> Dict[str, ZoneInfo]:
+    zones = {}
+    for pair in value.split(","):
+        if "=" in pair:
+            code, zone = pair.split("=", 1)
+            zones[code.strip().lstrip("+")] = ZoneInfo(zone.strip())
+    return zones
+
+
+HOURS = _parse_hours(CALLING_HOURS)
+TIMEZONES = _parse_timezones(CALLING_TIMEZONES)
+DEFAULT_ZONE = ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def new_room_name(phone_number: str) -> str:
+    """Unique room per attempt (random 128-bit suffix), so retries and bulk dials never collide."""
+    return f"call-{phone_number.replace('+', '')}-{uuid.uuid4().hex}"
+
+
+class DialScheduler:
+    """
+    Decides whether and when a number may be dialled.
+
+    In-flight calls are held in memory (phone -> room and room -> phone), so the duplicate
+    check is a dict lookup. Attempt history, cooldowns and pending retries are stored in
+    SQLite keyed by phone number and room, so each check is a single primary-key lookup
+    regardless of campaign size. Call results arrive from CallStatusTracker (webhooks) and,
+    for SIP failures, from the agent, which records the SIP status of the attempt.
+    """
+    _conn: Optional[sqlite3.Connection] = None
+    _lock = threading.Lock()
+    _in_flight: Dict[str, Tuple[str, float]] = {}  # phone -> (room, reserved at)
+    _rooms: Dict[str, str] = {}  # room -> phone
+    _retry_task: Optional[asyncio.Task] = None
+    _retries: Dict[str, asyncio.Task] = {}  # phone -> retry being dispatched
+    _retry_slots: Optional[asyncio.Semaphore] = None
+    _dispatch: Optional[Callable[..., Awaitable[Dict]]] = None
+
+    @classmethod
+    def connection(cls) -> sqlite3.Connection:
+        if cls._conn is None:
+            with cls._lock:
+                if cls._conn is None:
+                    directory = os.path.dirname(DIAL_DB_PATH)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(DIAL_DB_PATH, check_same_thread=False, timeout=30)
+                    conn.row_factory = sqlite3.Row
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(SCHEMA)
+                    cls._migrate(conn)
+                    cls._conn = conn
+        return cls._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Adds columns introduced after a database was created."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(attempts)")}
+        for column in ("answered_at", "ended_at"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE attempts ADD COLUMN {column} REAL")
+
+    # --- Calling hours ---
+
+    @staticmethod
+    def timezone(phone_number: str) -> ZoneInfo:
+        digits = phone_number.lstrip("+")
+        for length in (4, 3, 2, 1):
+            zone = TIMEZONES.get(digits[:length])
+            if zone:
+                return zone
+        return DEFAULT_ZONE
+
+    @classmethod
+    def next_window(cls, phone_number: str, at: float) -> float:
+        """Earliest time >= `at` inside the number's local calling hours."""
+        if HOURS is None:
+            return at
+        start, end = HOURS
+        local = datetime.fromtimestamp(at, cls.timezone(phone_number))
+        minute = local.hour * 60 + local.minute
+        inside = start <= minute < end if start < end else (minute >= start or minute < end)
+        if inside:
+            return at
+        opening = local.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+        if minute >= start:
+            opening += timedelta(days=1)
+        return opening.timestamp()
+
+    # --- Reservations ---
+
+    @classmethod
+    def _reserve(cls, phone_number: str, room_name: str) -> bool:
+        held = cls._in_flight.get(phone_number)
+        if held and time.time() - held[1] < IN_FLIGHT_TIMEOUT_SECONDS:
+            return False
+        if held:
+            print(f"WARNING: Releasing {phone_number} after {IN_FLIGHT_TIMEOUT_SECONDS:.0f}s without a call result")
+            cls._rooms.pop(held[0], None)
+        cls._in_flight[phone_number] = (room_name, time.time())
+        cls._rooms[room_name] = phone_number
+        return True
+
+    @classmethod
+    def _release(cls, room_name: str) -> Optional[str]:
+        phone_number = cls._rooms.pop(room_name, None)
+        if phone_number and cls._in_flight.get(phone_number, ("",))[0] == room_name:
+            del cls._in_flight[phone_number]
+        return phone_number
+
+    @classmethod
+    def _begin(cls, phone_number: str, room_name: str, campaign_id: Optional[str], retry: bool,
+               now: float) -> Optional[Tuple[str, float]]:
+        """Checks cooldown / pending retries and records the attempt. Returns (reason, until) if refused."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            row = conn.execute(
+                "SELECT not_before, retry_pending FROM numbers WHERE phone_number = ?", (phone_number,)
+            ).fetchone()
+            if row and row["not_before"] and row["not_before"] > now:
+                return (RETRY_SCHEDULED if row["retry_pending"] else COOLDOWN), row["not_before"]
+            if row and row["retry_pending"] and not retry:
+                return RETRY_SCHEDULED, row["not_before"]
+            conn.execute(
+                "INSERT INTO numbers (phone_number, last_attempt_at, campaign_id) VALUES (?, ?, ?) "
+                "ON CONFLICT (phone_number) DO UPDATE SET last_attempt_at = excluded.last_attempt_at, "
+                "retry_pending = 0, campaign_id = COALESCE(excluded.campaign_id, campaign_id)",
+                (phone_number, now, campaign_id),
+            )
+            conn.execute(
+                "INSERT INTO attempts (room_name, phone_number, campaign_id, started_at) VALUES (?, ?, ?, ?)",
+                (room_name, phone_number, campaign_id, now),
+            )
+        return None
+
+    @classmethod
+    async def acquire(cls, phone_number: str, campaign_id: Optional[str] = None,
+                      retry: bool = False) -> Dict:
+        """
+        Reserves a new room for dialling `phone_number`. Returns {"room_name"} or, when the
+        number may not be dialled now, {"reason", "not_before"}.
+        """
+        room_name = new_room_name(phone_number)
+        # Reserved before any await, so a concurrent request for the same number sees it
+        if not cls._reserve(phone_number, room_name):
+            return {"reason": IN_FLIGHT, "not_before": None}
+
+        now = time.time()
+        window = cls.next_window(phone_number, now)
+        refused = (OUTSIDE_HOURS, window) if window > now else None
+        if refused is None:
+            try:
+                refused = await storage.run_io(cls._begin, phone_number, room_name, campaign_id, retry, now)
+            except Exception:
+                cls._release(room_name)
+                raise
+        if refused:
+            cls._release(room_name)
+            reason, not_before = refused
+            # Campaign numbers and retries wait for the window to open instead of being dropped
+            if reason == OUTSIDE_HOURS and (campaign_id or retry):
+                await storage.run_io(cls.defer, phone_number, not_before, campaign_id)
+            return {"reason": reason, "not_before": datetime.fromtimestamp(not_before).isoformat() if not_before else None}
+        return {"room_name": room_name}
+
+    @classmethod
+    async def dispatch_failed(cls, room_name: str, retry: bool = False):
+        """
+        The dispatch request itself failed: frees the number without counting an attempt.
+        A failed retry is queued again after the base backoff.
+        """
+        phone_number = cls._release(room_name)
+        if phone_number:
+            await storage.run_io(cls._forget_attempt, room_name, phone_number,
+                                 time.time() + RETRY_BACKOFF_SECONDS if retry else None)
+
+    @classmethod
+    def _forget_attempt(cls, room_name: str, phone_number: str, retry_at: Optional[float]):
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute("DELETE FROM attempts WHERE room_name = ?", (room_name,))
+            if retry_at:
+                conn.execute("UPDATE numbers SET not_before = ?, retry_pending = 1 WHERE phone_number = ?",
+                             (retry_at, phone_number))
+
+    @classmethod
+    def defer(cls, phone_number: str, not_before: float, campaign_id: Optional[str] = None):
+        """Queues a number to be dialled by the retry loop once `not_before` has passed."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute(
+                "INSERT INTO numbers (phone_number, not_before, retry_pending, campaign_id) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (phone_number) DO UPDATE SET not_before = excluded.not_before, retry_pending = 1, "
+                "campaign_id = COALESCE(excluded.campaign_id, campaign_id)",
+                (phone_number, not_before, campaign_id),
+            )
+
+    # --- Results ---
+
+    @classmethod
+    def record_sip_status(cls, room_name: str, sip_status: str):
+        """Called by the agent (blocking) when the outbound SIP call fails."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute("UPDATE attempts SET sip_status = ? WHERE room_name = ?", (sip_status, room_name))
+
+    @classmethod
+    def record_answered(cls, room_name: str, answered_at: Optional[float] = None):
+        """Called by the agent (blocking) when the callee picks up."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute("UPDATE attempts SET answered_at = ? WHERE room_name = ? AND answered_at IS NULL",
+                         (answered_at or time.time(), room_name))
+
+    @classmethod
+    def record_ended(cls, room_name: str):
+        """Called by the agent (blocking) when its job for the call ends, answered or not."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute("UPDATE attempts SET ended_at = ? WHERE room_name = ? AND ended_at IS NULL",
+                         (time.time(), room_name))
+
+    @classmethod
+    def agent_reports(cls, room_names: List[str]) -> Dict[str, Dict]:
+        """
+        What the agents recorded for these rooms: {room: {"answered_at", "ended_at"}} (rooms
+        dialled through the scheduler only).
+        """
+        conn = cls.connection()
+        reports = {}
+        with cls._lock:
+            for offset in range(0, len(room_names), REPORT_BATCH):
+                chunk = room_names[offset:offset + REPORT_BATCH]
+                rows = conn.execute(
+                    f"SELECT room_name, answered_at, ended_at FROM attempts "
+                    f"WHERE room_name IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                reports.update({row["room_name"]: {"answered_at": row["answered_at"], "ended_at": row["ended_at"]}
+                                for row in rows})
+        return reports
+
+    @classmethod
+    def record_answering_machine(cls, room_name: str):
+        """Called by the agent (blocking) when the call was answered by a machine."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute("UPDATE attempts SET outcome = ? WHERE room_name = ? AND finished_at IS NULL",
+                         (MACHINE, room_name))
+
+    @classmethod
+    def record_resources(cls, room_name: str, resources: Dict):
+        """Called by the agent (blocking) with CallResources.summary() when the call ends."""
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO call_resources "
+                "(room_name, job_seconds, ring_seconds, pipeline_seconds, saved_seconds) VALUES (?, ?, ?, ?, ?)",
+                (room_name, resources["job_seconds"], resources.get("ring_seconds"),
+                 resources["pipeline_seconds"], resources["saved_seconds"]),
+            )
+
+    @classmethod
+    def resource_usage(cls, campaign_id: str) -> Dict:
+        """Agent job-seconds of a campaign's calls, split into pipeline time and time saved."""
+        conn = cls.connection()
+        with cls._lock:
+            row = conn.execute(
+                "SELECT COUNT(*) AS calls, SUM(r.job_seconds) AS job_seconds, SUM(r.ring_seconds) AS ring_seconds, "
+                "SUM(r.pipeline_seconds) AS pipeline_seconds, SUM(r.saved_seconds) AS saved_seconds "
+                "FROM attempts a JOIN call_resources r ON r.room_name = a.room_name WHERE a.campaign_id = ?",
+                (campaign_id,),
+            ).fetchone()
+        usage = {key: round(row[key] or 0, 1) if key != "calls" else row[key] for key in row.keys()}
+        usage["saved_ratio"] = round(usage["saved_seconds"] / usage["job_seconds"], 3) if usage["job_seconds"] else None
+        return usage
+
+    @staticmethod
+    def classify(answered: bool, reason: Optional[str], sip_status: Optional[str]) -> str:
+        if answered:
+            return ANSWERED
+        if sip_status:
+            return SIP_OUTCOMES.get(sip_status, FAILED)
+        # The room closed before anyone picked up
+        return DISCONNECT_OUTCOMES.get(reason or "", NO_ANSWER)
+
+    @classmethod
+    def _finish(cls, room_name: str, answered: bool, reason: Optional[str], now: float) -> Optional[Dict]:
+        conn = cls.connection()
+        with cls._lock, conn:
+            attempt = conn.execute(
+                "SELECT phone_number, campaign_id, sip_status, outcome, finished_at, answered_at "
+                "FROM attempts WHERE room_name = ?",
+                (room_name,),
+            ).fetchone()
+            if attempt is None or attempt["finished_at"] is not None:
+                return None
+            phone_number = attempt["phone_number"]
+            # The agent records the answer itself: a SIP participant joins LiveKit while still
+            # dialling, so the webhooks alone rarely show that the call was picked up
+            answered = attempt["answered_at"] is not None or answered
+            # The agent may already know (answering machine); otherwise it follows from the end
+            outcome = attempt["outcome"] or cls.classify(answered, reason, attempt["sip_status"])
+            number = conn.execute(
+                "SELECT attempts FROM numbers WHERE phone_number = ?", (phone_number,)
+            ).fetchone()
+            attempts = (number["attempts"] if number else 0) + 1
+
+            retry = outcome in RETRYABLE and attempts < MAX_ATTEMPTS
+            if retry:
+                not_before = cls.next_window(phone_number, now + RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+            else:
+                not_before = now + COOLDOWN_SECONDS
+                attempts = 0
+
+            conn.execute("UPDATE attempts SET finished_at = ?, outcome = ? WHERE room_name = ?",
+                         (now, outcome, room_name))
+            conn.execute(
+                "UPDATE numbers SET attempts = ?, last_outcome = ?, not_before = ?, retry_pending = ? "
+                "WHERE phone_number = ?",
+                (attempts, outcome, not_before, int(retry), phone_number),
+            )
+        return {"phone_number": phone_number, "outcome": outcome, "sip_status": attempt["sip_status"],
+                "retry": retry, "not_before": not_before}
+
+    @classmethod
+    async def call_finished(cls, room_name: str, answered: bool, reason: Optional[str] = None) -> Optional[Dict]:
+        """Records the end of a call (ended/failed). Returns its outcome, or None if not scheduled here."""
+        cls._release(room_name)
+        result = await storage.run_io(cls._finish, room_name, answered, reason, time.time())
+        if result:
+            when = datetime.fromtimestamp(result["not_before"]).isoformat(timespec="seconds")
+            action = f"retry after {when}" if result["retry"] else f"cooldown until {when}"
+            print(f"INFO: Call to {result['phone_number']} finished ({result['outcome']}), {action}")
+        return result
+
+    # --- Retry loop ---
+
+    @classmethod
+    def _due(cls, now: float, limit: int) -> List[Dict]:
+        conn = cls.connection()
+        with cls._lock:
+            rows = conn.execute(
+                "SELECT phone_number, campaign_id FROM numbers WHERE retry_pending = 1 AND not_before <= ? "
+                "ORDER BY not_before LIMIT ?",
+                (now, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    @classmethod
+    def _restore(cls) -> int:
+        """Re-marks attempts still open from before a restart as in flight."""
+        conn = cls.connection()
+        cutoff = time.time() - IN_FLIGHT_TIMEOUT_SECONDS
+        with cls._lock:
+            rows = conn.execute(
+                "SELECT room_name, phone_number, started_at FROM attempts "
+                "WHERE finished_at IS NULL AND started_at > ?", (cutoff,),
+            ).fetchall()
+        for row in rows:
+            cls._in_flight[row["phone_number"]] = (row["room_name"], row["started_at"])
+            cls._rooms[row["room_name"]] = row["phone_number"]
+        return len(rows)
+
+    @classmethod
+    async def start(cls, dispatch: Callable[..., Awaitable[Dict]]):
+        """Restores in-flight calls and starts dialling due retries through `dispatch`."""
+        cls._dispatch = dispatch
+        restored = await storage.run_io(cls._restore)
+        if restored:
+            print(f"INFO: Dial scheduler restored {restored} in-flight calls")
+        cls._retry_task = asyncio.create_task(cls._retry_loop())
+
+    @classmethod
+    async def _retry_loop(cls):
+        cls._retry_slots = asyncio.Semaphore(max(RETRY_CONCURRENCY, 1))
+        while True:
+            await asyncio.sleep(RETRY_POLL_SECONDS)
+            try:
+                for number in await storage.run_io(cls._due, time.time(), RETRY_BATCH):
+                    phone_number = number["phone_number"]
+                    if phone_number not in cls._retries:
+                        task = asyncio.create_task(cls._retry(phone_number, number["campaign_id"]))
+                        cls._retries[phone_number] = task
+                        task.add_done_callback(lambda _, phone=phone_number: cls._retries.pop(phone, None))
+            except Exception as e:
+                print(f"WARNING: Dial retry loop error: {e}")
+
+    @classmethod
+    async def _retry(cls, phone_number: str, campaign_id: Optional[str]):
+        """Dispatches one due retry; a wait for a trunk channel only holds up this number."""
+        async with cls._retry_slots:
+            try:
+                res = await cls._dispatch(phone_number, campaign_id=campaign_id, retry=True)
+            except Exception as e:
+                res = {"error": str(e)}
+        if "dispatch_id" not in res and not res.get("reason"):
+            print(f"WARNING: Retry of {phone_number} failed: {res.get('error')}")
+
+    @classmethod
+    async def stop(cls):
+        if cls._retry_task:
+            cls._retry_task.cancel()
+            cls._retry_task = None
+        retries = list(cls._retries.values())
+        for task in retries:
+            task.cancel()
+        await asyncio.gather(*retries, return_exceptions=True)
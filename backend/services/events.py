@@ -0,0 +1,56 @@
+import json
+import asyncio
+from collections import OrderedDict
+from typing import Any, List, Set, Tuple
+
+
+class Subscriber:
+    """
+    One live event stream. Undelivered events are coalesced by key (only the latest
+    state of a call or campaign is kept), so a slow client costs memory proportional to
+    the number of distinct keys, not to the event rate.
+    """
+    def __init__(self):
+        self.pending: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self.wake = asyncio.Event()
+
+    def push(self, key: str, event: str, data: Any):
+        self.pending.pop(key, None)
+        self.pending[key] = (event, data)
+        self.wake.set()
+
+    async def next(self, timeout: float) -> List[Tuple[str, Any]]:
+        """Waits up to `timeout` seconds and returns everything pending (possibly nothing)."""
+        if not self.pending:
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        events = list(self.pending.values())
+        self.pending.clear()
+        self.wake.clear()
+        return events
+
+
+class EventBroker:
+    """In-process fan-out of call and campaign updates to server-sent event streams."""
+    _subscribers: Set[Subscriber] = set()
+
+    @classmethod
+    def subscribe(cls) -> Subscriber:
+        subscriber = Subscriber()
+        cls._subscribers.add(subscriber)
+        return subscriber
+
+    @classmethod
+    def unsubscribe(cls, subscriber: Subscriber):
+        cls._subscribers.discard(subscriber)
+
+    @classmethod
+    def publish(cls, key: str, event: str, data: Any):
+        for subscriber in cls._subscribers:
+            subscriber.push(key, event, data)
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import uuid
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# Normalized lead lists are stored here so campaigns can reference them by id
+LEAD_LISTS_DIR = os.getenv("LEAD_LISTS_DIR", "lead_lists")
+# Numbers without an international prefix are assumed to be national numbers of this country
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "91")
+NATIONAL_NUMBER_LENGTH = int(os.getenv("NATIONAL_NUMBER_LENGTH", "10"))
+
+CHUNK_ROWS = 50_000
+MAX_INVALID_REPORT = 100
+PREVIEW_SIZE = 10
+PHONE_COLUMNS = ['phone', 'mobile', 'cell', 'contact', 'number', 'phone_number', 'phonenumber']
+E164_PATTERN = r"\+[1-9]\d{7,14}"
+LEAD_LIST_ID_RE = re.compile(r"^[0-9a-f]{12}$")
+
+
+def _mask(series: pd.Series) -> pd.Series:
+    return series.fillna(False).astype(bool)
+
+
+def normalize_e164(raw: pd.Series, country_code: str = DEFAULT_COUNTRY_CODE) -> pd.Series:
+    """
+    Vectorized E.164 normalization. Strips formatting, converts 00-prefixed and national
+    (optionally 0-prefixed) numbers, and returns NA for anything that is not valid E.164.
+    """
+    s = raw.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)  # Excel floats
+    has_plus = _mask(s.str.startswith("+"))
+    digits = s.str.replace(r"\D", "", regex=True)
+
+    # 00 international prefix
+    double_zero = ~has_plus & _mask(digits.str.startswith("00"))
+    digits = digits.where(~double_zero, digits.str[2:])
+    national = ~has_plus & ~double_zero
+
+    # National trunk prefix (0XXXXXXXXXX)
+    trunk = national & _mask(digits.str.startswith("0")) & (digits.str.len() == NATIONAL_NUMBER_LENGTH + 1)
+    digits = digits.where(~trunk, digits.str[1:])
+
+    if country_code:
+        local = national & (digits.str.len() == NATIONAL_NUMBER_LENGTH)
+        digits = digits.where(~local, country_code + digits)
+
+    e164 = "+" + digits
+    return e164.where(_mask(e164.str.fullmatch(E164_PATTERN)))
+
+
+def _pick_column(columns: List) -> int:
+    for i, col in enumerate(columns):
+        if str(col).strip().lower() in PHONE_COLUMNS:
+            return i
+    # No obvious phone column: take the first column
+    return 0
+
+
+def _iter_csv(path: str) -> Iterator[Tuple[int, pd.Series]]:
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    if not columns:
+        raise ValueError("File has no columns")
+    col = _pick_column(columns)
+    first_row = 2  # Row 1 is the header
+    for chunk in pd.read_csv(path, usecols=[col], dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+        yield first_row, chunk.iloc[:, 0]
+        first_row += len(chunk)
+
+
+def _iter_xlsx(path: str) -> Iterator[Tuple[int, pd.Series]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ValueError("File has no columns")
+        col = _pick_column(list(header))
+
+        first_row, batch = 2, []
+        for row in rows:
+            batch.append(row[col] if col < len(row) else None)
+            if len(batch) >= CHUNK_ROWS:
+                yield first_row, pd.Series(batch, dtype="object")
+                first_row += len(batch)
+                batch = []
+        if batch:
+            yield first_row, pd.Series(batch, dtype="object")
+    finally:
+        workbook.close()
+
+
+class LeadListStore:
+    """
+    Parses uploaded lead sheets chunk by chunk (CSV via pandas chunks, XLSX via openpyxl
+    read-only mode) and stores the deduplicated E.164 list on disk under an id.
+    Parsing is blocking, so callers run ingest()/load() in a worker thread.
+    """
+
+    @staticmethod
+    def _paths(lead_list_id: str) -> Tuple[str, str]:
+        if not LEAD_LIST_ID_RE.match(lead_list_id or ""):
+            raise KeyError(lead_list_id)
+        base = os.path.join(LEAD_LISTS_DIR, lead_list_id)
+        return base + ".txt", base + ".json"
+
+    @classmethod
+    def ingest(cls, path: str, filename: str) -> Dict:
+        """Normalizes the sheet at `path` and stores it. Raises ValueError for unreadable files."""
+        reader = _iter_csv if filename.lower().endswith(".csv") else _iter_xlsx
+        lead_list_id = uuid.uuid4().hex[:12]
+        numbers_path, meta_path = cls._paths(lead_list_id)
+        os.makedirs(LEAD_LISTS_DIR, exist_ok=True)
+
+        seen = set()
+        preview: List[str] = []
+        invalid_rows: List[Dict] = []
+        total = duplicates = invalid = blank = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=LEAD_LISTS_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as out:
+                try:
+                    for first_row, raw in reader(path):
+                        raw = raw.reset_index(drop=True)
+                        is_blank = _mask(raw.astype("string").str.strip() == "") | raw.isna()
+                        normalized = normalize_e164(raw)
+                        bad = normalized.isna() & ~is_blank
+
+                        blank += int(is_blank.sum())
+                        invalid += int(bad.sum())
+                        if len(invalid_rows) < MAX_INVALID_REPORT:
+                            for idx in bad[bad].index[:MAX_INVALID_REPORT - len(invalid_rows)]:
+                                invalid_rows.append({"row": first_row + int(idx), "value": str(raw[idx])})
+
+                        valid = normalized.dropna()
+                        unique = valid.drop_duplicates()
+                        fresh = unique[~unique.isin(seen)].tolist()
+                        duplicates += len(valid) - len(fresh)
+                        seen.update(fresh)
+
+                        if fresh:
+                            out.write("\n".join(fresh) + "\n")
+                        if len(preview) < PREVIEW_SIZE:
+                            preview.extend(fresh[:PREVIEW_SIZE - len(preview)])
+                        total += len(fresh)
+                except ValueError:
+                    raise
+                except Exception as e:
+                    raise ValueError(f"Could not parse file: {e}")
+            os.replace(tmp_path, numbers_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        summary = {
+            "lead_list_id": lead_list_id,
+            "filename": filename,
+            "created_at": datetime.now().isoformat(),
+            "total_count": total,
+            "duplicate_count": duplicates,
+            "invalid_count": invalid,
+            "blank_count": blank,
+            "invalid_rows": invalid_rows,
+            "preview": preview,
+        }
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        return summary
+
+    @classmethod
+    def load(cls, lead_list_id: str) -> List[str]:
+        """Returns the stored numbers. Raises KeyError for unknown ids."""
+        numbers_path, _ = cls._paths(lead_list_id)
+        if not os.path.exists(numbers_path):
+            raise KeyError(lead_list_id)
+        with open(numbers_path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    @classmethod
+    def get_summary(cls, lead_list_id: str) -> Optional[Dict]:
+        try:
+            _, meta_path = cls._paths(lead_list_id)
+        except KeyError:
+            return None
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
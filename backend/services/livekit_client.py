@@ -0,0 +1,68 @@
+import os
+from typing import Optional
+
+import aiohttp
+from dotenv import load_dotenv
+from livekit import api
+
+load_dotenv(".env")
+
+LIVEKIT_URL = os.getenv("LIVEKIT_URL")
+LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
+LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
+
+# Connection pool tuning
+POOL_SIZE = int(os.getenv("LIVEKIT_POOL_SIZE", "100"))
+KEEPALIVE_SECONDS = float(os.getenv("LIVEKIT_KEEPALIVE_SECONDS", "60"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("LIVEKIT_REQUEST_TIMEOUT", "10"))
+
+class LiveKitClient:
+    """
+    Process-wide LiveKitAPI client backed by a keep-alive aiohttp connection pool.
+    The FastAPI lifespan calls start()/close(); scripts can call get() directly and
+    close() when done.
+    """
+    _api: Optional[api.LiveKitAPI] = None
+    _session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    async def start(cls, url: Optional[str] = None, api_key: Optional[str] = None,
+                    api_secret: Optional[str] = None) -> api.LiveKitAPI:
+        if cls._api:
+            return cls._api
+
+        url = url or LIVEKIT_URL
+        api_key = api_key or LIVEKIT_API_KEY
+        api_secret = api_secret or LIVEKIT_API_SECRET
+
+        connector = aiohttp.TCPConnector(
+            limit=POOL_SIZE,
+            keepalive_timeout=KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        cls._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+        )
+        cls._api = api.LiveKitAPI(url=url, api_key=api_key, api_secret=api_secret, session=cls._session)
+        return cls._api
+
+    @classmethod
+    async def get(cls) -> api.LiveKitAPI:
+        """Returns the shared client, creating it on first use."""
+        if not cls._api:
+            await cls.start()
+        return cls._api
+
+    @classmethod
+    def is_configured(cls) -> bool:
+        return bool(LIVEKIT_URL and LIVEKIT_API_KEY and LIVEKIT_API_SECRET)
+
+    @classmethod
+    async def close(cls):
+        if cls._api:
+            await cls._api.aclose()
+        if cls._session and not cls._session.closed:
+            await cls._session.close()
+        cls._api = None
+        cls._session = None
@@ -0,0 +1,160 @@
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple, Dict
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Scope, Receive, Send
+
+# When the API sits behind nginx, recordings can be handed off with X-Accel-Redirect so
+# nginx streams them with sendfile (e.g. RECORDINGS_ACCEL_REDIRECT=/protected-recordings/)
+ACCEL_REDIRECT_PREFIX = os.getenv("RECORDINGS_ACCEL_REDIRECT")
+
+CHUNK_SIZE = 256 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range` header into an inclusive (start, end) pair.
+    Returns None when the header should be ignored (malformed or multiple ranges) and
+    raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class RangeFileResponse(Response):
+    """
+    File response with HTTP Range (206 Partial Content), ETag/Last-Modified conditional
+    requests (304) and zero-copy transfer where the deployment supports it:
+    X-Accel-Redirect to nginx, the ASGI `http.response.zerocopy` extension (sendfile),
+    or `http.response.pathsend`. Otherwise the file is streamed in chunks read off the
+    event loop.
+    """
+    def __init__(self, path: str, media_type: str, filename: Optional[str] = None):
+        super().__init__(media_type=media_type)
+        self.path = path
+        self.filename = filename
+
+    @staticmethod
+    def validators(stat_result: os.stat_result) -> Dict[str, str]:
+        return {
+            "etag": f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        }
+
+    @staticmethod
+    def _not_modified(request_headers: Headers, validators: Dict[str, str], mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or validators["etag"] in tags or f"W/{validators['etag']}" in tags
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise RuntimeError(f"{self.path} is not a file")
+
+        request_headers = Headers(scope=scope)
+        size = stat_result.st_size
+        validators = self.validators(stat_result)
+        headers = {
+            **validators,
+            "accept-ranges": "bytes",
+            "cache-control": "private, max-age=0, must-revalidate",
+            "content-type": self.media_type,
+        }
+        if self.filename:
+            headers["content-disposition"] = f'inline; filename="{self.filename}"'
+
+        if self._not_modified(request_headers, validators, stat_result.st_mtime):
+            await self._start(send, 304, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status, start, end = 200, 0, size - 1
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and size and (if_range is None or if_range in validators.values()):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                headers["content-range"] = f"bytes */{size}"
+                headers["content-length"] = "0"
+                await self._start(send, 416, headers)
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if byte_range:
+                status, (start, end) = 206, byte_range
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        count = end - start + 1 if size else 0
+        headers["content-length"] = str(count)
+
+        if ACCEL_REDIRECT_PREFIX:
+            # nginx re-issues the request internally (including Range) and uses sendfile
+            del headers["content-length"]
+            headers.pop("content-range", None)
+            headers["x-accel-redirect"] = ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + os.path.basename(self.path)
+            await self._start(send, 200, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await self._start(send, status, headers)
+        if scope["method"].upper() == "HEAD" or count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopy" in extensions:
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopy", "file": f, "offset": start, "count": count})
+        elif "http.response.pathsend" in extensions and status == 200:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            await self._stream(send, start, count)
+
+    async def _start(self, send: Send, status: int, headers: Dict[str, str]):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        })
+
+    async def _stream(self, send: Send, offset: int, count: int):
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(offset)
+            while count > 0:
+                chunk = await f.read(min(CHUNK_SIZE, count))
+                if not chunk:
+                    # File shrank while streaming; close the body
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
@@ -0,0 +1,101 @@
+import threading
+from typing import Dict, List, Tuple
+
+from backend.services.transcript_store import TranscriptStore, TURN_STAGE_COLUMNS
+
+# Histogram bucket upper bounds in seconds (voice turns live between ~300ms and a few seconds)
+LATENCY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout."""
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """Bucket-interpolated quantile, the same estimate histogram_quantile() gives."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for bound, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return self.buckets[-1]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LatencyMetrics:
+    """
+    Per-stage voice latency histograms keyed by (stage, provider combination), built from
+    the turn rows the agent writes to the transcript store. Only rows added since the last
+    scrape are read, so a scrape costs O(new turns).
+    """
+    _histograms: Dict[Tuple[str, str], Histogram] = {}
+    _last_id = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def collect(cls):
+        with cls._lock:
+            while True:
+                rows = TranscriptStore.turn_metrics_since(cls._last_id)
+                if not rows:
+                    break
+                for row in rows:
+                    provider = row["provider_key"] or "unknown"
+                    for column in TURN_STAGE_COLUMNS:
+                        if row[column] is None:
+                            continue
+                        stage = column[:-len("_ms")]
+                        key = (stage, provider)
+                        if key not in cls._histograms:
+                            cls._histograms[key] = Histogram()
+                        cls._histograms[key].observe(row[column] / 1000)
+                cls._last_id = rows[-1]["id"]
+
+    @classmethod
+    def p95(cls) -> List[Dict]:
+        """Estimated p95 turn latency per provider combination."""
+        cls.collect()
+        return [
+            {"provider": provider, "turns": h.count, "p95_seconds": round(h.quantile(0.95), 3)}
+            for (stage, provider), h in sorted(cls._histograms.items())
+            if stage == "turn_latency"
+        ]
+
+    @classmethod
+    def render(cls) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        cls.collect()
+        name = "voice_turn_latency_seconds"
+        lines = [
+            f"# HELP {name} Per-turn voice latency by pipeline stage and provider combination.",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, provider), h in sorted(cls._histograms.items()):
+            labels = f'stage="{_escape(stage)}",provider="{_escape(provider)}"'
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
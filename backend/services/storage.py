@@ -0,0 +1,72 @@
+import os
+import json
+import asyncio
+import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+# Bounded pool for blocking file and SQLite I/O, shared by the API and the agent worker
+STORAGE_THREADS = int(os.getenv("STORAGE_THREADS", "4"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=STORAGE_THREADS, thread_name_prefix="storage")
+    return _executor
+
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Runs a blocking storage call on the storage pool so the event loop keeps running."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    Writes `data` to a temp file in the same directory and renames it over `path`, so
+    readers never see a partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_text(path: str, text: str):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+async def write_text(path: str, text: str):
+    await run_io(atomic_write_text, path, text)
+
+
+async def write_json(path: str, data: Any, indent: Optional[int] = 2):
+    await run_io(atomic_write_json, path, data, indent)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
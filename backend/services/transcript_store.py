@@ -0,0 +1,326 @@
+import os
+import json
+import base64
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+# Shared by the agent worker (writer) and the API backend (reader)
+TRANSCRIPTS_DB_PATH = os.getenv("TRANSCRIPTS_DB_PATH", "transcripts.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    job_id TEXT PRIMARY KEY,
+    phone_number TEXT,
+    timestamp TEXT NOT NULL,
+    duration_seconds REAL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calls_timestamp ON calls (timestamp DESC, job_id DESC);
+-- Filtered keyset pages: the filter column, then the full page order (replaces idx_calls_phone)
+DROP INDEX IF EXISTS idx_calls_phone;
+CREATE INDEX IF NOT EXISTS idx_calls_phone_page ON calls (phone_number, timestamp DESC, job_id DESC);
+
+CREATE TABLE IF NOT EXISTS recordings (
+    filename TEXT PRIMARY KEY,
+    job_id TEXT,
+    phone_number TEXT,
+    timestamp TEXT NOT NULL,
+    duration_seconds REAL,
+    size_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_recordings_timestamp ON recordings (timestamp DESC, filename DESC);
+CREATE INDEX IF NOT EXISTS idx_recordings_job ON recordings (job_id);
+DROP INDEX IF EXISTS idx_recordings_phone;
+CREATE INDEX IF NOT EXISTS idx_recordings_phone_page ON recordings (phone_number, timestamp DESC, filename DESC);
+
+CREATE TABLE IF NOT EXISTS turn_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    speech_id TEXT NOT NULL,
+    provider_key TEXT,
+    timestamp TEXT NOT NULL,
+    eou_delay_ms INTEGER,
+    stt_final_ms INTEGER,
+    llm_ttft_ms INTEGER,
+    tts_ttfb_ms INTEGER,
+    turn_latency_ms INTEGER,
+    perceived_latency_ms INTEGER,
+    UNIQUE (job_id, speech_id)
+);
+"""
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+RECORDING_EXTENSIONS = (".wav", ".flac", ".ogg")
+SUMMARY_COLUMNS = "job_id, phone_number, timestamp, duration_seconds, message_count"
+RECORDING_COLUMNS = "filename, job_id, phone_number, timestamp, duration_seconds, size_bytes"
+TURN_STAGE_COLUMNS = ("eou_delay_ms", "stt_final_ms", "llm_ttft_ms", "tts_ttfb_ms",
+                      "turn_latency_ms", "perceived_latency_ms")
+
+
+def encode_cursor(timestamp: str, key: str) -> str:
+    raw = json.dumps([timestamp, key]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Raises ValueError for malformed cursors."""
+    try:
+        timestamp, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(timestamp), str(key)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _normalize_date(value: str, end_of_day: bool = False) -> str:
+    """Accepts YYYY-MM-DD or an ISO datetime and returns the stored timestamp format."""
+    value = value.replace("T", " ")[:19]
+    if len(value) == 10:
+        value += " 23:59:59" if end_of_day else " 00:00:00"
+    return value
+
+
+def _filters(phone_number: Optional[str], date_from: Optional[str], date_to: Optional[str],
+             min_duration: Optional[float]) -> Tuple[List[str], List]:
+    clauses, params = [], []
+    if phone_number:
+        clauses.append("phone_number = ?")
+        params.append(phone_number)
+    if date_from:
+        clauses.append("timestamp >= ?")
+        params.append(_normalize_date(date_from))
+    if date_to:
+        clauses.append("timestamp <= ?")
+        params.append(_normalize_date(date_to, end_of_day=True))
+    if min_duration is not None:
+        clauses.append("duration_seconds >= ?")
+        params.append(min_duration)
+    return clauses, params
+
+
+class TranscriptStore:
+    """
+    SQLite (WAL mode) index of call transcripts and recordings. The full transcript JSON
+    is kept in `data`; summary columns are indexed so listing stays proportional to the
+    page size.
+    """
+    _conn: Optional[sqlite3.Connection] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def connection(cls) -> sqlite3.Connection:
+        if cls._conn is None:
+            with cls._lock:
+                if cls._conn is None:
+                    directory = os.path.dirname(TRANSCRIPTS_DB_PATH)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(TRANSCRIPTS_DB_PATH, check_same_thread=False, timeout=30)
+                    conn.row_factory = sqlite3.Row
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(SCHEMA)
+                    cls._conn = conn
+        return cls._conn
+
+    @staticmethod
+    def _row(record: Dict) -> tuple:
+        return (
+            record["job_id"],
+            record.get("phone_number"),
+            record.get("timestamp") or "",
+            record.get("duration_seconds"),
+            len(record.get("messages") or []),
+            json.dumps(record),
+        )
+
+    @classmethod
+    def save(cls, record: Dict):
+        """Inserts or replaces a transcript record (same shape as the JSON files)."""
+        cls.save_many([record])
+
+    @classmethod
+    def save_many(cls, records: List[Dict]):
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO calls "
+                "(job_id, phone_number, timestamp, duration_seconds, message_count, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [cls._row(record) for record in records],
+            )
+
+    @classmethod
+    def _page(cls, table: str, columns: str, key_column: str, limit: int, cursor: Optional[str],
+              clauses: List[str], params: List) -> Dict:
+        """Keyset pagination over (timestamp, key) in descending order."""
+        clauses, params = list(clauses), list(params)
+        if cursor:
+            clauses.append(f"(timestamp, {key_column}) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT {columns} FROM {table} {where} "
+               f"ORDER BY timestamp DESC, {key_column} DESC LIMIT ?")
+
+        conn = cls.connection()
+        with cls._lock:
+            rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1][key_column])
+        return {"items": rows, "next_cursor": next_cursor}
+
+    @classmethod
+    def query(cls, limit: int = 50, cursor: Optional[str] = None, phone_number: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              min_duration: Optional[float] = None, include_messages: bool = False) -> Dict:
+        """
+        Returns one page of transcripts (newest first) plus `next_cursor`.
+        Without `include_messages` only the indexed summary columns are read.
+        """
+        columns = "data, timestamp, job_id" if include_messages else SUMMARY_COLUMNS
+        clauses, params = _filters(phone_number, date_from, date_to, min_duration)
+        page = cls._page("calls", columns, "job_id", limit, cursor, clauses, params)
+        if include_messages:
+            page["items"] = [json.loads(row["data"]) for row in page["items"]]
+        else:
+            page["items"] = [dict(row) for row in page["items"]]
+        return page
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[Dict]:
+        conn = cls.connection()
+        with cls._lock:
+            row = conn.execute("SELECT data FROM calls WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    @classmethod
+    def save_recording(cls, filename: str, job_id: str, size_bytes: int, phone_number: Optional[str] = None,
+                       duration_seconds: Optional[float] = None, timestamp: Optional[str] = None):
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO recordings "
+                "(filename, job_id, phone_number, timestamp, duration_seconds, size_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, job_id, phone_number, timestamp or datetime.now().strftime(TIMESTAMP_FORMAT),
+                 duration_seconds, size_bytes),
+            )
+
+    @classmethod
+    def query_recordings(cls, limit: int = 50, cursor: Optional[str] = None, phone_number: Optional[str] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None,
+                         min_duration: Optional[float] = None) -> Dict:
+        """Returns one page of recording metadata (newest first) plus `next_cursor`."""
+        clauses, params = _filters(phone_number, date_from, date_to, min_duration)
+        page = cls._page("recordings", RECORDING_COLUMNS, "filename", limit, cursor, clauses, params)
+        page["items"] = [dict(row) for row in page["items"]]
+        return page
+
+    @classmethod
+    def save_turn_metrics(cls, job_id: str, provider_key: Optional[str], turns: List[Dict]):
+        """Stores per-turn latency rows for a call. Re-saving the same turns is a no-op."""
+        if not turns:
+            return
+        rows = []
+        for turn in turns:
+            timestamp = datetime.fromtimestamp(turn.get("timestamp") or 0).strftime(TIMESTAMP_FORMAT)
+            rows.append((job_id, turn["speech_id"], provider_key, timestamp,
+                         *(turn.get(column) for column in TURN_STAGE_COLUMNS)))
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO turn_metrics "
+                f"(job_id, speech_id, provider_key, timestamp, {', '.join(TURN_STAGE_COLUMNS)}) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' * len(TURN_STAGE_COLUMNS))})",
+                rows,
+            )
+
+    @classmethod
+    def turn_metrics_since(cls, last_id: int, limit: int = 5000) -> List[Dict]:
+        """Turn rows with id > last_id in insertion order, for incremental aggregation."""
+        conn = cls.connection()
+        with cls._lock:
+            rows = conn.execute(
+                f"SELECT id, provider_key, {', '.join(TURN_STAGE_COLUMNS)} FROM turn_metrics "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    @classmethod
+    def count(cls) -> int:
+        conn = cls.connection()
+        with cls._lock:
+            return conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+    @classmethod
+    def import_json_dir(cls, directory: str, batch_size: int = 500) -> Dict:
+        """One-shot import of legacy transcripts_json/*.json files. Safe to re-run."""
+        imported, skipped = 0, 0
+        if not os.path.isdir(directory):
+            return {"imported": 0, "skipped": 0}
+
+        batch = []
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                if not record.get("job_id"):
+                    raise ValueError("missing job_id")
+                batch.append(record)
+            except Exception as e:
+                print(f"WARNING: Skipping {filename}: {e}")
+                skipped += 1
+                continue
+
+            if len(batch) >= batch_size:
+                cls.save_many(batch)
+                imported += len(batch)
+                batch = []
+
+        if batch:
+            cls.save_many(batch)
+            imported += len(batch)
+        return {"imported": imported, "skipped": skipped}
+
+    @classmethod
+    def import_recordings_dir(cls, directory: str) -> Dict:
+        """One-shot import of existing recordings (user_{job_id}_{unix_ts}.wav/.flac/.ogg). Safe to re-run."""
+        imported = 0
+        if not os.path.isdir(directory):
+            return {"imported": 0}
+
+        for filename in os.listdir(directory):
+            if not filename.lower().endswith(RECORDING_EXTENSIONS):
+                continue
+            parts = filename.rsplit(".", 1)[0].split("_")
+            # Job ids contain underscores themselves (e.g. AJ_xxx)
+            job_id = "_".join(parts[1:-1]) if len(parts) >= 3 else "unknown"
+            try:
+                timestamp = datetime.fromtimestamp(int(parts[-1])).strftime(TIMESTAMP_FORMAT)
+            except (ValueError, OSError):
+                timestamp = None
+            size_bytes = os.path.getsize(os.path.join(directory, filename))
+            cls.save_recording(filename, job_id, size_bytes, timestamp=timestamp)
+            imported += 1
+
+        # Fill in phone numbers from already indexed transcripts
+        conn = cls.connection()
+        with cls._lock, conn:
+            conn.execute(
+                "UPDATE recordings SET phone_number = "
+                "(SELECT phone_number FROM calls WHERE calls.job_id = recordings.job_id) "
+                "WHERE phone_number IS NULL"
+            )
+        return {"imported": imported}
@@ -0,0 +1,240 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+OUTBOUND_TRUNK_ID = os.getenv("OUTBOUND_TRUNK_ID")
+# Outbound trunks as "trunk_id:channels:weight" separated by commas; channels and weight are
+# optional. Defaults to OUTBOUND_TRUNK_ID with TRUNK_MAX_CHANNELS.
+SIP_TRUNKS = os.getenv("SIP_TRUNKS", "")
+# Simultaneous calls the provider allows on a trunk (ringing and connected legs both count)
+TRUNK_MAX_CHANNELS = int(os.getenv("TRUNK_MAX_CHANNELS", "10"))
+# Lowest ceiling AIMD may back off to
+TRUNK_MIN_CHANNELS = int(os.getenv("TRUNK_MIN_CHANNELS", "1"))
+# Multiplicative decrease on congestion, applied at most once per TRUNK_DECREASE_INTERVAL_SECONDS
+TRUNK_BACKOFF_FACTOR = float(os.getenv("TRUNK_BACKOFF_FACTOR", "0.5"))
+TRUNK_DECREASE_INTERVAL_SECONDS = float(os.getenv("TRUNK_DECREASE_INTERVAL_SECONDS", "5"))
+# Dispatches wait this long for a free channel before failing
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("TRUNK_ADMISSION_TIMEOUT_SECONDS", "300"))
+# Legs whose end was never reported (e.g. missed webhook) are freed after this
+LEG_TIMEOUT_SECONDS = float(os.getenv("TRUNK_LEG_TIMEOUT_SECONDS", "3600"))
+# Window for the answer / congestion rates reported in the metrics
+RATE_WINDOW_SECONDS = 300
+
+# SIP responses and disconnect reasons that mean the trunk (not the callee) refused the call
+CONGESTION_SIP_STATUSES = {"500", "502", "503", "504"}
+CONGESTION_REASONS = {"SIP_TRUNK_FAILURE"}
+
+
+def load_trunks() -> List[Tuple[str, int, float]]:
+    """(trunk_id, channels, weight) for every configured outbound trunk."""
+    trunks = []
+    for entry in SIP_TRUNKS.split(","):
+        parts = [p.strip() for p in entry.split(":")]
+        if not parts[0]:
+            continue
+        channels = int(parts[1]) if len(parts) > 1 and parts[1] else TRUNK_MAX_CHANNELS
+        weight = float(parts[2]) if len(parts) > 2 and parts[2] else 1.0
+        trunks.append((parts[0], channels, weight))
+    if not trunks:
+        trunks.append((OUTBOUND_TRUNK_ID or "", TRUNK_MAX_CHANNELS, 1.0))
+    return trunks
+
+
+class Trunk:
+    def __init__(self, trunk_id: str, channels: int, weight: float):
+        self.id = trunk_id
+        self.channels = channels
+        self.weight = max(weight, 0.01)
+        # AIMD ceiling; starts at the provider's limit and backs off on congestion
+        self.limit = float(channels)
+        self.legs: Dict[str, float] = {}  # room -> admitted at
+        self.last_decrease = 0.0
+        self.outcomes: Deque[Tuple[float, str]] = deque()  # (time, answered|congested|other)
+        self.counts = {"admitted": 0, "answered": 0, "congested": 0, "completed": 0}
+
+    def has_capacity(self) -> bool:
+        return len(self.legs) < max(TRUNK_MIN_CHANNELS, int(self.limit))
+
+    def load(self) -> float:
+        """Weighted load after one more leg; the least loaded trunk gets the next call."""
+        return (len(self.legs) + 1) / self.weight
+
+    def observe(self, kind: str, now: float):
+        self.outcomes.append((now, kind))
+        while self.outcomes and now - self.outcomes[0][0] > RATE_WINDOW_SECONDS:
+            self.outcomes.popleft()
+        self.counts["completed"] += 1
+        if kind == "congested":
+            self.counts["congested"] += 1
+            if now - self.last_decrease >= TRUNK_DECREASE_INTERVAL_SECONDS:
+                self.limit = max(float(TRUNK_MIN_CHANNELS), self.limit * TRUNK_BACKOFF_FACTOR)
+                self.last_decrease = now
+                print(f"WARNING: Trunk {self.id or 'default'} congested, ceiling lowered to {self.limit:.1f}")
+        else:
+            if kind == "answered":
+                self.counts["answered"] += 1
+            # Additive increase: about one channel per ceiling's worth of clean completions
+            self.limit = min(float(self.channels), self.limit + 1 / self.limit)
+
+    def rate(self, kind: str) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return round(sum(1 for _, k in self.outcomes if k == kind) / len(self.outcomes), 3)
+
+    def summary(self) -> Dict:
+        return {
+            "trunk_id": self.id,
+            "weight": self.weight,
+            "channels": self.channels,
+            "limit": round(self.limit, 2),
+            "in_flight": len(self.legs),
+            "utilization": round(len(self.legs) / self.channels, 3) if self.channels else None,
+            "answer_rate": self.rate("answered"),
+            "congestion_rate": self.rate("congested"),
+            **self.counts,
+        }
+
+
+class TrunkAdmission:
+    """
+    Admission control for outbound SIP legs across the configured trunks.
+
+    Each dispatch takes a channel on the least loaded trunk (load weighted by the trunk's
+    weight) whose in-flight legs are under its AIMD ceiling; when every trunk is full the
+    dispatch waits in a FIFO queue. A leg is held from dispatch until the call ends or
+    fails. Congestion responses from a trunk halve its ceiling; every other completion
+    raises it additively, up to the channel count.
+    """
+    _trunks: Optional[Dict[str, Trunk]] = None
+    _rooms: Dict[str, str] = {}  # room -> trunk id
+    _waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+    _queued_total = 0
+
+    @classmethod
+    def trunks(cls) -> Dict[str, Trunk]:
+        if cls._trunks is None:
+            cls._trunks = {tid: Trunk(tid, channels, weight) for tid, channels, weight in load_trunks()}
+        return cls._trunks
+
+    @classmethod
+    def _pick(cls) -> Optional[Trunk]:
+        free = [t for t in cls.trunks().values() if t.has_capacity()]
+        return min(free, key=Trunk.load) if free else None
+
+    @classmethod
+    def _assign(cls, trunk: Trunk, room_name: str):
+        trunk.legs[room_name] = time.time()
+        trunk.counts["admitted"] += 1
+        cls._rooms[room_name] = trunk.id
+
+    @classmethod
+    def _expire_legs(cls):
+        cutoff = time.time() - LEG_TIMEOUT_SECONDS
+        for trunk in cls.trunks().values():
+            for room_name in [r for r, at in trunk.legs.items() if at < cutoff]:
+                print(f"WARNING: Freeing trunk channel of {room_name}; no call result after {LEG_TIMEOUT_SECONDS:.0f}s")
+                cls.release(room_name)
+
+    @classmethod
+    async def admit(cls, room_name: str, timeout: float = ADMISSION_TIMEOUT_SECONDS) -> Optional[str]:
+        """Waits for a free channel and returns the trunk id to dial through (None on timeout)."""
+        trunk = cls._pick()
+        if trunk is None:
+            cls._expire_legs()
+            trunk = cls._pick()
+        if trunk is not None and not cls._waiters:
+            cls._assign(trunk, room_name)
+            return trunk.id
+
+        future = asyncio.get_running_loop().create_future()
+        cls._waiters.append((room_name, future))
+        cls._queued_total += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # A channel may have been handed over while the timeout was being processed
+            return future.result() if future.done() and not future.cancelled() else None
+        except asyncio.CancelledError:
+            # Admitted just as the caller went away: give the channel back
+            if future.done() and not future.cancelled():
+                cls.release(room_name)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+
+    @classmethod
+    def _drain(cls):
+        while cls._waiters:
+            room_name, future = cls._waiters[0]
+            if future.done():
+                cls._waiters.popleft()
+                continue
+            trunk = cls._pick()
+            if trunk is None:
+                return
+            cls._waiters.popleft()
+            cls._assign(trunk, room_name)
+            future.set_result(trunk.id)
+
+    @classmethod
+    def release(cls, room_name: str):
+        trunk_id = cls._rooms.pop(room_name, None)
+        if trunk_id is None:
+            return
+        cls.trunks()[trunk_id].legs.pop(room_name, None)
+        cls._drain()
+
+    @classmethod
+    def call_finished(cls, room_name: str, outcome: Optional[str], sip_status: Optional[str] = None,
+                      reason: Optional[str] = None):
+        """Frees the call's channel and feeds its outcome into the trunk's AIMD ceiling."""
+        trunk_id = cls._rooms.get(room_name)
+        if trunk_id is None:
+            return
+        if sip_status in CONGESTION_SIP_STATUSES or reason in CONGESTION_REASONS:
+            kind = "congested"
+        else:
+            kind = "answered" if outcome == "answered" else "other"
+        cls.trunks()[trunk_id].observe(kind, time.time())
+        cls.release(room_name)
+
+    # --- Metrics ---
+
+    @classmethod
+    def summary(cls) -> Dict:
+        trunks = [t.summary() for t in cls.trunks().values()]
+        return {
+            "queued": sum(1 for _, f in cls._waiters if not f.done()),
+            "queued_total": cls._queued_total,
+            "trunks": trunks,
+        }
+
+    @classmethod
+    def render(cls) -> str:
+        """Prometheus gauges and counters per trunk (appended to /api/metrics)."""
+        summary = cls.summary()
+        metrics = [
+            ("sip_trunk_in_flight", "gauge", "Outbound SIP legs currently held on the trunk.", "in_flight"),
+            ("sip_trunk_channels", "gauge", "Channel limit configured for the trunk.", "channels"),
+            ("sip_trunk_limit", "gauge", "Current adaptive (AIMD) concurrency ceiling.", "limit"),
+            ("sip_trunk_utilization", "gauge", "In-flight legs divided by channels.", "utilization"),
+            ("sip_trunk_admitted_total", "counter", "Calls admitted onto the trunk.", "admitted"),
+            ("sip_trunk_congested_total", "counter", "Calls the trunk refused for capacity.", "congested"),
+        ]
+        lines = []
+        for name, kind, help_text, field in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for trunk in summary["trunks"]:
+                lines.append(f'{name}{{trunk="{trunk["trunk_id"]}"}} {trunk[field] or 0}')
+        lines.append("# HELP sip_trunk_queue_depth Dispatches waiting for a free channel.")
+        lines.append("# TYPE sip_trunk_queue_depth gauge")
+        lines.append(f"sip_trunk_queue_depth {summary['queued']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,108 @@
+"""
+Dispatch latency benchmark: one LiveKitAPI per call (old behaviour) vs the shared
+pooled LiveKitClient.
+
+Runs against a local stub of the LiveKit Twirp API, so no credentials are needed.
+The stub can add a delay on the first request of every new connection to emulate
+TCP/TLS setup to a remote LiveKit region (--handshake-ms).
+
+Usage:
+    python -m benchmarks.bench_dispatch --calls 500 --concurrency 20 --handshake-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiohttp import web
+from livekit import api
+from livekit.protocol import agent_dispatch as proto_dispatch
+
+from backend.services.livekit_client import LiveKitClient
+
+API_KEY = "bench-key"
+API_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def start_stub(handshake_ms: float, latency_ms: float):
+    seen_connections = set()
+
+    async def create_dispatch(request: web.Request):
+        body = proto_dispatch.CreateAgentDispatchRequest.FromString(await request.read())
+        transport = request.transport
+        if transport not in seen_connections:
+            seen_connections.add(transport)
+            await asyncio.sleep(handshake_ms / 1000)
+        await asyncio.sleep(latency_ms / 1000)
+        dispatch = proto_dispatch.AgentDispatch(id=f"AD_{body.room}", agent_name=body.agent_name, room=body.room)
+        return web.Response(body=dispatch.SerializeToString(), content_type="application/protobuf")
+
+    app = web.Application()
+    app.router.add_post("/twirp/livekit.AgentDispatchService/CreateDispatch", create_dispatch)
+    return app, seen_connections
+
+
+async def run(mode: str, url: str, calls: int, concurrency: int):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            start = time.perf_counter()
+            req = api.CreateAgentDispatchRequest(agent_name="transcription-agent", room=f"bench-{mode}-{i}")
+            if mode == "per-call":
+                lk_api = api.LiveKitAPI(url=url, api_key=API_KEY, api_secret=API_SECRET)
+                try:
+                    await lk_api.agent_dispatch.create_dispatch(req)
+                finally:
+                    await lk_api.aclose()
+            else:
+                lk_api = await LiveKitClient.get()
+                await lk_api.agent_dispatch.create_dispatch(req)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    if mode == "pooled":
+        await LiveKitClient.start(url=url, api_key=API_KEY, api_secret=API_SECRET)
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    if mode == "pooled":
+        await LiveKitClient.close()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "calls_per_sec": calls / elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark LiveKit dispatch latency.")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=40, help="Emulated connection setup cost")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Emulated server processing time")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    app, seen_connections = start_stub(args.handshake_ms, args.latency_ms)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    url = f"http://127.0.0.1:{args.port}"
+
+    print(f"{'mode':<10} {'p50 ms':>9} {'p99 ms':>9} {'calls/s':>9} {'conns':>7}")
+    try:
+        for mode in ("per-call", "pooled"):
+            seen_connections.clear()
+            result = await run(mode, url, args.calls, args.concurrency)
+            print(f"{result['mode']:<10} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                  f"{result['calls_per_sec']:>9.1f} {len(seen_connections):>7}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
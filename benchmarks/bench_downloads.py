@@ -0,0 +1,119 @@
+"""
+Concurrent recording download benchmark against a real uvicorn server.
+
+Simulates supervisors scrubbing recordings: each client opens a recording, then
+seeks to a few random positions. Compared modes:
+  full   - every open/seek downloads the whole file (no Range support, old behaviour)
+  range  - the player fetches only the bytes it needs via Range requests (206)
+
+Usage:
+    python -m benchmarks.bench_downloads --files 20 --size-mb 50 --clients 40 --seeks 3
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import aiohttp
+
+RANGE_BYTES = 256 * 1024  # roughly what a browser requests around a seek point
+
+
+async def wait_for_server(url: str, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/api/health") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start")
+
+
+async def scrub(session: aiohttp.ClientSession, url: str, size: int, mode: str, seeks: int, latencies: list):
+    """One client: open the file and seek `seeks` times. Returns bytes transferred."""
+    transferred = 0
+    positions = [0] + [random.randrange(0, size - RANGE_BYTES) for _ in range(seeks)]
+    for position in positions:
+        headers = {}
+        if mode == "range":
+            headers["Range"] = f"bytes={position}-{position + RANGE_BYTES - 1}"
+        start = time.perf_counter()
+        async with session.get(url, headers=headers) as resp:
+            async for chunk in resp.content.iter_chunked(256 * 1024):
+                transferred += len(chunk)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return transferred
+
+
+async def run(base_url: str, filenames: list, size: int, mode: str, clients: int, seeks: int):
+    latencies = []
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        totals = await asyncio.gather(*(
+            scrub(session, f"{base_url}/api/recordings/{random.choice(filenames)}", size, mode, seeks, latencies)
+            for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "requests_per_sec": len(latencies) / elapsed,
+        "mb_transferred": sum(totals) / 1e6,
+        "elapsed_s": elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent recording downloads.")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--size-mb", type=float, default=50, help="Size of each recording (50 MB ~ 9 min of 48 kHz WAV)")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--seeks", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recordings_dir = os.path.join(tmp, "recordings_audio")
+        os.makedirs(recordings_dir)
+        size = int(args.size_mb * 1024 * 1024)
+        filenames = []
+        for i in range(args.files):
+            filename = f"user_bench{i}_{int(time.time())}.wav"
+            with open(os.path.join(recordings_dir, filename), "wb") as f:
+                f.truncate(size)  # sparse file; content doesn't matter
+            filenames.append(filename)
+
+        env = {**os.environ, "RECORDINGS_AUDIO_DIR": recordings_dir,
+               "TRANSCRIPTS_DB_PATH": os.path.join(tmp, "bench.db")}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            await wait_for_server(base_url)
+            print(f"{'mode':<6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'MB sent':>9} {'total s':>8}")
+            for mode in ("full", "range"):
+                r = await run(base_url, filenames, size, mode, args.clients, args.seeks)
+                print(f"{r['mode']:<6} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['requests_per_sec']:>8.1f} "
+                      f"{r['mb_transferred']:>9.1f} {r['elapsed_s']:>8.2f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
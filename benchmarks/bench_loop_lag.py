@@ -0,0 +1,120 @@
+"""
+Event-loop lag under transcript storage load: blocking file/SQLite I/O on the loop
+(old behaviour) vs the storage layer's bounded thread pool with atomic writes.
+
+Each "call" writes a TXT + indented JSON transcript and indexes it in the transcript
+store, while API-style page queries run against the same store. A probe task sleeps
+for --interval-ms and records how late it wakes up; that lateness is what audio
+processing and request handling would see.
+
+Usage:
+    python -m benchmarks.bench_loop_lag --calls 300 --messages 200 --queries 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="bench-loop-lag-")
+os.environ["TRANSCRIPTS_DB_PATH"] = os.path.join(BENCH_DIR, "transcripts.db")
+
+from backend.services import storage  # noqa: E402
+from backend.services.transcript_store import TranscriptStore  # noqa: E402
+
+
+def make_record(i: int, messages: int) -> dict:
+    return {
+        "job_id": f"AJ_bench_{i}",
+        "phone_number": f"+9198{i:08d}",
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "duration_seconds": 60.0,
+        "messages": [
+            {"role": "user" if m % 2 else "assistant", "content": "word " * 40, "timestamp": "2026-01-01T00:00:00"}
+            for m in range(messages)
+        ],
+    }
+
+
+def save_blocking(record: dict, out_dir: str):
+    """What TranscriptManager and CallManager used to do directly on the event loop."""
+    with open(os.path.join(out_dir, f"call_{record['job_id']}.txt"), "w", encoding="utf-8") as f:
+        for msg in record["messages"]:
+            f.write(f"{msg['role']}: {msg['content']}\n")
+    with open(os.path.join(out_dir, f"call_{record['job_id']}.json"), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    TranscriptStore.save(record)
+
+
+async def save_async(record: dict, out_dir: str):
+    text = "".join(f"{msg['role']}: {msg['content']}\n" for msg in record["messages"])
+    await storage.write_text(os.path.join(out_dir, f"call_{record['job_id']}.txt"), text)
+    await storage.write_json(os.path.join(out_dir, f"call_{record['job_id']}.json"), record)
+    await storage.run_io(TranscriptStore.save, record)
+
+
+async def probe(interval: float, lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run(mode: str, calls: int, messages: int, queries: int, interval_ms: float, concurrency: int):
+    out_dir = os.path.join(BENCH_DIR, mode)
+    os.makedirs(out_dir, exist_ok=True)
+    records = [make_record(i, messages) for i in range(calls)]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def save(record):
+        async with sem:
+            if mode == "blocking":
+                save_blocking(record, out_dir)
+                await asyncio.sleep(0)
+            else:
+                await save_async(record, out_dir)
+
+    async def query(_):
+        async with sem:
+            if mode == "blocking":
+                TranscriptStore.query(limit=50, include_messages=True)
+                await asyncio.sleep(0)
+            else:
+                await storage.run_io(TranscriptStore.query, limit=50, include_messages=True)
+
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(interval_ms / 1000, lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(save(r) for r in records), *(query(q) for q in range(queries)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    lags.sort()
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+    print(f"{mode:>9}: total {elapsed:6.2f}s  loop lag p50 {statistics.median(lags) if lags else 0:7.2f}ms  "
+          f"p99 {p99:7.2f}ms  max {max(lags) if lags else 0:7.2f}ms  ({len(lags)} probes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=200, help="messages per transcript")
+    parser.add_argument("--queries", type=int, default=300, help="page queries running alongside")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    try:
+        for mode in ("blocking", "async"):
+            asyncio.run(run(mode, args.calls, args.messages, args.queries, args.interval_ms, args.concurrency))
+    finally:
+        storage.shutdown()
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
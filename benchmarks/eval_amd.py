@@ -0,0 +1,184 @@
+"""
+Offline evaluation of answering machine detection over saved call recordings.
+
+Runs agent_services.amd (Silero VAD plus the cadence classifier, exactly as on a live call)
+over the start of each recording and compares the verdict with a label. Labels come from
+--labels (CSV of "file,label" with label human or machine), or else from the name of the
+file's parent directory (recordings_audio/human/..., recordings_audio/machine/...).
+Unlabelled files are classified and counted but not scored.
+
+The caller is channel 0 of stereo recordings (RECORDING_CHANNELS=stereo). Mono mixdowns
+work too: the agent stays silent while the classifier listens. Thresholds are read from
+the AMD_* environment variables, so they can be tuned per run:
+    AMD_GREETING_SECONDS=2.2 python -m benchmarks.eval_amd --recordings-dir recordings_audio
+"""
+import os
+import csv
+import json
+import wave
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from livekit import rtc
+from livekit.plugins import silero
+
+from agent_services import amd
+from benchmarks.load_test import percentiles
+
+# PyAV ships with livekit-agents; only needed for FLAC / Opus recordings
+try:
+    import av
+except ImportError:
+    av = None
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+FRAME_MS = 20
+
+
+def read_audio(path: str, channel: int, seconds: float) -> Tuple[np.ndarray, int]:
+    """First `seconds` of one channel as int16 samples, with the file's sample rate."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            if f.getsampwidth() != 2:
+                raise ValueError("only 16-bit PCM WAV is supported")
+            rate, channels = f.getframerate(), f.getnchannels()
+            pcm = np.frombuffer(f.readframes(int(rate * seconds)), dtype=np.int16)
+        return pcm.reshape(-1, channels)[:, min(channel, channels - 1)].copy(), rate
+
+    if av is None:
+        raise ValueError("PyAV is needed to read compressed recordings")
+    with av.open(path) as container:
+        stream = container.streams.audio[0]
+        rate = stream.rate
+        resampler = av.AudioResampler(format="s16p", rate=rate)
+        chunks: List[np.ndarray] = []
+        total = 0
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                data = out.to_ndarray()
+                chunks.append(data[min(channel, len(data) - 1)])
+                total += data.shape[1]
+            if total >= rate * seconds:
+                break
+    pcm = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+    return pcm[:int(rate * seconds)].astype(np.int16), rate
+
+
+async def frames_16k(pcm: np.ndarray, rate: int):
+    """20 ms frames resampled to the classifier's rate."""
+    resampler = rtc.AudioResampler(rate, amd.SAMPLE_RATE, num_channels=1)
+    step = rate * FRAME_MS // 1000
+    for offset in range(0, len(pcm), step):
+        chunk = pcm[offset:offset + step]
+        for frame in resampler.push(rtc.AudioFrame(chunk.tobytes(), rate, 1, len(chunk))):
+            yield frame
+    for frame in resampler.flush():
+        yield frame
+
+
+def load_labels(path: Optional[str]) -> Dict[str, str]:
+    if not path:
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {os.path.normpath(row[0].strip()): row[1].strip().lower()
+                for row in csv.reader(f) if len(row) >= 2 and not row[0].startswith("#")}
+
+
+def label_for(path: str, root: str, labels: Dict[str, str]) -> Optional[str]:
+    for key in (os.path.normpath(os.path.relpath(path, root)), os.path.basename(path)):
+        if key in labels:
+            return labels[key]
+    parent = os.path.basename(os.path.dirname(path)).lower()
+    return parent if parent in (amd.HUMAN, amd.MACHINE) else None
+
+
+def find_recordings(root: str) -> List[str]:
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        # Per-track WAVs are only kept for debugging; the mixdown has the same caller audio
+        if os.path.basename(dirpath) == "tracks":
+            continue
+        paths += [os.path.join(dirpath, name) for name in filenames if name.endswith(AUDIO_EXTENSIONS)]
+    return sorted(paths)
+
+
+async def evaluate(paths: List[str], root: str, labels: Dict[str, str], channel: int) -> List[Dict]:
+    vad = silero.VAD.load()
+    # A little past the decision limit, so "max_time" is reachable
+    seconds = max(amd.AMD_MAX_SECONDS, amd.AMD_INITIAL_SILENCE_SECONDS) + 1
+    rows = []
+    for path in paths:
+        row = {"file": os.path.relpath(path, root), "label": label_for(path, root, labels)}
+        try:
+            pcm, rate = read_audio(path, channel, seconds)
+            classifier = await amd.classify(frames_16k(pcm, rate), vad)
+            row.update({("detected" if k == "label" else k): v for k, v in classifier.result.items()})
+        except Exception as e:
+            row["error"] = str(e)
+        rows.append(row)
+        print(f"{row['file']:<60} {row['label'] or '-':<8} {row.get('detected', row.get('error', '')):<8}")
+    return rows
+
+
+def score(rows: List[Dict]) -> Dict:
+    scored = [r for r in rows if r["label"] in (amd.HUMAN, amd.MACHINE) and "error" not in r]
+    # "unsure" starts the conversation, so it counts as human
+    predicted = {id(r): amd.MACHINE if r["detected"] == amd.MACHINE else amd.HUMAN for r in scored}
+    matrix = {actual: {detected: sum(1 for r in scored if r["label"] == actual and r["detected"] == detected)
+                       for detected in (amd.HUMAN, amd.MACHINE, amd.UNSURE)}
+              for actual in (amd.HUMAN, amd.MACHINE)}
+    machines = [r for r in scored if r["label"] == amd.MACHINE]
+    flagged = [r for r in scored if predicted[id(r)] == amd.MACHINE]
+    humans = [r for r in scored if r["label"] == amd.HUMAN]
+    return {
+        "files": len(rows),
+        "scored": len(scored),
+        "errors": sum(1 for r in rows if "error" in r),
+        "confusion": matrix,
+        "accuracy": round(sum(1 for r in scored if predicted[id(r)] == r["label"]) / len(scored), 3)
+        if scored else None,
+        "machine_recall": round(sum(1 for r in machines if predicted[id(r)] == amd.MACHINE) / len(machines), 3)
+        if machines else None,
+        "machine_precision": round(sum(1 for r in flagged if r["label"] == amd.MACHINE) / len(flagged), 3)
+        if flagged else None,
+        # The expensive mistake: hanging up on a person
+        "humans_hung_up": round(sum(1 for r in humans if predicted[id(r)] == amd.MACHINE) / len(humans), 3)
+        if humans else None,
+        "reasons": {reason: sum(1 for r in rows if r.get("reason") == reason)
+                    for reason in sorted({r["reason"] for r in rows if "reason" in r})},
+        "decision_ms": percentiles([r["decision_ms"] for r in rows if "decision_ms" in r]),
+        "thresholds": {
+            "max_seconds": amd.AMD_MAX_SECONDS,
+            "initial_silence_seconds": amd.AMD_INITIAL_SILENCE_SECONDS,
+            "greeting_seconds": amd.AMD_GREETING_SECONDS,
+            "max_words": amd.AMD_MAX_WORDS,
+            "after_greeting_silence_seconds": amd.AMD_AFTER_GREETING_SILENCE_SECONDS,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings-dir", default=os.getenv("RECORDINGS_AUDIO_DIR", "recordings_audio"))
+    parser.add_argument("--labels", default=None, help="CSV of file,label (human or machine)")
+    parser.add_argument("--channel", type=int, default=0, help="Caller channel in multi-channel recordings")
+    parser.add_argument("--output", default=None, help="Write per-file results and scores as JSON")
+    args = parser.parse_args()
+
+    paths = find_recordings(args.recordings_dir)
+    if not paths:
+        print(f"No recordings found under {args.recordings_dir}")
+        return
+    rows = asyncio.run(evaluate(paths, args.recordings_dir, load_labels(args.labels), args.channel))
+    report = score(rows)
+    print(json.dumps({k: v for k, v in report.items() if k != "thresholds"}, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": rows, **report}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
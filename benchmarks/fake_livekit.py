@@ -0,0 +1,224 @@
+"""
+Local stand-in for the LiveKit server API used by load tests.
+
+Implements the Twirp endpoints the backend and agent call:
+  - AgentDispatchService/CreateDispatch (CallManager.dispatch_call)
+  - SIP/CreateSIPParticipant (the agent dialling out; rings for --ring-ms, then answers
+    or fails with a SIP status according to --answer-rate; with --channels, calls beyond
+    that many simultaneous legs per trunk fail with 503 like a congested provider)
+  - RoomService/DeleteRoom (hang-up)
+
+When --webhook-url is set, it posts signed room/participant webhooks for each call, the
+same ones LiveKit sends to POST /api/livekit/webhook. A harness can pass on_dispatch to
+hand each dispatch to a simulated agent job.
+
+Run standalone and point the backend at it:
+    python -m benchmarks.fake_livekit --port 7880 --webhook-url http://127.0.0.1:8000/api/livekit/webhook
+    LIVEKIT_URL=http://127.0.0.1:7880 LIVEKIT_API_KEY=bench-key \
+        LIVEKIT_API_SECRET=bench-secret-bench-secret-bench-secret uvicorn backend.main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import random
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+from google.protobuf.json_format import MessageToJson
+from livekit import api
+from livekit.protocol import agent_dispatch as proto_dispatch
+from livekit.protocol import models, room as proto_room, sip as proto_sip
+
+API_KEY = "bench-key"
+API_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+class FakeLiveKit:
+    def __init__(self, ring_ms: float = 3000, jitter_ms: float = 500, answer_rate: float = 1.0,
+                 api_latency_ms: float = 5, webhook_url: Optional[str] = None, channels: int = 0,
+                 api_key: str = API_KEY, api_secret: str = API_SECRET,
+                 on_dispatch: Optional[Callable[[proto_dispatch.AgentDispatch], None]] = None):
+        self.ring_ms = ring_ms
+        self.jitter_ms = jitter_ms
+        self.answer_rate = answer_rate
+        self.api_latency_ms = api_latency_ms
+        self.webhook_url = webhook_url
+        self.channels = channels  # simultaneous legs per trunk, 0 = unlimited
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+        self.on_dispatch = on_dispatch
+        self.counts = {"dispatches": 0, "sip_calls": 0, "answered": 0, "unanswered": 0, "congested": 0,
+                       "rooms_deleted": 0, "webhooks": 0, "webhook_errors": 0}
+        self._sip_rooms: Dict[str, str] = {}  # room -> SIP participant identity
+        self._trunk_legs: Dict[str, Dict[str, str]] = {}  # trunk -> room -> SIP identity
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._webhook_tasks = set()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/twirp/livekit.AgentDispatchService/CreateDispatch", self._create_dispatch)
+        app.router.add_post("/twirp/livekit.SIP/CreateSIPParticipant", self._create_sip_participant)
+        app.router.add_post("/twirp/livekit.RoomService/DeleteRoom", self._delete_room)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7880) -> str:
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._webhook_tasks:
+            await asyncio.gather(*self._webhook_tasks, return_exceptions=True)
+        if self._session:
+            await self._session.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _delay(self, ms: float):
+        if ms > 0:
+            await asyncio.sleep(max(0.0, ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+    @staticmethod
+    def _reply(message) -> web.Response:
+        return web.Response(body=message.SerializeToString(), content_type="application/protobuf")
+
+    # --- Twirp endpoints ---
+
+    async def _create_dispatch(self, request: web.Request):
+        body = proto_dispatch.CreateAgentDispatchRequest.FromString(await request.read())
+        await asyncio.sleep(self.api_latency_ms / 1000)
+        dispatch = proto_dispatch.AgentDispatch(
+            id=f"AD_{uuid.uuid4().hex[:12]}", agent_name=body.agent_name, room=body.room, metadata=body.metadata,
+        )
+        self.counts["dispatches"] += 1
+        if self.on_dispatch:
+            self.on_dispatch(dispatch)
+        self._webhook("room_started", body.room)
+        self._webhook("participant_joined", body.room, models.ParticipantInfo(
+            identity=f"agent-{dispatch.id}", kind=models.ParticipantInfo.Kind.AGENT))
+        return self._reply(dispatch)
+
+    async def _create_sip_participant(self, request: web.Request):
+        body = proto_sip.CreateSIPParticipantRequest.FromString(await request.read())
+        self.counts["sip_calls"] += 1
+        await asyncio.sleep(self.api_latency_ms / 1000)
+        legs = self._trunk_legs.setdefault(body.sip_trunk_id, {})
+        if self.channels and len(legs) >= self.channels:
+            self.counts["congested"] += 1
+            self._webhook("room_finished", body.room_name)
+            return web.json_response({
+                "code": "unavailable",
+                "msg": "sip status: 503: Service Unavailable",
+                "meta": {"sip_status_code": "503", "sip_status": "Service Unavailable"},
+            }, status=503)
+        legs[body.room_name] = body.participant_identity
+        if body.wait_until_answered:
+            await self._delay(self.ring_ms)
+        if random.random() >= self.answer_rate:
+            legs.pop(body.room_name, None)
+            self.counts["unanswered"] += 1
+            self._webhook("room_finished", body.room_name)
+            return web.json_response({
+                "code": "unavailable",
+                "msg": "sip status: 480: Temporarily Unavailable",
+                "meta": {"sip_status_code": "480", "sip_status": "Temporarily Unavailable"},
+            }, status=400)
+
+        self.counts["answered"] += 1
+        self._sip_rooms[body.room_name] = body.participant_identity
+        self._webhook("participant_joined", body.room_name, self._sip_participant(body.participant_identity, body.sip_call_to))
+        return self._reply(proto_sip.SIPParticipantInfo(
+            participant_id=f"PA_{uuid.uuid4().hex[:12]}",
+            participant_identity=body.participant_identity,
+            room_name=body.room_name,
+            sip_call_id=f"SCL_{uuid.uuid4().hex[:12]}",
+        ))
+
+    async def _delete_room(self, request: web.Request):
+        body = proto_room.DeleteRoomRequest.FromString(await request.read())
+        await asyncio.sleep(self.api_latency_ms / 1000)
+        self.counts["rooms_deleted"] += 1
+        identity = self._sip_rooms.pop(body.room, None)
+        for legs in self._trunk_legs.values():
+            legs.pop(body.room, None)
+        if identity:
+            participant = self._sip_participant(identity)
+            participant.disconnect_reason = models.DisconnectReason.ROOM_DELETED
+            self._webhook("participant_left", body.room, participant)
+        self._webhook("room_finished", body.room)
+        return self._reply(proto_room.DeleteRoomResponse())
+
+    @staticmethod
+    def _sip_participant(identity: str, phone_number: Optional[str] = None) -> models.ParticipantInfo:
+        attributes = {"sip.callStatus": "active"}
+        if phone_number:
+            attributes["sip.phoneNumber"] = phone_number
+        return models.ParticipantInfo(identity=identity, kind=models.ParticipantInfo.Kind.SIP, attributes=attributes)
+
+    # --- Webhooks ---
+
+    def _webhook(self, event: str, room_name: str, participant: Optional[models.ParticipantInfo] = None):
+        if not self.webhook_url:
+            return
+        payload = api.WebhookEvent(
+            event=event,
+            room=models.Room(name=room_name),
+            id=f"EV_{uuid.uuid4().hex[:12]}",
+            created_at=int(time.time()),
+        )
+        if participant is not None:
+            payload.participant.CopyFrom(participant)
+        task = asyncio.create_task(self._post_webhook(MessageToJson(payload)))
+        self._webhook_tasks.add(task)
+        task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _post_webhook(self, body: str):
+        digest = base64.b64encode(hashlib.sha256(body.encode()).digest()).decode()
+        token = api.AccessToken(self.api_key, self.api_secret).with_sha256(digest).to_jwt()
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        try:
+            async with self._session.post(self.webhook_url, data=body, headers={
+                "Authorization": token, "Content-Type": "application/webhook+json",
+            }) as resp:
+                self.counts["webhooks"] += 1
+                if resp.status != 200:
+                    self.counts["webhook_errors"] += 1
+        except aiohttp.ClientError:
+            self.counts["webhook_errors"] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=7880)
+    parser.add_argument("--ring-ms", type=float, default=3000, help="Time until the callee answers")
+    parser.add_argument("--jitter-ms", type=float, default=500)
+    parser.add_argument("--answer-rate", type=float, default=1.0, help="Fraction of calls that are answered")
+    parser.add_argument("--channels", type=int, default=0, help="Simultaneous legs per trunk (0 = unlimited)")
+    parser.add_argument("--webhook-url", default=None)
+    args = parser.parse_args()
+
+    server = FakeLiveKit(ring_ms=args.ring_ms, jitter_ms=args.jitter_ms, answer_rate=args.answer_rate,
+                         webhook_url=args.webhook_url, channels=args.channels)
+    url = await server.start(port=args.port)
+    print(f"Fake LiveKit API on {url} (key={server.api_key}, secret={server.api_secret})")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(server.counts)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,583 @@
+"""
+End-to-end load test with no paid providers and no real calls.
+
+The backend (uvicorn, in-process) talks to a fake LiveKit API (benchmarks.fake_livekit),
+which rings and answers SIP calls and sends signed webhooks back to the backend. Every
+dispatch becomes a simulated agent job in one of --agent-procs worker processes. A job
+mirrors agent.entrypoint: it builds the providers with STT/LLM/TTS_PROVIDER=fake
+(agent_services.fake_providers), runs an AgentSession with the real Silero VAD, turn
+metrics and transcript journal, dials out through the fake SIP API, talks to a synthetic
+caller for --call-seconds, hangs up and saves the transcript. Room audio is replaced by
+a synthetic caller input and a real-time paced output sink, since there is no SFU.
+
+Phases:
+  1. dispatch   --dispatch-calls direct CallManager.dispatch_call() calls (API throughput)
+  2. bulk call  POST /api/bulk-call with --calls numbers; each dispatch runs a simulated call
+
+Results (dispatch throughput, turn latency per stage, memory per call, event-loop lag of
+the backend and agent processes) are printed and written as JSON to --output, tagged
+with the git commit, so runs can be compared between commits.
+
+Usage:
+    python -m benchmarks.load_test --calls 200 --calls-per-second 20 --call-seconds 30
+    FAKE_LLM_TTFT_MS=600 FAKE_JITTER_MS=200 python -m benchmarks.load_test --calls 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import psutil
+
+from benchmarks.fake_livekit import API_KEY, API_SECRET, FakeLiveKit
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_MS // 1000
+UTTERANCE_SECONDS = 1.5
+# Caller pause after the agent finishes speaking (and after answering) before talking
+CALLER_PAUSE_SECONDS = 0.8
+LAG_PROBE_SECONDS = 0.05
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 1)
+
+    return {"count": len(ordered), "avg": round(statistics.mean(ordered), 1),
+            "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(ordered[-1], 1)}
+
+
+def speech_like(seconds: float, f0: float = 140) -> np.ndarray:
+    """Voiced, syllable-modulated harmonic signal that Silero VAD classifies as speech."""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.1 * np.sin(2 * np.pi * 0.7 * t))) / SAMPLE_RATE
+    signal = sum(np.sin(k * phase) / k * (1.0 if k in (3, 4, 5, 14, 15, 16) else 0.3) for k in range(1, 25))
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+    return (signal / np.abs(signal).max() * envelope * 8000).astype(np.int16)
+
+
+async def probe_loop_lag(lags: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_SECONDS)
+        lags.append((time.perf_counter() - started - LAG_PROBE_SECONDS) * 1000)
+
+
+# --- Agent side (runs in worker processes) ---
+
+def _agent_io():
+    """Builds the caller/sink classes lazily so the parent process never imports livekit.agents."""
+    from livekit import rtc
+    from livekit.agents.voice import io
+
+    utterance = speech_like(UTTERANCE_SECONDS)
+    silence = np.zeros(SAMPLES_PER_FRAME, dtype=np.int16).tobytes()
+
+    class CallerAudio(io.AudioInput):
+        """20 ms frames in real time: silence, plus an utterance each time it is the caller's turn."""
+        def __init__(self):
+            super().__init__(label="synthetic-caller")
+            self.started: Optional[float] = None
+            self.frame = 0
+            self.speak_at: Optional[float] = None
+            self.offset = 0
+
+        def take_turn(self):
+            self.speak_at = time.perf_counter() + CALLER_PAUSE_SECONDS
+
+        async def __anext__(self):
+            if self.started is None:
+                self.started = time.perf_counter()
+            due = self.started + self.frame * FRAME_MS / 1000
+            self.frame += 1
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            data = silence
+            if self.speak_at is not None and time.perf_counter() >= self.speak_at:
+                data = utterance[self.offset:self.offset + SAMPLES_PER_FRAME].tobytes()
+                self.offset += SAMPLES_PER_FRAME
+                if self.offset >= len(utterance):
+                    self.offset, self.speak_at = 0, None
+            return rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLES_PER_FRAME)
+
+    class PacedAudioOutput(io.AudioOutput):
+        """Accepts agent audio as fast as it is produced and reports playout in real time."""
+        def __init__(self):
+            super().__init__(label="paced-sink", capabilities=io.AudioOutputCapabilities(pause=False))
+            self.pushed = 0.0
+            self.capture_start = 0.0
+            self.interrupted = asyncio.Event()
+            self.playout: Optional[asyncio.Task] = None
+
+        async def capture_frame(self, frame: rtc.AudioFrame):
+            await super().capture_frame(frame)
+            if not self.pushed:
+                self.capture_start = time.monotonic()
+                self.on_playback_started(created_at=time.time())
+            self.pushed += frame.duration
+
+        def flush(self):
+            super().flush()
+            if self.pushed:
+                self.interrupted.clear()
+                self.playout = asyncio.create_task(self._play())
+
+        def clear_buffer(self):
+            if self.pushed:
+                self.interrupted.set()
+
+        async def _play(self):
+            remaining = self.capture_start + self.pushed - time.monotonic()
+            try:
+                await asyncio.wait_for(self.interrupted.wait(), max(0.0, remaining))
+                interrupted = True
+            except asyncio.TimeoutError:
+                interrupted = False
+            position = min(self.pushed, time.monotonic() - self.capture_start)
+            self.pushed = 0.0
+            self.on_playback_finished(playback_position=position, interrupted=interrupted)
+
+    return CallerAudio, PacedAudioOutput
+
+
+async def simulated_job(job: Dict, vad, lk_api, call_seconds: float, io_classes) -> Dict:
+    """agent.entrypoint with the room replaced by synthetic audio IO."""
+    from types import SimpleNamespace
+    from livekit import api
+    from livekit.agents import AgentSession
+    import agent
+    from agent_services.journal import TranscriptJournal
+    from agent_services.turn_metrics import TurnMetricsCollector
+    from agent_services.worker_load import CallResources
+    from backend.services import storage
+    from backend.services.dial_scheduler import DialScheduler
+
+    CallerAudio, PacedAudioOutput = io_classes
+    job_accepted_at = time.perf_counter()
+    metadata = json.loads(job["metadata"])
+    phone_number = metadata["phone_number"]
+    resources = CallResources(job["id"])
+    journal = TranscriptJournal(job["id"], phone_number)
+    journal.start()
+
+    caller = CallerAudio()
+    call_metrics: Dict = {}
+    answered_at: Optional[float] = None
+    session = turn_metrics = None
+
+    async def start_session():
+        # As in agent.entrypoint, the pipeline is only built once the callee answers
+        nonlocal session, turn_metrics
+        started_at = time.monotonic()
+        plugins = agent._build_stt(), agent._build_llm(), agent._build_tts()
+        session = AgentSession(stt=plugins[0], llm=plugins[1], tts=plugins[2], vad=vad)
+        turn_metrics = TurnMetricsCollector("/".join(f"{p.provider}:{p.model}" for p in plugins))
+        turn_metrics.attach(session)
+        journal.attach(session)
+
+        @session.on("agent_state_changed")
+        def on_agent_state_changed(ev):
+            if ev.new_state == "listening":
+                caller.take_turn()
+            if ev.new_state == "speaking" and "job_to_first_audio_ms" not in call_metrics:
+                call_metrics["job_to_first_audio_ms"] = round((time.perf_counter() - job_accepted_at) * 1000)
+
+        session.input.audio = caller
+        session.output.audio = PacedAudioOutput()
+        await session.start(agent=agent.OutboundAssistant())
+        resources.pipeline_started(started_at)
+
+    call_started_at = datetime.now()
+    error = None
+    resources.dialing()
+    try:
+        await lk_api.sip.create_sip_participant(api.CreateSIPParticipantRequest(
+            room_name=job["room"],
+            sip_trunk_id=metadata.get("sip_trunk_id") or "ST_loadtest",
+            sip_call_to=phone_number,
+            participant_identity=f"sip_{phone_number}",
+            wait_until_answered=True,
+        ))
+        call_started_at = datetime.now()
+        answered_at = time.perf_counter()
+        await storage.run_io(DialScheduler.record_answered, job["room"])
+        resources.dial_ended()
+        await start_session()
+        caller.take_turn()
+        await asyncio.sleep(call_seconds)
+    except Exception as e:
+        resources.dial_ended()
+        error = str(e)
+        sip_status = getattr(e, "metadata", None) and e.metadata.get("sip_status_code")
+        if sip_status:
+            await storage.run_io(DialScheduler.record_sip_status, job["room"], sip_status)
+
+    try:
+        await lk_api.room.delete_room(api.DeleteRoomRequest(room=job["room"]))
+    except Exception as e:
+        error = error or str(e)
+    if session is not None:
+        await session.aclose()
+
+    resources.release()
+    call_metrics["resources"] = resources.summary()
+    await storage.run_io(DialScheduler.record_ended, job["room"])
+    await storage.run_io(DialScheduler.record_resources, job["room"], call_metrics["resources"])
+    if turn_metrics:
+        call_metrics["latency"] = turn_metrics.summary()
+    turns = turn_metrics.turns() if turn_metrics else []
+    await agent.TranscriptManager.save_transcript(
+        SimpleNamespace(job=SimpleNamespace(id=job["id"])), session, phone_number, call_started_at,
+        call_metrics, turns, journal,
+    )
+    return {"answered": answered_at is not None, "error": error, "turns": turns,
+            "job_to_first_audio_ms": call_metrics.get("job_to_first_audio_ms"),
+            "resources": call_metrics["resources"]}
+
+
+async def agent_worker(jobs, call_seconds: float, livekit_url: str) -> Dict:
+    import logging
+    from livekit import api
+    from livekit.plugins import silero
+    import agent  # noqa: F401  (import cost is part of the worker baseline)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ("outbound-agent", "livekit", "livekit.agents"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    vad = silero.VAD.load()
+    io_classes = _agent_io()
+    lk_api = api.LiveKitAPI(url=livekit_url, api_key=API_KEY, api_secret=API_SECRET)
+    proc = psutil.Process()
+    baseline_rss = proc.memory_info().rss
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(lags, stop))
+    active = 0
+    peak = {"active": 0, "rss": baseline_rss}
+
+    async def sample_memory():
+        while not stop.is_set():
+            peak["rss"] = max(peak["rss"], proc.memory_info().rss)
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.create_task(sample_memory())
+    loop = asyncio.get_running_loop()
+    tasks = []
+
+    async def run(job):
+        nonlocal active
+        active += 1
+        peak["active"] = max(peak["active"], active)
+        try:
+            return await simulated_job(job, vad, lk_api, call_seconds, io_classes)
+        except Exception as e:
+            return {"answered": False, "error": f"job crashed: {e}", "turns": []}
+        finally:
+            active -= 1
+
+    while True:
+        job = await loop.run_in_executor(None, jobs.get)
+        if job is None:
+            break
+        tasks.append(asyncio.create_task(run(job)))
+
+    results = await asyncio.gather(*tasks)
+    stop.set()
+    await asyncio.gather(probe, sampler)
+    await lk_api.aclose()
+    return {
+        "calls": results,
+        "loop_lag_ms": lags,
+        "baseline_rss": baseline_rss,
+        "peak_rss": peak["rss"],
+        "peak_active": peak["active"],
+    }
+
+
+def agent_process(jobs, results, call_seconds: float, livekit_url: str, work_dir: str):
+    os.chdir(work_dir)
+    try:
+        results.put(asyncio.run(agent_worker(jobs, call_seconds, livekit_url)))
+    except Exception as e:
+        results.put({"error": str(e)})
+
+
+# --- Backend side (this process) ---
+
+@contextlib.contextmanager
+def quiet():
+    """The backend prints a few lines per dispatch; keep them out of the benchmark output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+async def run_dispatch_phase(calls: int, concurrency: int) -> Dict:
+    from backend.services.call_manager import CallManager
+
+    latencies, errors = [], 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            started = time.perf_counter()
+            res = await CallManager.dispatch_call(f"+9170{i:08d}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += "dispatch_id" not in res
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {"calls": calls, "concurrency": concurrency, "calls_per_sec": round(calls / elapsed, 1),
+            "errors": errors, "latency_ms": percentiles(latencies)}
+
+
+async def run_bulk_phase(base_url: str, calls: int, concurrency: int, calls_per_second: float) -> Dict:
+    import httpx
+
+    numbers = [f"+9180{i:08d}" for i in range(calls)]
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        started = time.perf_counter()
+        resp = await client.post("/api/bulk-call", json={
+            "phone_numbers": numbers, "concurrency": concurrency, "calls_per_second": calls_per_second,
+        })
+        resp.raise_for_status()
+        campaign_id = resp.json()["campaign_id"]
+        while True:
+            await asyncio.sleep(0.5)
+            campaign = (await client.get(f"/api/campaigns/{campaign_id}")).json()
+            if campaign["status"] != "running":
+                break
+        elapsed = time.perf_counter() - started
+    return {"calls": calls, "concurrency": concurrency, "calls_per_second_limit": calls_per_second,
+            "seconds": round(elapsed, 2), "calls_per_sec": round(calls / elapsed, 1), "counts": campaign["counts"]}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def run(args, work_dir: str) -> Dict:
+    import uvicorn
+    from backend.main import app
+    from agent_services import fake_providers
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    queues = [ctx.Queue() for _ in range(args.agent_procs)]
+    livekit_url = f"http://127.0.0.1:{args.livekit_port}"
+    procs = [ctx.Process(target=agent_process, args=(q, results, args.call_seconds, livekit_url, work_dir))
+             for q in queues]
+    for p in procs:
+        p.start()
+
+    # Dispatches from the bulk phase are handed to the agent processes round-robin
+    handed_out = {"count": 0, "enabled": False}
+
+    def on_dispatch(dispatch):
+        if handed_out["enabled"]:
+            queues[handed_out["count"] % len(queues)].put(
+                {"id": dispatch.id, "room": dispatch.room, "metadata": dispatch.metadata})
+            handed_out["count"] += 1
+
+    fake = FakeLiveKit(ring_ms=args.ring_ms, jitter_ms=args.ring_jitter_ms, answer_rate=args.answer_rate,
+                       channels=args.fake_trunk_channels, on_dispatch=on_dispatch)
+    await fake.start(port=args.livekit_port)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.api_port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(lags, stop))
+
+    print(f"Phase 1: {args.dispatch_calls} direct dispatches (concurrency {args.dispatch_concurrency})")
+    with quiet():
+        dispatch = await run_dispatch_phase(args.dispatch_calls, args.dispatch_concurrency)
+    print(f"  {dispatch['calls_per_sec']} calls/s, p95 {dispatch['latency_ms']['p95']} ms, {dispatch['errors']} errors")
+
+    print(f"Phase 2: bulk call with {args.calls} simulated calls across {args.agent_procs} agent process(es)")
+    # Phase 1 rooms never get an agent; only phase 2 calls are reported through webhooks
+    handed_out["enabled"] = True
+    fake.webhook_url = f"http://127.0.0.1:{args.api_port}/api/livekit/webhook"
+    started = time.perf_counter()
+    with quiet():
+        bulk = await run_bulk_phase(f"http://127.0.0.1:{args.api_port}", args.calls, args.campaign_concurrency,
+                                    args.calls_per_second)
+    print(f"  dispatched in {bulk['seconds']} s ({bulk['calls_per_sec']} calls/s): {bulk['counts']}")
+    for q in queues:
+        q.put(None)
+
+    loop = asyncio.get_running_loop()
+    with quiet():
+        outcomes = [await loop.run_in_executor(None, results.get) for _ in procs]
+    calls_elapsed = time.perf_counter() - started
+    for p in procs:
+        await loop.run_in_executor(None, p.join)
+    await asyncio.sleep(1)  # let the last webhooks land
+
+    stop.set()
+    await probe
+    import httpx
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.api_port}") as client:
+        call_status = (await client.get("/api/call-status")).json()
+        trunks = (await client.get("/api/trunks")).json()
+    server.should_exit = True
+    await server_task
+    await fake.stop()
+
+    errors = [o["error"] for o in outcomes if "error" in o]
+    workers = [o for o in outcomes if "error" not in o]
+    calls = [c for w in workers for c in w["calls"]]
+    turns = [t for c in calls for t in c["turns"]]
+    resources = [c["resources"] for c in calls if c.get("resources")]
+    from agent_services.turn_metrics import STAGES
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "host": {"cpus": psutil.cpu_count(), "memory_gb": round(psutil.virtual_memory().total / 2**30, 1)},
+        "config": {
+            **vars(args),
+            "fake_stt_latency_ms": fake_providers.STT_LATENCY_MS,
+            "fake_llm_ttft_ms": fake_providers.LLM_TTFT_MS,
+            "fake_llm_tokens_per_second": fake_providers.LLM_TOKENS_PER_SECOND,
+            "fake_tts_ttfb_ms": fake_providers.TTS_TTFB_MS,
+            "fake_jitter_ms": fake_providers.JITTER_MS,
+        },
+        "dispatch": dispatch,
+        "bulk_call": bulk,
+        "calls": {
+            "simulated": len(calls),
+            "answered": sum(1 for c in calls if c["answered"]),
+            "errors": sum(1 for c in calls if c["error"]),
+            "sample_errors": sorted({c["error"] for c in calls if c["error"]})[:5],
+            "worker_errors": errors,
+            "peak_concurrent": sum(w["peak_active"] for w in workers),
+            "seconds": round(calls_elapsed, 1),
+            "completed_per_min": round(len(calls) / calls_elapsed * 60, 1),
+            "job_to_first_audio_ms": percentiles([c["job_to_first_audio_ms"] for c in calls
+                                                  if c.get("job_to_first_audio_ms") is not None]),
+        },
+        # Pipelines are taken on answer; saved = job-seconds spent without one
+        "resources": {
+            "job_seconds": round(sum(r["job_seconds"] for r in resources), 1),
+            "pipeline_seconds": round(sum(r["pipeline_seconds"] for r in resources), 1),
+            "saved_seconds": round(sum(r["saved_seconds"] for r in resources), 1),
+            "pipeline_start_ms": percentiles([r["pipeline_start_ms"] for r in resources
+                                              if r["pipeline_start_ms"] is not None]),
+        },
+        "turn_latency_ms": {stage: percentiles([t[stage] for t in turns if stage in t]) for stage in STAGES},
+        "memory": {
+            "agent_process_baseline_mb": round(statistics.mean(w["baseline_rss"] for w in workers) / 2**20, 1)
+            if workers else None,
+            "agent_process_peak_mb": round(max(w["peak_rss"] for w in workers) / 2**20, 1) if workers else None,
+            # Growth over the process baseline at peak, divided by the calls it was running
+            "per_call_mb": percentiles([(w["peak_rss"] - w["baseline_rss"]) / w["peak_active"] / 2**20
+                                        for w in workers if w["peak_active"]]),
+        },
+        "loop_lag_ms": {
+            "backend": percentiles(lags),
+            "agent": percentiles([v for w in workers for v in w["loop_lag_ms"]]),
+        },
+        "fake_livekit": fake.counts,
+        "call_status": call_status,
+        "trunks": trunks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100, help="Simulated calls placed through /api/bulk-call")
+    parser.add_argument("--call-seconds", type=float, default=30, help="Talk time per answered call")
+    parser.add_argument("--calls-per-second", type=float, default=20)
+    parser.add_argument("--campaign-concurrency", type=int, default=50)
+    parser.add_argument("--dispatch-calls", type=int, default=500)
+    parser.add_argument("--dispatch-concurrency", type=int, default=50)
+    parser.add_argument("--agent-procs", type=int, default=max(1, (psutil.cpu_count() or 2) - 1))
+    parser.add_argument("--ring-ms", type=float, default=3000)
+    parser.add_argument("--ring-jitter-ms", type=float, default=1000)
+    parser.add_argument("--answer-rate", type=float, default=0.8)
+    parser.add_argument("--trunk-channels", type=int, default=0,
+                        help="Channels the backend admits on the trunk; phase 1 dispatches hold theirs for the "
+                             "whole run (default: enough for every call)")
+    parser.add_argument("--fake-trunk-channels", type=int, default=0,
+                        help="Legs the fake provider accepts before answering 503 (0 = unlimited)")
+    parser.add_argument("--api-port", type=int, default=8790)
+    parser.add_argument("--livekit-port", type=int, default=8791)
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args()
+
+    # Everything the backend and agents write goes to a scratch directory. Set before the
+    # backend is imported (module-level config) and inherited by the agent processes.
+    work_dir = tempfile.mkdtemp(prefix="load-test-")
+    os.environ.update({
+        "LIVEKIT_URL": f"http://127.0.0.1:{args.livekit_port}",
+        "LIVEKIT_API_KEY": API_KEY,
+        "LIVEKIT_API_SECRET": API_SECRET,
+        "STT_PROVIDER": "fake",
+        "LLM_PROVIDER": "fake",
+        "TTS_PROVIDER": "fake",
+        "TRANSCRIPTS_DB_PATH": os.path.join(work_dir, "transcripts.db"),
+        "TRANSCRIPTS_JOURNAL_DIR": os.path.join(work_dir, "transcripts_journal"),
+        "CALL_STATUS_SNAPSHOT_PATH": os.path.join(work_dir, "call_status_snapshot.json"),
+        "LEAD_LISTS_DIR": os.path.join(work_dir, "lead_lists"),
+        "DIAL_SCHEDULER_DB_PATH": os.path.join(work_dir, "dial_scheduler.db"),
+        # Dial every number once, whatever the time of day
+        "CALLING_HOURS": "",
+        "DIAL_MAX_ATTEMPTS": "1",
+        # Phase 1 rooms never report an end, so by default the trunk has room for all of them
+        "SIP_TRUNKS": f"ST_loadtest:{args.trunk_channels or args.dispatch_calls + args.calls}",
+        "TRUNK_ADMISSION_TIMEOUT_SECONDS": "60",
+    })
+    report = asyncio.run(run(args, work_dir))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    calls = report["calls"]
+    print(f"\nCalls: {calls['simulated']} simulated, {calls['answered']} answered, {calls['errors']} errors, "
+          f"peak {calls['peak_concurrent']} concurrent")
+    print(f"{'stage':<22} {'p50':>8} {'p95':>8} {'max':>8}")
+    for stage, stats in report["turn_latency_ms"].items():
+        if stats:
+            print(f"{stage:<22} {stats['p50']:>8} {stats['p95']:>8} {stats['max']:>8}")
+    res = report["resources"]
+    print(f"Pipeline-seconds: {res['pipeline_seconds']} of {res['job_seconds']} job-seconds "
+          f"({res['saved_seconds']} saved by starting on answer)")
+    per_call = report["memory"]["per_call_mb"]
+    print(f"Memory per call: {per_call['p50'] if per_call else '-'} MB (p50); agent process baseline "
+          f"{report['memory']['agent_process_baseline_mb']} MB")
+    for trunk in report["trunks"]["trunks"]:
+        print(f"Trunk {trunk['trunk_id']}: ceiling {trunk['limit']}/{trunk['channels']}, "
+              f"{trunk['congested']} congested, queued {report['trunks']['queued_total']}")
+    for side, stats in report["loop_lag_ms"].items():
+        if stats:
+            print(f"Loop lag ({side}): p99 {stats['p99']} ms, max {stats['max']} ms")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Local soak test: how many concurrent calls one box sustains before audio degrades.
+
+Each simulated call runs in its own process, like an agent job: it loads the Silero VAD,
+then pushes 20 ms 48 kHz frames in real time through the VAD stream and the call recorder's
+WAV writer. Frames that are pushed late mean the job's event loop or the CPU cannot keep
+up; that is when callers hear gaps and turn detection slows down.
+
+Concurrency is stepped up until the p95 frame lateness exceeds --budget-ms. Provider
+(STT/LLM/TTS) work happens remotely and is not simulated.
+
+Usage:
+    python -m benchmarks.soak_agent --start 2 --step 2 --max-calls 32 --duration 20
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import psutil
+
+SAMPLE_RATE = 48000
+FRAME_MS = 20
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def synthetic_frame(index: int) -> np.ndarray:
+    """2 s of noisy "speech" followed by 1 s of near silence, repeating."""
+    speaking = (index * FRAME_MS) % 3000 < 2000
+    amplitude = 3000 if speaking else 30
+    return (np.random.randn(SAMPLES_PER_FRAME) * amplitude).astype(np.int16)
+
+
+async def simulate_call(duration: float, start_at: float, out_dir: str) -> dict:
+    from livekit import rtc
+    from livekit.plugins import silero
+    from agent_services.recording import WavStreamWriter
+
+    vad = silero.VAD.load()
+    stream = vad.stream()
+    writer = WavStreamWriter(os.path.join(out_dir, f"soak_{os.getpid()}.wav"), SAMPLE_RATE)
+    frames = [synthetic_frame(i) for i in range(int(3000 / FRAME_MS))]
+    vad_events = 0
+
+    async def consume():
+        nonlocal vad_events
+        async for _ in stream:
+            vad_events += 1
+
+    consumer = asyncio.create_task(consume())
+    # All calls start together once every process has loaded its model
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+
+    lateness = []
+    started = time.perf_counter()
+    total = int(duration * 1000 / FRAME_MS)
+    for i in range(total):
+        due = started + i * FRAME_MS / 1000
+        now = time.perf_counter()
+        if due > now:
+            await asyncio.sleep(due - now)
+        lateness.append((time.perf_counter() - due) * 1000)
+        pcm = frames[i % len(frames)]
+        stream.push_frame(rtc.AudioFrame(pcm.tobytes(), SAMPLE_RATE, 1, SAMPLES_PER_FRAME))
+        writer.write(pcm.tobytes())
+
+    stream.end_input()
+    await asyncio.wait_for(consumer, timeout=10)
+    writer.close()
+    lateness.sort()
+    return {
+        "p95_ms": lateness[int(len(lateness) * 0.95)],
+        "max_ms": lateness[-1],
+        "vad_events": vad_events,
+    }
+
+
+def call_process(duration: float, start_at: float, out_dir: str, results):
+    try:
+        results.put(asyncio.run(simulate_call(duration, start_at, out_dir)))
+    except Exception as e:
+        results.put({"error": str(e)})
+
+
+def run_level(calls: int, duration: float, warmup: float, out_dir: str) -> dict:
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    start_at = time.time() + warmup
+    procs = [ctx.Process(target=call_process, args=(duration, start_at, out_dir, results)) for _ in range(calls)]
+    for p in procs:
+        p.start()
+
+    cpu, mem = [], []
+    time.sleep(max(0.0, start_at - time.time()))
+    psutil.cpu_percent(interval=None)
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        cpu.append(psutil.cpu_percent(interval=1))
+        mem.append(psutil.virtual_memory().percent)
+
+    outcomes = [results.get(timeout=duration + warmup + 60) for _ in procs]
+    for p in procs:
+        p.join()
+
+    errors = [o["error"] for o in outcomes if "error" in o]
+    ok = [o for o in outcomes if "error" not in o]
+    return {
+        "calls": calls,
+        "p95_ms": max((o["p95_ms"] for o in ok), default=float("inf")),
+        "max_ms": max((o["max_ms"] for o in ok), default=float("inf")),
+        "cpu": statistics.mean(cpu) if cpu else 0.0,
+        "mem": max(mem) if mem else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=int, default=2)
+    parser.add_argument("--step", type=int, default=2)
+    parser.add_argument("--max-calls", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=15, help="seconds allowed for processes to load VAD")
+    parser.add_argument("--budget-ms", type=float, default=20, help="max acceptable p95 frame lateness")
+    args = parser.parse_args()
+
+    print(f"{psutil.cpu_count()} CPUs, {psutil.virtual_memory().total / 2**30:.1f} GiB RAM")
+    print(f"{'calls':>5} {'p95 late':>9} {'max late':>9} {'cpu %':>6} {'mem %':>6}  result")
+    sustained = 0
+    with tempfile.TemporaryDirectory(prefix="soak-") as out_dir:
+        for calls in range(args.start, args.max_calls + 1, args.step):
+            level = run_level(calls, args.duration, args.warmup, out_dir)
+            passed = not level["errors"] and level["p95_ms"] <= args.budget_ms
+            print(f"{calls:>5} {level['p95_ms']:>7.1f}ms {level['max_ms']:>7.1f}ms "
+                  f"{level['cpu']:>6.1f} {level['mem']:>6.1f}  {'ok' if passed else 'DEGRADED'}"
+                  + (f" ({len(level['errors'])} errors: {level['errors'][0]})" if level["errors"] else ""))
+            if not passed:
+                break
+            sustained = calls
+
+    print(f"\nSustained {sustained} concurrent calls within a {args.budget_ms:.0f} ms p95 frame budget.")
+    if sustained:
+        workers = max(1, psutil.cpu_count() // int(os.getenv("CPUS_PER_AGENT_WORKER", "2")))
+        print(f"With {workers} worker(s) per host, set AGENT_MAX_JOBS to about {max(1, sustained // workers)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,20 +9,46 @@ import {
     Filter
 } from 'lucide-react';
 
+const PAGE_SIZE = 50;
+
 export default function CallLogsPage() {
     const [transcripts, setTranscripts] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [filter, setFilter] = useState('');
+    const [phoneFilter, setPhoneFilter] = useState(''); // applied server-side
+    const [expanded, setExpanded] = useState({}); // job_id -> messages
+
+    const loadPage = async (cursor = null) => {
+        setLoading(true);
+        const params = { limit: PAGE_SIZE };
+        if (cursor) params.cursor = cursor;
+        if (phoneFilter) params.phone_number = phoneFilter;
+        const data = await AgentService.fetchTranscripts(params);
+        setTranscripts(prev => cursor ? [...prev, ...data.items] : data.items);
+        setNextCursor(data.next_cursor);
+        setLoading(false);
+    };
 
     useEffect(() => {
-        async function loadData() {
-            setLoading(true);
-            const data = await AgentService.fetchTranscripts();
-            setTranscripts(data);
-            setLoading(false);
+        loadPage();
+    }, [phoneFilter]);
+
+    const toggleMessages = async (jobId) => {
+        if (expanded[jobId]) {
+            const { [jobId]: _, ...rest } = expanded;
+            setExpanded(rest);
+            return;
         }
-        loadData();
-    }, []);
+        const data = await AgentService.fetchTranscript(jobId);
+        setExpanded(prev => ({ ...prev, [jobId]: data?.messages || [] }));
+    };
+
+    // Exact phone numbers are filtered on the server; anything else filters the loaded page
+    const handleSearch = (e) => {
+        if (e.key !== 'Enter') return;
+        setPhoneFilter(filter.startsWith('+') ? filter.trim() : '');
+    };
 
     const filteredTranscripts = transcripts.filter(t =>
         t.phone_number?.includes(filter) || t.job_id?.includes(filter)
@@ -36,7 +62,7 @@ export default function CallLogsPage() {
                     <p className="text-slate-500 text-sm">Review conversations and agent performance.</p>
                 </div>
                 <button
-                    onClick={() => window.location.reload()}
+                    onClick={() => loadPage()}
                     className="text-sm text-blue-600 hover:underline flex items-center gap-1"
                 >
                     <Loader2 size={14} className={loading && "animate-spin"} /> Refresh
@@ -49,9 +75,10 @@ export default function CallLogsPage() {
                     <Search className="absolute left-3 top-1/2 -translate-y-1/2 text-slate-400" size={18} />
                     <input
                         type="text"
-                        placeholder="Search by phone or Job ID..."
+                        placeholder="Search by phone or Job ID (Enter on +number searches all calls)..."
                         value={filter}
                         onChange={(e) => setFilter(e.target.value)}
+                        onKeyDown={handleSearch}
                         className="w-full pl-10 pr-4 py-2 rounded-lg border border-slate-200 focus:ring-2 focus:ring-blue-500 outline-none transition-all"
                     />
                 </div>
@@ -60,7 +87,7 @@ export default function CallLogsPage() {
                 </button>
             </div>
 
-            {loading ? (
+            {loading && transcripts.length === 0 ? (
                 <div className="text-center py-20 text-slate-400">
                     <Loader2 className="animate-spin mx-auto mb-2" size={32} />
                     Loading logs...
@@ -86,20 +113,29 @@ export default function CallLogsPage() {
                                     </div>
                                     <div className="flex items-center gap-4 text-xs text-slate-400">
                                         <span className="flex items-center gap-1"><Clock size={12} /> {t.timestamp || "Just now"}</span>
-                                        <span>{t.messages?.length || 0} messages</span>
+                                        <span>{t.message_count || 0} messages</span>
+                                        {t.duration_seconds != null && <span>{Math.round(t.duration_seconds)}s</span>}
                                     </div>
                                 </div>
 
                                 {/* Status Badge (Mock) */}
-                                <span className={`px-2 py-1 rounded text-xs font-medium ${t.messages?.length > 5 ? 'bg-green-100 text-green-700' : 'bg-yellow-100 text-yellow-700'
+                                <span className={`px-2 py-1 rounded text-xs font-medium ${t.message_count > 5 ? 'bg-green-100 text-green-700' : 'bg-yellow-100 text-yellow-700'
                                     }`}>
-                                    {t.messages?.length > 5 ? 'Completed' : 'Short Call'}
+                                    {t.message_count > 5 ? 'Completed' : 'Short Call'}
                                 </span>
                             </div>
 
-                            {/* Transcript Preview */}
+                            <button
+                                onClick={() => toggleMessages(t.job_id)}
+                                className="text-xs text-blue-600 hover:underline mb-2"
+                            >
+                                {expanded[t.job_id] ? 'Hide transcript' : 'Show transcript'}
+                            </button>
+
+                            {/* Transcript Preview (loaded on demand) */}
+                            {expanded[t.job_id] && (
                             <div className="bg-slate-50 rounded-lg p-3 text-sm space-y-2 max-h-48 overflow-y-auto custom-scrollbar">
-                                {t.messages?.map((msg, idx) => (
+                                {expanded[t.job_id].map((msg, idx) => (
                                     <div key={idx} className={`flex gap-2 ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}>
                                         <div className={`max-w-[85%] px-3 py-2 rounded-lg text-xs leading-relaxed ${msg.role === 'user'
                                                 ? 'bg-blue-100 text-blue-900 rounded-tr-none'
@@ -113,8 +149,18 @@ export default function CallLogsPage() {
                                     </div>
                                 ))}
                             </div>
+                            )}
                         </div>
                     ))}
+                    {nextCursor && (
+                        <button
+                            onClick={() => loadPage(nextCursor)}
+                            disabled={loading}
+                            className="py-2 text-sm text-blue-600 border border-slate-200 rounded-lg hover:bg-slate-50 disabled:opacity-50"
+                        >
+                            {loading ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             )}
         </div>
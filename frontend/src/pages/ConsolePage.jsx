@@ -14,8 +14,36 @@ export default function ConsolePage() {
     const [callStatus, setCallStatus] = useState(null); // { loading, success, error, data }
 
     const [bulkFile, setBulkFile] = useState(null);
-    const [bulkNumbers, setBulkNumbers] = useState([]);
+    const [leadList, setLeadList] = useState(null); // upload summary: { lead_list_id, total_count, preview, ... }
     const [bulkStatus, setBulkStatus] = useState(null); // { loading, success, error, count }
+    const [campaign, setCampaign] = useState(null); // campaign summary from the backend
+
+    const [liveCounts, setLiveCounts] = useState(null); // call counters pushed by the backend
+
+    // Live call counters and campaign progress over server-sent events
+    useEffect(() => {
+        const updateCampaign = (data) =>
+            setCampaign((current) => (current && current.campaign_id === data.campaign_id ? { ...current, ...data } : current));
+
+        return AgentService.subscribeEvents({
+            snapshot: (data) => {
+                setLiveCounts(data.counts);
+                (data.campaigns || []).forEach(updateCampaign);
+            },
+            counts: setLiveCounts,
+            campaign: updateCampaign,
+        });
+    }, []);
+
+    const handleCampaignAction = async (action) => {
+        if (!campaign) return;
+        try {
+            const data = await AgentService.controlCampaign(campaign.campaign_id, action);
+            setCampaign({ ...campaign, ...data });
+        } catch (err) {
+            setBulkStatus({ loading: false, error: `Failed to ${action} campaign.` });
+        }
+    };
 
     // --- Single Call ---
     const handleSingleCall = async () => {
@@ -40,7 +68,7 @@ export default function ConsolePage() {
 
         try {
             const res = await AgentService.uploadExcel(file);
-            setBulkNumbers(res.phone_numbers || []);
+            setLeadList(res);
             setBulkStatus({ loading: false, success: true, count: res.total_count });
         } catch (err) {
             setBulkStatus({ loading: false, error: "Failed to parse file. Ensure it has a phone column." });
@@ -49,18 +77,19 @@ export default function ConsolePage() {
     };
 
     const handleStartBulk = async () => {
-        if (bulkNumbers.length === 0) return;
+        if (!leadList?.total_count) return;
 
-        setBulkStatus({ ...bulkStatus, loading: true, message: `Dialing ${bulkNumbers.length} numbers...` });
+        setBulkStatus({ ...bulkStatus, loading: true, message: `Dialing ${leadList.total_count} numbers...` });
 
         try {
-            const res = await AgentService.startBulkCall(bulkNumbers);
+            const res = await AgentService.startBulkCall(leadList.lead_list_id);
+            setCampaign(res);
             setBulkStatus({
                 loading: false,
                 success: true,
-                message: `Successfully dispatched ${res.total_processed} calls!`
+                message: `Campaign ${res.campaign_id} started for ${res.total} numbers.`
             });
-            setBulkNumbers([]); // Reset
+            setLeadList(null); // Reset
             setBulkFile(null);
         } catch (err) {
             setBulkStatus({ loading: false, error: "Bulk dispatch failed." });
@@ -74,6 +103,23 @@ export default function ConsolePage() {
                 <p className="text-slate-500 mt-1">Manage outbound campaigns and monitor agent performance.</p>
             </header>
 
+            {liveCounts && (
+                <div className="grid grid-cols-2 md:grid-cols-5 gap-4">
+                    {[
+                        ['Active', liveCounts.active_calls, 'text-blue-600'],
+                        ['Ringing', liveCounts.ringing, 'text-amber-600'],
+                        ['Answered', liveCounts.answered, 'text-emerald-600'],
+                        ['Completed', liveCounts.completed_calls, 'text-slate-900'],
+                        ['Failed', liveCounts.failed, 'text-red-600'],
+                    ].map(([label, value, color]) => (
+                        <div key={label} className="bg-white rounded-xl shadow-sm border border-slate-200 p-4 text-center">
+                            <div className={clsx("text-2xl font-semibold", color)}>{value ?? 0}</div>
+                            <div className="text-xs text-slate-500 mt-1">{label}</div>
+                        </div>
+                    ))}
+                </div>
+            )}
+
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-8">
 
                 {/* Single Call Card */}
@@ -166,33 +212,74 @@ export default function ConsolePage() {
                             </div>
                         )}
 
-                        {bulkNumbers.length > 0 && (
+                        {campaign && (
+                            <div className="p-4 bg-slate-50 rounded-lg border border-slate-200 space-y-3">
+                                <div className="flex justify-between items-center">
+                                    <span className="font-semibold text-slate-700">Campaign {campaign.campaign_id}</span>
+                                    <span className="text-xs bg-slate-200 px-2 py-1 rounded text-slate-600 capitalize">
+                                        {campaign.status}
+                                    </span>
+                                </div>
+                                <div className="grid grid-cols-4 gap-2 text-center text-xs text-slate-500">
+                                    <div><div className="text-lg font-semibold text-slate-900">{campaign.counts?.pending ?? 0}</div>Pending</div>
+                                    <div><div className="text-lg font-semibold text-emerald-600">{campaign.counts?.dispatched ?? 0}</div>Dispatched</div>
+                                    <div><div className="text-lg font-semibold text-red-600">{campaign.counts?.failed ?? 0}</div>Failed</div>
+                                    <div><div className="text-lg font-semibold text-slate-400">{campaign.counts?.cancelled ?? 0}</div>Cancelled</div>
+                                </div>
+                                {['running', 'paused'].includes(campaign.status) && (
+                                    <div className="flex gap-2">
+                                        <button
+                                            onClick={() => handleCampaignAction(campaign.status === 'running' ? 'pause' : 'resume')}
+                                            className="flex-1 py-2 text-sm border border-slate-300 rounded-lg hover:bg-white"
+                                        >
+                                            {campaign.status === 'running' ? 'Pause' : 'Resume'}
+                                        </button>
+                                        <button
+                                            onClick={() => handleCampaignAction('cancel')}
+                                            className="flex-1 py-2 text-sm border border-red-200 text-red-600 rounded-lg hover:bg-red-50"
+                                        >
+                                            Cancel
+                                        </button>
+                                    </div>
+                                )}
+                            </div>
+                        )}
+
+                        {leadList?.total_count > 0 && (
                             <div className="p-4 bg-slate-50 rounded-lg border border-slate-200">
                                 <div className="flex justify-between items-center mb-2">
                                     <span className="font-semibold text-slate-700">Preview Numbers</span>
                                     <span className="text-xs bg-slate-200 px-2 py-1 rounded text-slate-600">
-                                        Total: {bulkNumbers.length}
+                                        Total: {leadList.total_count}
                                     </span>
                                 </div>
                                 <div className="max-h-32 overflow-y-auto space-y-1 pr-1">
-                                    {bulkNumbers.slice(0, 10).map((num, i) => (
+                                    {leadList.preview.map((num, i) => (
                                         <div key={i} className="text-sm text-slate-600 bg-white px-2 py-1 rounded border border-slate-100">
                                             {num}
                                         </div>
                                     ))}
-                                    {bulkNumbers.length > 10 && (
+                                    {leadList.total_count > leadList.preview.length && (
                                         <div className="text-xs text-slate-400 text-center italic">
-                                            +{bulkNumbers.length - 10} more...
+                                            +{leadList.total_count - leadList.preview.length} more...
                                         </div>
                                     )}
                                 </div>
+                                {(leadList.duplicate_count > 0 || leadList.invalid_count > 0) && (
+                                    <div className="mt-2 text-xs text-slate-500">
+                                        Skipped {leadList.duplicate_count} duplicate and {leadList.invalid_count} invalid rows
+                                        {leadList.invalid_rows.length > 0 && (
+                                            <span> (e.g. row {leadList.invalid_rows[0].row}: "{leadList.invalid_rows[0].value}")</span>
+                                        )}
+                                    </div>
+                                )}
                             </div>
                         )}
                     </div>
 
                     <button
                         onClick={handleStartBulk}
-                        disabled={bulkStatus?.loading || bulkNumbers.length === 0}
+                        disabled={bulkStatus?.loading || !leadList?.total_count}
                         className="mt-6 w-full py-3 bg-emerald-600 text-white font-semibold rounded-lg hover:bg-emerald-700 disabled:opacity-50 disabled:cursor-not-allowed flex justify-center items-center gap-2 transition-all"
                     >
                         {bulkStatus?.loading ? <Loader2 className="animate-spin" size={20} /> : "Start Campaign"}
@@ -13,45 +13,37 @@ import {
 } from 'lucide-react';
 import clsx from 'clsx';
 
+const PAGE_SIZE = 50;
+
 export default function RecordingsPage() {
     const [recordings, setRecordings] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [playing, setPlaying] = useState(null); // job_id
-    const [audioRef, setAudioRef] = useState(null);
     const [filter, setFilter] = useState('');
 
-    // Fetch data
+    // Fetch data (one page at a time)
+    const loadPage = async (cursor = null) => {
+        setLoading(true);
+        const params = { limit: PAGE_SIZE };
+        if (cursor) params.cursor = cursor;
+        const data = await AgentService.fetchRecordings(params);
+        setRecordings(prev => cursor ? [...prev, ...data.items] : data.items);
+        setNextCursor(data.next_cursor);
+        setLoading(false);
+    };
+
     useEffect(() => {
-        async function loadData() {
-            setLoading(true);
-            const data = await AgentService.fetchRecordings();
-            setRecordings(data);
-            setLoading(false);
-        }
-        loadData();
+        loadPage();
     }, []);
 
-    // Audio Controls
-    const togglePlay = (jobId, filename) => {
-        if (playing === jobId) {
-            audioRef.pause();
-            setPlaying(null);
-        } else {
-            const url = `http://localhost:8000/api/recordings/${filename}`;
-            const audio = new Audio(url);
-            audio.play();
-            setAudioRef(audio);
-            setPlaying(jobId);
-
-            audio.onended = () => {
-                setPlaying(null);
-                setAudioRef(null);
-            };
-        }
+    // Audio Controls: the inline player streams via Range requests, so it can seek immediately
+    const togglePlay = (jobId) => {
+        setPlaying(playing === jobId ? null : jobId);
     };
 
     const filteredRecordings = recordings.filter(r =>
-        r.job_id?.includes(filter) || r.timestamp?.includes(filter)
+        r.job_id?.includes(filter) || r.timestamp?.includes(filter) || r.phone_number?.includes(filter)
     );
 
     return (
@@ -62,7 +54,7 @@ export default function RecordingsPage() {
                     <p className="text-slate-500 text-sm">Review audio from completed calls.</p>
                 </div>
                 <button
-                    onClick={() => window.location.reload()}
+                    onClick={() => loadPage()}
                     className="text-sm text-blue-600 hover:underline flex items-center gap-1"
                 >
                     <Loader2 size={14} className={loading && "animate-spin"} /> Refresh
@@ -86,7 +78,7 @@ export default function RecordingsPage() {
                 </button>
             </div>
 
-            {loading ? (
+            {loading && recordings.length === 0 ? (
                 <div className="text-center py-20 text-slate-400">
                     <Loader2 className="animate-spin mx-auto mb-2" size={32} />
                     Fetching recordings...
@@ -99,11 +91,11 @@ export default function RecordingsPage() {
             ) : (
                 <div className="grid gap-4">
                     {filteredRecordings.map((rec) => (
-                        <div key={rec.job_id} className="bg-white p-5 rounded-xl border border-slate-100 shadow-sm hover:shadow-md transition-shadow flex items-center justify-between">
+                        <div key={rec.filename} className="bg-white p-5 rounded-xl border border-slate-100 shadow-sm hover:shadow-md transition-shadow flex items-center justify-between">
                             <div className="flex items-center gap-4">
                                 {/* Play Button */}
                                 <button
-                                    onClick={() => togglePlay(rec.job_id, rec.filename)}
+                                    onClick={() => togglePlay(rec.job_id)}
                                     className={`p-3 rounded-full transition-all duration-300 ${playing === rec.job_id
                                             ? 'bg-red-500 text-white shadow-lg shadow-red-500/40'
                                             : 'bg-slate-100 text-slate-600 hover:bg-slate-200'
@@ -122,13 +114,24 @@ export default function RecordingsPage() {
                                     </h3>
                                     <div className="flex items-center gap-4 text-xs text-slate-400 mt-1">
                                         <span className="flex items-center gap-1"><Clock size={12} /> {rec.timestamp}</span>
-                                        <span className="flex items-center gap-1"><Phone size={12} /> User Audio</span>
+                                        <span className="flex items-center gap-1"><Phone size={12} /> {rec.phone_number || "User Audio"}</span>
+                                        {rec.duration_seconds != null && <span>{Math.round(rec.duration_seconds)}s</span>}
                                     </div>
                                 </div>
                             </div>
 
                             {/* Actions */}
                             <div className="flex items-center gap-2">
+                                {playing === rec.job_id && (
+                                    <audio
+                                        controls
+                                        autoPlay
+                                        preload="metadata"
+                                        src={`http://localhost:8000/api/recordings/${rec.filename}`}
+                                        onEnded={() => setPlaying(null)}
+                                        className="h-8"
+                                    />
+                                )}
                                 <a
                                     href={`http://localhost:8000/api/recordings/${rec.filename}`}
                                     download
@@ -140,6 +143,15 @@ export default function RecordingsPage() {
                             </div>
                         </div>
                     ))}
+                    {nextCursor && (
+                        <button
+                            onClick={() => loadPage(nextCursor)}
+                            disabled={loading}
+                            className="py-2 text-sm text-blue-600 border border-slate-200 rounded-lg hover:bg-slate-50 disabled:opacity-50"
+                        >
+                            {loading ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             )}
         </div>
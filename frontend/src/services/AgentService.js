@@ -28,41 +28,87 @@ export const AgentService = {
             const res = await api.post('/upload-excel', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
-            return res.data; // { phone_numbers: [...], total_count: N }
+            return res.data; // { lead_list_id, total_count, preview, duplicate_count, invalid_count, invalid_rows }
         } catch (err) {
             console.error("Upload failed:", err);
             throw err;
         }
     },
 
-    startBulkCall: async (phoneNumbers) => {
+    startBulkCall: async (leadListId) => {
         try {
-            const res = await api.post('/bulk-call', { phone_numbers: phoneNumbers });
-            return res.data;
+            const res = await api.post('/bulk-call', { lead_list_id: leadListId });
+            return res.data; // { campaign_id, status, total, counts, ... }
         } catch (err) {
             console.error("Bulk start failed:", err);
             throw err;
         }
     },
 
-    // Logs & Recordings
-    fetchTranscripts: async () => {
+    // Campaigns
+    fetchCampaign: async (campaignId) => {
         try {
-            const res = await api.get('/transcripts');
+            const res = await api.get(`/campaigns/${campaignId}`);
             return res.data;
         } catch (err) {
-            console.error("Fetch transcripts failed:", err);
-            return [];
+            console.error("Fetch campaign failed:", err);
+            return null;
         }
     },
 
-    fetchRecordings: async () => {
+    controlCampaign: async (campaignId, action) => {
+        // action: 'pause' | 'resume' | 'cancel'
         try {
-            const res = await api.get('/recordings');
+            const res = await api.post(`/campaigns/${campaignId}/${action}`);
             return res.data;
+        } catch (err) {
+            console.error(`Campaign ${action} failed:`, err);
+            throw err;
+        }
+    },
+
+    // Live call and campaign updates (server-sent events). Returns a function that closes the stream.
+    // handlers: { snapshot, call, counts, campaign }
+    subscribeEvents: (handlers) => {
+        const source = new EventSource('/api/call-events');
+        ['snapshot', 'call', 'counts', 'campaign'].forEach((name) => {
+            if (handlers[name]) {
+                source.addEventListener(name, (e) => handlers[name](JSON.parse(e.data)));
+            }
+        });
+        source.onerror = () => console.warn("Live event stream interrupted, reconnecting...");
+        return () => source.close();
+    },
+
+    // Logs & Recordings
+    // params: { limit, cursor, phone_number, date_from, date_to, min_duration }
+    fetchTranscripts: async (params = {}) => {
+        try {
+            const res = await api.get('/transcripts', { params });
+            return res.data; // { items: [...summaries], next_cursor }
+        } catch (err) {
+            console.error("Fetch transcripts failed:", err);
+            return { items: [], next_cursor: null };
+        }
+    },
+
+    fetchTranscript: async (jobId) => {
+        try {
+            const res = await api.get(`/transcripts/${encodeURIComponent(jobId)}`);
+            return res.data; // full transcript including messages
+        } catch (err) {
+            console.error("Fetch transcript failed:", err);
+            return null;
+        }
+    },
+
+    fetchRecordings: async (params = {}) => {
+        try {
+            const res = await api.get('/recordings', { params });
+            return res.data; // { items: [...], next_cursor }
         } catch (err) {
             console.error("Fetch recordings failed:", err);
-            return [];
+            return { items: [], next_cursor: null };
         }
     }
 };
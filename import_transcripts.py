@@ -0,0 +1,27 @@
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables (TRANSCRIPTS_DB_PATH)
+load_dotenv(".env")
+
+from backend.services.transcript_store import TranscriptStore, TRANSCRIPTS_DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import existing JSON transcripts and recordings into the transcript store.")
+    parser.add_argument("--dir", default="transcripts_json", help="Directory with call_*.json files")
+    parser.add_argument("--recordings-dir", default="recordings_audio", help="Directory with recorded audio files")
+    args = parser.parse_args()
+
+    print(f"Importing transcripts from {args.dir} into {TRANSCRIPTS_DB_PATH}...")
+    result = TranscriptStore.import_json_dir(args.dir)
+    print(f"✅ Imported {result['imported']} transcripts ({result['skipped']} skipped).")
+
+    print(f"Indexing recordings from {args.recordings_dir}...")
+    result = TranscriptStore.import_recordings_dir(args.recordings_dir)
+    print(f"✅ Indexed {result['imported']} recordings.")
+    print(f"Store now holds {TranscriptStore.count()} calls.")
+
+
+if __name__ == "__main__":
+    main()
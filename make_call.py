@@ -6,6 +6,8 @@ import json
 from dotenv import load_dotenv
 from livekit import api
 
+from backend.services.livekit_client import LiveKitClient
+
 # Load environment variables
 load_dotenv(".env")
 
@@ -28,8 +30,8 @@ async def main():
         print("Error: LiveKit credentials missing in .env.local")
         return
 
-    # 2. Setup API Client
-    lk_api = api.LiveKitAPI(url=url, api_key=api_key, api_secret=api_secret)
+    # 2. Setup API Client (shared pooled client, same as the backend uses)
+    lk_api = await LiveKitClient.start(url=url, api_key=api_key, api_secret=api_secret)
 
     # 3. Create a unique room for this call
     # We use a random suffix to ensure room names are unique
@@ -60,7 +62,7 @@ async def main():
         print(f"\n❌ Error dispatching call: {e}")
     
     finally:
-        await lk_api.aclose()
+        await LiveKitClient.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
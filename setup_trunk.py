@@ -1,26 +1,28 @@
 import asyncio
 import os
 from dotenv import load_dotenv
-from livekit import api
+
+from backend.services.livekit_client import LiveKitClient
+from backend.services.trunk_admission import load_trunks
 
 # Load environment variables
 load_dotenv(".env")
 
 async def main():
+    trunk_id = os.getenv("OUTBOUND_TRUNK_ID")
+    if not trunk_id:
+        print("Error: OUTBOUND_TRUNK_ID not found in .env")
+        return
+
     # Initialize LiveKit API
     # Credentials (LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET) are auto-loaded from .env
-    lkapi = api.LiveKitAPI()
+    lkapi = await LiveKitClient.get()
     sip = lkapi.sip
     
-    trunk_id = os.getenv("OUTBOUND_TRUNK_ID")
     address = os.getenv("VOBIZ_SIP_DOMAIN")
     username = os.getenv("VOBIZ_USERNAME")
     password = os.getenv("VOBIZ_PASSWORD")
     number = os.getenv("VOBIZ_OUTBOUND_NUMBER")
-    
-    if not trunk_id:
-        print("Error: OUTBOUND_TRUNK_ID not found in .env")
-        return
 
     print(f"Updating SIP Trunk: {trunk_id}")
     print(f"  Address: {address}")
@@ -38,11 +40,20 @@ async def main():
         )
         print("\n✅ SIP Trunk updated successfully!")
         print("The 'max auth retry attempts' error should be resolved now.")
-        
+
+        # Other SIP_TRUNKS entries belong to other carriers (own address and credentials):
+        # they are configured in LiveKit directly and left alone here
+        others = [t for t in load_trunks() if t[0] and t[0] != trunk_id]
+        if others:
+            print("\nNot changed (configure these in LiveKit):")
+            for other_id, channels, weight in others:
+                # Channels and weight only steer the backend's admission control
+                print(f"  {other_id} (backend admission: {channels} channels, weight {weight:g})")
+
     except Exception as e:
         print(f"\n❌ Failed to update trunk: {e}")
     finally:
-        await lkapi.aclose()
+        await LiveKitClient.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
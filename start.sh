@@ -3,10 +3,21 @@
 # Suppress ONNX runtime logging (removes GPU discovery warnings)
 export ORT_LOGGING_LEVEL=3
 
-# Start the LiveKit Agent in the background
-# We remove the invalid --http-server-port flag. 
-# The agent will use its default internal port for health checks (typically 8081)
-python agent.py start &
+# Start the LiveKit Agent workers in the background.
+# One worker per CPUS_PER_AGENT_WORKER cores (override with AGENT_WORKERS). Each worker
+# registers with LiveKit separately and reports its load, so calls are spread across them;
+# each one needs its own health-check port (8081, 8082, ...).
+CPUS_PER_AGENT_WORKER=${CPUS_PER_AGENT_WORKER:-2}
+AGENT_WORKERS=${AGENT_WORKERS:-$(( $(nproc) / CPUS_PER_AGENT_WORKER ))}
+if [ "$AGENT_WORKERS" -lt 1 ]; then
+    AGENT_WORKERS=1
+fi
+AGENT_HEALTH_PORT_BASE=${AGENT_HEALTH_PORT_BASE:-8081}
+
+echo "Starting $AGENT_WORKERS agent worker(s)"
+for i in $(seq 0 $((AGENT_WORKERS - 1))); do
+    AGENT_HEALTH_PORT=$((AGENT_HEALTH_PORT_BASE + i)) python agent.py start &
+done
 
 # Start the FastAPI Backend
 # binding to 0.0.0.0 and the port Render provides
@@ -0,0 +1,56 @@
+import pytest
+
+from backend.services import dial_scheduler
+from backend.services.dial_scheduler import DialScheduler
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    """DialScheduler on an empty database, dialling at any time of day without cooldown."""
+    monkeypatch.setattr(dial_scheduler, "DIAL_DB_PATH", str(tmp_path / "dial_scheduler.db"))
+    monkeypatch.setattr(dial_scheduler, "HOURS", None)
+    monkeypatch.setattr(dial_scheduler, "COOLDOWN_SECONDS", 0)
+    monkeypatch.setattr(DialScheduler, "_conn", None)
+    monkeypatch.setattr(DialScheduler, "_in_flight", {})
+    monkeypatch.setattr(DialScheduler, "_rooms", {})
+    monkeypatch.setattr(DialScheduler, "_retries", {})
+    yield DialScheduler
+    if DialScheduler._conn is not None:
+        DialScheduler._conn.close()
+
+
+@pytest.fixture
+def tracker(scheduler, monkeypatch):
+    """CallStatusTracker with no calls, over the test dial scheduler."""
+    from collections import OrderedDict
+    from backend.services.call_status import CallStatusTracker, STATE_ORDER
+
+    monkeypatch.setattr(CallStatusTracker, "_calls", OrderedDict())
+    monkeypatch.setattr(CallStatusTracker, "_counts", {state: 0 for state in STATE_ORDER})
+    monkeypatch.setattr(CallStatusTracker, "_finished", 0)
+    monkeypatch.setattr(CallStatusTracker, "_listeners", [])
+    return CallStatusTracker
+
+
+@pytest.fixture
+def transcripts(tmp_path, monkeypatch):
+    """TranscriptStore over an empty database."""
+    from backend.services import transcript_store
+    from backend.services.transcript_store import TranscriptStore
+
+    monkeypatch.setattr(transcript_store, "TRANSCRIPTS_DB_PATH", str(tmp_path / "transcripts.db"))
+    monkeypatch.setattr(TranscriptStore, "_conn", None)
+    yield TranscriptStore
+    if TranscriptStore._conn is not None:
+        TranscriptStore._conn.close()
+
+
+@pytest.fixture
+def analytics(transcripts, monkeypatch):
+    """CallAnalytics (rule-based) over an empty transcripts database."""
+    from backend.services.call_analytics import CallAnalytics
+
+    monkeypatch.setattr(CallAnalytics, "_schema_ready", False)
+    monkeypatch.setattr(CallAnalytics, "_provider", None)
+    monkeypatch.setattr(CallAnalytics, "_wake", None)
+    return CallAnalytics
@@ -0,0 +1,71 @@
+import numpy as np
+
+from agent_services.amd import HUMAN, MACHINE, SAMPLE_RATE, UNSURE, AmdClassifier
+
+WINDOW = 512  # Silero's 32 ms window at 16 kHz
+
+
+def speech(seconds: float, seed: int = 0) -> list:
+    """Voice-like windows: broadband noise the VAD scores as speech."""
+    rng = np.random.default_rng(seed)
+    return [(rng.normal(0, 0.1, WINDOW).astype(np.float32), 0.9) for _ in range(round(seconds * SAMPLE_RATE / WINDOW))]
+
+
+def silence(seconds: float) -> list:
+    return [(np.zeros(WINDOW, dtype=np.float32), 0.02) for _ in range(round(seconds * SAMPLE_RATE / WINDOW))]
+
+
+def beep(seconds: float, hz: float = 1000) -> list:
+    t = np.arange(WINDOW) / SAMPLE_RATE
+    windows, offset = [], 0
+    for _ in range(round(seconds * SAMPLE_RATE / WINDOW)):
+        windows.append(((0.5 * np.sin(2 * np.pi * hz * (t + offset / SAMPLE_RATE))).astype(np.float32), 0.3))
+        offset += WINDOW
+    return windows
+
+
+def classify(windows: list) -> dict:
+    classifier = AmdClassifier()
+    for samples, probability in windows:
+        if classifier.update(samples, probability) is not None:
+            break
+    return classifier.finish()
+
+
+def test_short_hello_then_silence_is_a_person():
+    result = classify(silence(0.5) + speech(0.4) + silence(1.0))
+    assert (result["label"], result["reason"]) == (HUMAN, "short_greeting")
+    assert result["initial_silence_ms"] >= 450 and result["words"] == 1
+
+
+def test_long_unbroken_greeting_is_a_machine():
+    result = classify(silence(0.3) + speech(3.0))
+    assert (result["label"], result["reason"]) == (MACHINE, "long_greeting")
+
+
+def test_many_short_words_are_a_machine():
+    words = []
+    for n in range(6):
+        words += speech(0.2, seed=n) + silence(0.15)
+    result = classify(words + silence(1.0))
+    assert (result["label"], result["reason"]) == (MACHINE, "too_many_words")
+
+
+def test_beep_is_a_machine_and_not_counted_as_speech():
+    result = classify(silence(0.3) + beep(0.4) + silence(1.0))
+    assert (result["label"], result["reason"]) == (MACHINE, "beep")
+    assert result["speech_ms"] == 0
+
+
+def test_initial_silence_is_unsure():
+    result = classify(silence(4.0))
+    assert (result["label"], result["reason"]) == (UNSURE, "initial_silence")
+
+
+def test_audio_ending_before_a_decision_is_unsure():
+    assert classify(speech(0.3))["label"] == UNSURE
+
+
+def test_decision_depends_only_on_the_audio():
+    windows = silence(0.5) + speech(0.4) + silence(1.0)
+    assert classify(windows) == classify(windows)
@@ -0,0 +1,88 @@
+import asyncio
+
+from backend.services import call_analytics
+from backend.services.transcript_store import TranscriptStore
+
+
+def store_calls(count: int) -> list:
+    job_ids = [f"job-{n}" for n in range(count)]
+    for job_id in job_ids:
+        TranscriptStore.save({
+            "job_id": job_id, "phone_number": "+14155550100", "timestamp": "2026-03-02 10:00:00",
+            "messages": [{"role": "assistant", "content": "Hello"}, {"role": "user", "content": "Hi"}],
+        })
+    return job_ids
+
+
+def status(job_id: str) -> str:
+    conn = call_analytics.CallAnalytics.connection()
+    return conn.execute("SELECT status FROM analytics_jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+
+def test_batch_is_extracted_concurrently(analytics, monkeypatch):
+    job_ids = store_calls(4)
+    analytics.enqueue(job_ids)
+    original = analytics.process
+    running = {"now": 0, "max": 0}
+
+    async def process(job_id, force, attempts):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.05)
+        running["now"] -= 1
+        return await original(job_id, force, attempts)
+
+    monkeypatch.setattr(analytics, "process", process)
+    assert asyncio.run(analytics._run_batch()) == 4
+    assert running["max"] == 4
+    assert [status(job_id) for job_id in job_ids] == ["done"] * 4
+    assert analytics.get("job-0") is not None
+
+
+def test_failed_extraction_is_retried_without_losing_the_batch(analytics, monkeypatch):
+    job_ids = store_calls(2)
+    analytics.enqueue(job_ids)
+    original = analytics.process
+
+    async def process(job_id, force, attempts):
+        if job_id == "job-1":
+            raise RuntimeError("HTTP 503")
+        return await original(job_id, force, attempts)
+
+    monkeypatch.setattr(analytics, "process", process)
+    asyncio.run(analytics._run_batch())
+    assert status("job-0") == "done"
+    assert status("job-1") == "pending"
+
+
+def test_call_requeued_while_running_runs_again(analytics):
+    job_id, = store_calls(1)
+    analytics.enqueue([job_id])
+    (_, _, _, claimed_at), = analytics.claim(10)
+    analytics.enqueue([job_id], force=True)
+    analytics.complete([{"job_id": job_id, "skipped": True}], [], claimed_at)
+    assert status(job_id) == "pending"
+
+
+def test_expired_claim_is_taken_over(analytics, monkeypatch):
+    job_id, = store_calls(1)
+    analytics.enqueue([job_id])
+    (_, _, _, stale_claim), = analytics.claim(10)
+    monkeypatch.setattr(call_analytics, "ANALYTICS_CLAIM_TIMEOUT_SECONDS", -1)
+    (_, _, attempts, claimed_at), = analytics.claim(10)
+    assert attempts == 2 and claimed_at > stale_claim
+    # The first worker's late result is discarded; the second one's is kept
+    analytics.fail(job_id, "late", stale_claim)
+    assert status(job_id) == "running"
+    analytics.complete([{"job_id": job_id, "skipped": True}], [], claimed_at)
+    assert status(job_id) == "done"
+
+
+def test_filtered_lead_pages_need_no_sort(analytics):
+    conn = analytics.connection()
+    for column in ("phone_number", "intent", "outcome", "customer_type"):
+        rows = conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT job_id FROM call_analytics WHERE {column} = ? "
+            "ORDER BY timestamp DESC, job_id DESC LIMIT 50", ("x",),
+        ).fetchall()
+        assert "TEMP B-TREE" not in " | ".join(row["detail"] for row in rows)
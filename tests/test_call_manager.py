@@ -0,0 +1,29 @@
+import asyncio
+
+from backend.services import trunk_admission
+from backend.services.call_manager import CallManager
+from backend.services.dial_scheduler import IN_FLIGHT
+from backend.services.trunk_admission import Trunk, TrunkAdmission
+
+NUMBER = "+14155550100"
+
+
+def test_call_end_frees_trunk_channel_and_number(scheduler, monkeypatch):
+    monkeypatch.setattr(trunk_admission, "ADMISSION_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(TrunkAdmission, "_trunks", {"ST_a": Trunk("ST_a", 1, 1.0)})
+    monkeypatch.setattr(TrunkAdmission, "_rooms", {})
+
+    async def run():
+        room_name = (await scheduler.acquire(NUMBER))["room_name"]
+        assert await TrunkAdmission.admit(room_name, timeout=0.1) == "ST_a"
+        assert (await scheduler.acquire(NUMBER))["reason"] == IN_FLIGHT
+        assert await TrunkAdmission.admit("other-room", timeout=0.1) is None
+
+        scheduler.record_answered(room_name)
+        scheduler.record_ended(room_name)
+        await CallManager.call_finished(room_name, False, "agent_ended")
+
+        assert TrunkAdmission.trunks()["ST_a"].legs == {}
+        assert TrunkAdmission.trunks()["ST_a"].counts["answered"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,119 @@
+import asyncio
+
+from livekit import api
+from livekit.protocol import models
+
+from backend.services.call_status import ANSWERED, ENDED, FAILED, RINGING
+
+NUMBER = "+14155550100"
+
+
+def sip_event(event: str, room_name: str, call_status: str = "dialing") -> api.WebhookEvent:
+    return api.WebhookEvent(
+        event=event,
+        room=models.Room(name=room_name),
+        participant=models.ParticipantInfo(kind=models.ParticipantInfo.Kind.SIP,
+                                           attributes={"sip.callStatus": call_status}),
+    )
+
+
+def room_finished(room_name: str) -> api.WebhookEvent:
+    return api.WebhookEvent(event="room_finished", room=models.Room(name=room_name))
+
+
+async def settle(tracker):
+    while tracker._tasks:
+        await asyncio.gather(*list(tracker._tasks))
+
+
+def dispatched_call(scheduler, tracker) -> str:
+    room_name = asyncio.run(scheduler.acquire(NUMBER))["room_name"]
+    tracker.dispatched(room_name, NUMBER, "AD_1")
+    return room_name
+
+
+def test_answer_recorded_by_agent_marks_call_answered(scheduler, tracker):
+    room_name = dispatched_call(scheduler, tracker)
+
+    async def run():
+        # Real SIP participants join while the call is still dialling
+        tracker.handle_webhook(sip_event("participant_joined", room_name))
+        assert tracker._calls[room_name]["state"] == RINGING
+        scheduler.record_answered(room_name)
+        await tracker.reconcile()
+        assert tracker._calls[room_name]["state"] == ANSWERED
+        tracker.handle_webhook(room_finished(room_name))
+        await settle(tracker)
+
+    asyncio.run(run())
+    assert tracker._calls[room_name]["state"] == ENDED
+    assert tracker.counts()["active_calls"] == 0
+
+
+def test_answer_recorded_just_before_hangup_still_ends_call(scheduler, tracker):
+    room_name = dispatched_call(scheduler, tracker)
+    finished = []
+
+    async def listener(room, answered, reason):
+        finished.append((room, answered))
+
+    tracker.add_listener(listener)
+
+    async def run():
+        tracker.handle_webhook(sip_event("participant_joined", room_name))
+        scheduler.record_answered(room_name)
+        tracker.handle_webhook(room_finished(room_name))
+        await settle(tracker)
+
+    asyncio.run(run())
+    assert tracker._calls[room_name]["state"] == ENDED
+    assert finished == [(room_name, True)]
+
+
+def test_unanswered_call_fails(scheduler, tracker):
+    room_name = dispatched_call(scheduler, tracker)
+
+    async def run():
+        tracker.handle_webhook(sip_event("participant_joined", room_name))
+        tracker.handle_webhook(room_finished(room_name))
+        await settle(tracker)
+
+    asyncio.run(run())
+    assert tracker._calls[room_name]["state"] == FAILED
+
+
+def test_stale_calls_are_swept_without_a_restart(scheduler, tracker, monkeypatch):
+    from backend.services import call_status
+
+    room_name = dispatched_call(scheduler, tracker)
+    fresh_room = asyncio.run(scheduler.acquire("+14155550101"))["room_name"]
+    tracker.dispatched(fresh_room, "+14155550101", "AD_2")
+    tracker._calls[room_name]["updated_ts"] -= call_status.STALE_CALL_SECONDS + 1
+
+    async def run():
+        assert tracker.sweep_stale() == 1
+        await settle(tracker)
+
+    asyncio.run(run())
+    assert tracker._calls[room_name]["state"] == FAILED
+    assert tracker.counts()["active_calls"] == 1
+
+
+def test_agent_reported_end_closes_call_without_webhooks(scheduler, tracker):
+    room_name = dispatched_call(scheduler, tracker)
+    finished = []
+
+    async def listener(room, answered, reason):
+        finished.append((room, answered, reason))
+
+    tracker.add_listener(listener)
+
+    async def run():
+        scheduler.record_answered(room_name)
+        scheduler.record_ended(room_name)
+        await tracker.reconcile()
+        await settle(tracker)
+
+    asyncio.run(run())
+    assert tracker._calls[room_name]["state"] == ENDED
+    assert finished == [(room_name, True, "agent_ended")]
@@ -0,0 +1,56 @@
+import asyncio
+
+from backend.services import campaign_manager
+from backend.services.call_manager import CallManager
+from backend.services.campaign_manager import DISPATCHED, SKIPPED, CampaignManager
+
+NUMBERS = [f"+1415555{n:04d}" for n in range(5)]
+
+
+def test_concurrency_is_capped_at_trunk_channels(monkeypatch):
+    monkeypatch.setattr(campaign_manager, "load_trunks", lambda: [("ST_a", 2, 1.0), ("ST_b", 3, 1.0)])
+    assert campaign_manager.Campaign(NUMBERS, 50, 5).concurrency == 5
+    assert campaign_manager.Campaign(NUMBERS, 0, 5).concurrency == 1
+
+
+def test_cancel_lets_in_flight_dispatch_finish(monkeypatch):
+    monkeypatch.setattr(CampaignManager, "_campaigns", {})
+
+    async def run():
+        dispatching, done = asyncio.Event(), asyncio.Event()
+
+        async def dispatch_call(phone, campaign_id=None):
+            dispatching.set()
+            await done.wait()
+            return {"success": True, "dispatch_id": "AD_1"}
+
+        monkeypatch.setattr(CallManager, "dispatch_call", dispatch_call)
+        campaign = CampaignManager.create_campaign(NUMBERS, concurrency=1, calls_per_second=100)
+        await dispatching.wait()
+        CampaignManager.cancel(campaign)
+        done.set()
+        await campaign.runner
+
+        assert campaign.entries[0]["status"] == DISPATCHED
+        assert [e["status"] for e in campaign.entries[1:]] == [SKIPPED] * 4
+
+    asyncio.run(run())
+
+
+def test_finished_campaigns_are_evicted(monkeypatch):
+    monkeypatch.setattr(CampaignManager, "_campaigns", {})
+    monkeypatch.setattr(campaign_manager, "CAMPAIGN_HISTORY", 2)
+
+    async def dispatch_call(phone, campaign_id=None):
+        return {"success": True, "dispatch_id": "AD_1"}
+
+    async def run():
+        monkeypatch.setattr(CallManager, "dispatch_call", dispatch_call)
+        campaigns = []
+        for _ in range(4):
+            campaign = CampaignManager.create_campaign(NUMBERS[:1], calls_per_second=100)
+            await campaign.runner
+            campaigns.append(campaign.id)
+        assert set(CampaignManager._campaigns) == set(campaigns[-2:])
+
+    asyncio.run(run())
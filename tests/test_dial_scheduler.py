@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime
+
+from backend.services import dial_scheduler
+from backend.services.dial_scheduler import ANSWERED, BUSY, IN_FLIGHT, NO_ANSWER, DialScheduler
+
+NUMBER = "+14155550100"
+
+
+def dial(number: str = NUMBER, **kwargs) -> dict:
+    return asyncio.run(DialScheduler.acquire(number, **kwargs))
+
+
+def finish(room_name: str, answered: bool = False, reason=None) -> dict:
+    return asyncio.run(DialScheduler.call_finished(room_name, answered, reason))
+
+
+def test_classify():
+    assert DialScheduler.classify(True, None, None) == ANSWERED
+    assert DialScheduler.classify(False, None, "486") == BUSY
+    assert DialScheduler.classify(False, None, "404") == "failed"
+    assert DialScheduler.classify(False, "USER_UNAVAILABLE", None) == NO_ANSWER
+    assert DialScheduler.classify(False, "room_finished", None) == NO_ANSWER
+
+
+def test_dialling_is_unrestricted_by_default():
+    assert dial_scheduler._parse_hours("") is None
+    assert dial_scheduler._parse_hours("09:00-21:00") == (540, 1260)
+
+
+def test_number_in_a_call_is_not_dialled_twice(scheduler):
+    room_name = dial()["room_name"]
+    assert dial()["reason"] == IN_FLIGHT
+    finish(room_name, answered=True)
+    assert "room_name" in dial()
+
+
+def test_answer_recorded_by_agent_wins_over_webhook_state(scheduler):
+    room_name = dial()["room_name"]
+    DialScheduler.record_answered(room_name)
+    result = finish(room_name, answered=False, reason="room_finished")
+    assert result["outcome"] == ANSWERED
+    assert not result["retry"]
+
+
+def test_unanswered_call_is_retried_with_backoff(scheduler, monkeypatch):
+    monkeypatch.setattr(dial_scheduler, "MAX_ATTEMPTS", 2)
+    room_name = dial()["room_name"]
+    first = finish(room_name, reason="USER_UNAVAILABLE")
+    assert first["outcome"] == NO_ANSWER and first["retry"]
+    # A manual dial does not jump the queued retry
+    assert dial()["reason"] == dial_scheduler.RETRY_SCHEDULED
+    # Nor does the retry itself before its backoff has elapsed
+    assert dial(retry=True)["reason"] == dial_scheduler.RETRY_SCHEDULED
+
+
+def test_cooldown_after_a_finished_call(scheduler, monkeypatch):
+    monkeypatch.setattr(dial_scheduler, "COOLDOWN_SECONDS", 3600)
+    finish(dial()["room_name"], answered=True)
+    assert dial()["reason"] == dial_scheduler.COOLDOWN
+
+
+def test_sip_status_recorded_by_agent(scheduler):
+    room_name = dial()["room_name"]
+    DialScheduler.record_sip_status(room_name, "486")
+    assert finish(room_name)["outcome"] == BUSY
+
+
+def test_dispatch_failure_does_not_count_an_attempt(scheduler):
+    room_name = dial()["room_name"]
+    asyncio.run(DialScheduler.dispatch_failed(room_name))
+    assert finish(room_name) is None
+    assert "room_name" in dial()
+
+
+def test_next_window_opens_at_local_calling_hours(scheduler, monkeypatch):
+    monkeypatch.setattr(dial_scheduler, "HOURS", (9 * 60, 21 * 60))
+    zone = DialScheduler.timezone(NUMBER)
+    morning = datetime(2026, 3, 2, 10, 30, tzinfo=zone).timestamp()
+    assert DialScheduler.next_window(NUMBER, morning) == morning
+    night = datetime(2026, 3, 2, 22, 0, tzinfo=zone).timestamp()
+    assert DialScheduler.next_window(NUMBER, night) == datetime(2026, 3, 3, 9, 0, tzinfo=zone).timestamp()
+    early = datetime(2026, 3, 2, 6, 0, tzinfo=zone).timestamp()
+    assert DialScheduler.next_window(NUMBER, early) == datetime(2026, 3, 2, 9, 0, tzinfo=zone).timestamp()
+
+
+def test_manual_dial_outside_calling_hours_is_refused(scheduler, monkeypatch):
+    local = datetime.now(DialScheduler.timezone(NUMBER))
+    opens = (local.hour * 60 + local.minute + 60) % 1440
+    monkeypatch.setattr(dial_scheduler, "HOURS", (opens, (opens + 60) % 1440))
+    result = dial()
+    assert result["reason"] == dial_scheduler.OUTSIDE_HOURS and result["not_before"]
+
+
+def test_retry_waiting_for_a_channel_does_not_hold_up_the_others(scheduler, monkeypatch):
+    monkeypatch.setattr(dial_scheduler, "RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(dial_scheduler, "RETRY_POLL_SECONDS", 0.01)
+    blocked, other = NUMBER, "+14155550101"
+    for number in (blocked, other):
+        finish(dial(number)["room_name"], reason="USER_UNAVAILABLE")
+
+    async def run():
+        dispatched = []
+        channel_free = asyncio.Event()
+
+        async def dispatch(phone_number, campaign_id=None, retry=False):
+            await DialScheduler.acquire(phone_number, campaign_id, retry)
+            dispatched.append(phone_number)
+            if phone_number == blocked:
+                await channel_free.wait()
+            return {"dispatch_id": "AD_1"}
+
+        await DialScheduler.start(dispatch)
+        for _ in range(100):
+            if other in dispatched:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        assert sorted(dispatched) == sorted([blocked, other])
+        channel_free.set()
+        await DialScheduler.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import time
+import asyncio
+
+import pytest
+
+from agent_services.failover import BreakerOptions, CircuitBreaker, ProviderGroup, CLOSED, HALF_OPEN, OPEN
+
+
+class Plugin:
+    def __init__(self, name: str):
+        self.provider = name
+        self.model = "m"
+        self.fail = False
+        self.calls = 0
+
+
+class Stream:
+    def __init__(self, plugin: Plugin):
+        self.plugin = plugin
+
+    async def __anext__(self):
+        self.plugin.calls += 1
+        if self.plugin.fail:
+            raise RuntimeError(f"{self.plugin.provider} down")
+        return "event"
+
+    async def aclose(self):
+        pass
+
+
+def options(**kwargs) -> BreakerOptions:
+    return BreakerOptions(**{"p95_limit_ms": 1000, "min_samples": 1, "cooldown_seconds": 30, **kwargs})
+
+
+def open_breaker(breaker: CircuitBreaker, cooled_down: bool):
+    breaker.record(10, False)
+    assert breaker.state == OPEN
+    if cooled_down:
+        breaker.opened_at = time.monotonic() - breaker.options.cooldown_seconds - 1
+
+
+def test_can_try_has_no_side_effects():
+    breaker = CircuitBreaker("b", options())
+    open_breaker(breaker, cooled_down=True)
+    for _ in range(3):
+        assert breaker.can_try()
+    assert breaker.state == OPEN
+    assert breaker.acquire()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.can_try()
+    breaker.record(10, True)
+    assert breaker.state == CLOSED
+
+
+def test_cooling_down_breaker_is_not_tried():
+    breaker = CircuitBreaker("b", options())
+    open_breaker(breaker, cooled_down=False)
+    assert not breaker.can_try()
+    assert not breaker.acquire()
+
+
+def test_unused_half_open_provider_stays_available():
+    # b cooled down; a serves a request; then a fails and b must still take over
+    a, b = Plugin("a"), Plugin("b")
+    group = ProviderGroup("llm", [a, b], options())
+    open_breaker(group.breakers[1], cooled_down=True)
+
+    async def run():
+        index, _, _ = await group.first_response(lambda i: Stream(group.plugins[i]))
+        assert index == 0 and b.calls == 0
+        a.fail = True
+        index, _, first = await group.first_response(lambda i: Stream(group.plugins[i]))
+        return index, first
+
+    index, first = asyncio.run(run())
+    assert (index, first) == (1, "event")
+    assert group.breakers[1].state == CLOSED
+
+
+def test_all_providers_failing_raises():
+    a, b = Plugin("a"), Plugin("b")
+    a.fail = b.fail = True
+    group = ProviderGroup("llm", [a, b], options())
+    with pytest.raises(Exception, match="all llm providers failed"):
+        asyncio.run(group.first_response(lambda i: Stream(group.plugins[i])))
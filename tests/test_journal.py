@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent_services import journal
+from agent_services.journal import TranscriptJournal
+
+
+@pytest.fixture
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_journal(directory, name: str, pid: int, extra: str = "") -> str:
+    path = directory / f"call_{name}.jsonl"
+    header = {"type": "call", "job_id": name, "started_at": "2026-03-02T10:00:00", "pid": pid}
+    path.write_text(json.dumps(header) + "\n" + extra)
+    return str(path)
+
+
+def test_journal_round_trip_skips_torn_last_line(journal_dir):
+    async def run():
+        recorder = TranscriptJournal("job-1", "+14155550100")
+        recorder.start()
+        item = SimpleNamespace(type="message", role="user", text_content="Hello", created_at=time.time(),
+                               interrupted=False)
+        recorder.on_conversation_item_added(SimpleNamespace(item=item))
+        await recorder.close()
+        return recorder.path
+
+    path = asyncio.run(run())
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "message", "role": "assis')
+    header, messages = TranscriptJournal.read(path)
+    assert header["job_id"] == "job-1" and header["pid"] == os.getpid()
+    assert [(m["display_role"], m["content"]) for m in messages] == [("User", "Hello")]
+
+
+def test_claim_orphans_takes_only_journals_of_dead_or_stale_workers(journal_dir, monkeypatch):
+    dead = write_journal(journal_dir, "dead", dead_pid())
+    write_journal(journal_dir, "live", os.getpid())
+    stale = write_journal(journal_dir, "stale", os.getpid())
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    monkeypatch.setattr(journal, "JOURNAL_STALE_SECONDS", 3600)
+
+    claimed = TranscriptJournal.claim_orphans()
+    suffix = f".{os.getpid()}.recovering"
+    assert sorted(claimed) == sorted([dead + suffix, stale + suffix])
+    # A second worker finds nothing left to claim while this one is alive
+    assert TranscriptJournal.claim_orphans() == []
+    assert sorted(os.listdir(journal_dir)) == sorted(
+        ["call_live.jsonl", "call_dead.jsonl" + suffix, "call_stale.jsonl" + suffix])
+
+
+def test_claim_of_a_dead_worker_is_taken_over(journal_dir):
+    orphan = journal_dir / f"call_job.jsonl.{dead_pid()}.recovering"
+    orphan.write_text(json.dumps({"type": "call", "job_id": "job", "pid": dead_pid()}) + "\n")
+    assert TranscriptJournal.claim_orphans() == [str(journal_dir / f"call_job.jsonl.{os.getpid()}.recovering")]
+
+
+def test_released_journal_is_claimed_again(journal_dir):
+    path = write_journal(journal_dir, "job", dead_pid())
+    claimed_path, = TranscriptJournal.claim_orphans()
+    TranscriptJournal.release(claimed_path)
+    assert os.listdir(journal_dir) == ["call_job.jsonl"]
+    assert TranscriptJournal.claim_orphans() == [claimed_path]
+    TranscriptJournal.release(claimed_path, ".corrupt")
+    assert os.listdir(journal_dir) == ["call_job.jsonl.corrupt"]
+    assert TranscriptJournal.claim_orphans() == []
+    assert path + ".corrupt" == str(journal_dir / "call_job.jsonl.corrupt")
+
+
+def test_read_header_reads_only_the_first_line(journal_dir):
+    path = write_journal(journal_dir, "job", 123, extra="not json\n")
+    assert TranscriptJournal.read_header(path)["pid"] == 123
+    (journal_dir / "empty.jsonl").write_text("")
+    assert TranscriptJournal.read_header(str(journal_dir / "empty.jsonl")) == {}
+
+
+def test_claim_orphans_without_journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "missing"))
+    assert TranscriptJournal.claim_orphans() == []
+
+
+def test_failed_recovery_hands_the_journal_back(journal_dir, monkeypatch):
+    from agent import TranscriptManager
+
+    write_journal(journal_dir, "job", dead_pid(),
+                  extra=json.dumps({"type": "message", "role": "user", "content": "Hi",
+                                    "timestamp": "2026-03-02T10:00:05"}) + "\n")
+
+    async def write_transcript(data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(TranscriptManager, "write_transcript", write_transcript)
+    asyncio.run(TranscriptManager.recover_journals())
+    assert os.listdir(journal_dir) == ["call_job.jsonl"]
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from backend.services import lead_lists
+from backend.services.lead_lists import LeadListStore, normalize_e164
+
+
+def normalize(*values, country_code: str = "91") -> list:
+    result = normalize_e164(pd.Series(list(values), dtype="object"), country_code)
+    return [None if pd.isna(v) else v for v in result]
+
+
+def test_normalize_e164():
+    assert normalize("+1 (415) 555-0100", "0044 20 7946 0958", "98765 43210", "098765 43210") == [
+        "+14155550100", "+442079460958", "+919876543210", "+919876543210"]
+    # Excel stores numbers as floats
+    assert normalize(9876543210.0, "9876543210.0") == ["+919876543210", "+919876543210"]
+
+
+def test_normalize_e164_rejects_invalid_numbers():
+    assert normalize("12345", "not a number", "+0123456789", "+1234567890123456", None, "") == [None] * 6
+
+def test_digits_with_country_code_but_no_plus():
+    assert normalize("919876543210", "14155550100") == ["+919876543210", "+14155550100"]
+
+
+def test_ingest_dedupes_and_reports_invalid_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(lead_lists, "LEAD_LISTS_DIR", str(tmp_path / "lists"))
+    sheet = tmp_path / "leads.csv"
+    sheet.write_text("name,phone\na,9876543210\nb,+91 98765 43210\nc,abc\nd,\ne,+14155550100\n")
+
+    summary = LeadListStore.ingest(str(sheet), "leads.csv")
+    assert (summary["total_count"], summary["duplicate_count"], summary["invalid_count"],
+            summary["blank_count"]) == (2, 1, 1, 1)
+    assert summary["invalid_rows"] == [{"row": 4, "value": "abc"}]
+    assert LeadListStore.load(summary["lead_list_id"]) == ["+919876543210", "+14155550100"]
+    with pytest.raises(KeyError):
+        LeadListStore.load("../etc/passwd")
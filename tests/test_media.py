@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from backend.services.media import RangeFileResponse, parse_range
+
+BODY = bytes(range(256)) * 4
+
+
+def fetch(path: str, **headers) -> tuple:
+    """Runs the response as an ASGI app; returns (status, headers, body)."""
+    scope = {"type": "http", "method": "GET", "extensions": {},
+             "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]}
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(RangeFileResponse(path, "audio/ogg")(scope, None, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = tmp_path / "call.ogg"
+    path.write_bytes(BODY)
+    return str(path)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1024) == (0, 99)
+    assert parse_range("bytes=1000-", 1024) == (1000, 1023)
+    assert parse_range("bytes=1000-5000", 1024) == (1000, 1023)
+    assert parse_range("bytes=-24", 1024) == (1000, 1023)
+    assert parse_range("bytes=-5000", 1024) == (0, 1023)
+    # Ignored: multiple ranges, other units, empty
+    assert parse_range("bytes=0-1,5-6", 1024) is None
+    assert parse_range("items=0-1", 1024) is None
+    assert parse_range("bytes=-", 1024) is None
+    for unsatisfiable in ("bytes=1024-", "bytes=5-4", "bytes=-0"):
+        with pytest.raises(ValueError):
+            parse_range(unsatisfiable, 1024)
+
+
+def test_range_request_returns_partial_content(recording):
+    status, headers, body = fetch(recording, range="bytes=10-19")
+    assert status == 206
+    assert headers["content-range"] == "bytes 10-19/1024"
+    assert body == BODY[10:20]
+
+
+def test_unsatisfiable_range(recording):
+    status, headers, body = fetch(recording, range="bytes=2000-")
+    assert status == 416 and headers["content-range"] == "bytes */1024" and body == b""
+
+
+def test_if_range_sends_whole_file_once_it_changed(recording):
+    _, headers, _ = fetch(recording)
+    status, _, body = fetch(recording, range="bytes=0-9", if_range=headers["etag"])
+    assert status == 206 and body == BODY[:10]
+    status, _, body = fetch(recording, range="bytes=0-9", if_range='"stale"')
+    assert status == 200 and body == BODY
+
+
+def test_conditional_request_not_modified(recording):
+    _, headers, _ = fetch(recording)
+    assert fetch(recording, if_none_match=headers["etag"])[0] == 304
+    assert fetch(recording, if_modified_since=headers["last-modified"])[0] == 304
+    assert fetch(recording, if_none_match='"other"')[0] == 200
@@ -0,0 +1,57 @@
+from livekit.agents import llm
+
+from agent_services.prompts import HistoryWindow, dedupe
+
+INSTRUCTIONS = "You are a polite outbound calling agent."
+
+
+def message(role: str, text: str) -> llm.ChatMessage:
+    return llm.ChatMessage(role=role, content=[text])
+
+
+def turn(n: int) -> list:
+    """One exchange in which the agent looks something up with a tool."""
+    call = llm.FunctionCall(call_id=f"call_{n}", name="lookup", arguments=f'{{"turn": {n}}}')
+    return [
+        message("user", f"Caller sentence number {n} about their software requirements."),
+        call,
+        llm.FunctionCallOutput(call_id=f"call_{n}", name="lookup", output="x " * 40, is_error=False),
+        message("assistant", f"Agent reply number {n} with a follow-up question for the caller."),
+    ]
+
+
+def test_trim_keeps_instructions_and_tool_pairs_and_a_stable_summary():
+    window = HistoryWindow(budget=300, summary_tokens=200)
+    items = [message("system", INSTRUCTIONS)]
+    summary_ids = []
+    for n in range(12):
+        items += turn(n)
+        trimmed = window.trim(llm.ChatContext(items)).items
+
+        assert trimmed[0].role == "system" and trimmed[0].text_content == INSTRUCTIONS
+        history = [i for i in trimmed if i.id != "history_summary"][1:]
+        assert sum(window._count(i) for i in history) <= 300
+        call_ids = {i.call_id for i in history if i.type == "function_call"}
+        assert all(i.call_id in call_ids for i in history if i.type == "function_call_output")
+        if trimmed[1].id == "history_summary":
+            summary_ids.append(trimmed[1].id)
+            assert "Caller: Caller sentence number 0" in trimmed[1].text_content
+
+    assert summary_ids and set(summary_ids) == {"history_summary"}
+    assert window.stats["evicted_items"] > 0 and window.stats["max_history_tokens"] <= 300
+
+
+def test_summary_is_unchanged_between_evictions():
+    window = HistoryWindow(budget=300, summary_tokens=200)
+    items = [message("system", INSTRUCTIONS)]
+    for n in range(8):
+        items += turn(n)
+    first = window.trim(llm.ChatContext(items)).items
+    assert first[1].id == "history_summary"
+    items.append(message("user", "ok"))
+    second = window.trim(llm.ChatContext(items)).items
+    assert second[1].text_content == first[1].text_content
+
+
+def test_dedupe_drops_repeated_lines():
+    assert dedupe("Be polite.\n\n\n  be   POLITE.\nAsk for the number.\n") == "Be polite.\n\nAsk for the number.\n"
@@ -0,0 +1,70 @@
+import asyncio
+import time
+import wave
+from types import SimpleNamespace
+
+from agent_services import recording
+from agent_services.recording import TrackRecorder, mixdown_tracks
+
+RATE = 16000
+FRAME = bytes(b"\x01\x00" * (RATE // 100))  # 10 ms
+
+
+def test_track_is_written_off_the_loop_and_aligned_to_the_recording_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording, "FLUSH_SECONDS", 0.05)
+    path = tmp_path / "tracks" / "caller.wav"
+
+    async def run():
+        # The track appears one second into the recording
+        recorder = TrackRecorder(str(path), recording.CALLER, "sip_caller", RATE, time.monotonic() - 1.0)
+        recorder.start()
+        for _ in range(20):
+            recorder.write_frame(FRAME)
+        await recorder.close()
+        return recorder
+
+    recorder = asyncio.run(run())
+    with wave.open(str(path)) as wav:
+        assert wav.getframerate() == RATE and wav.getnchannels() == 1
+        assert wav.getnframes() == recorder.samples_written
+        # One second of leading silence (less the first frame), then the 200 ms of audio
+        assert abs(wav.getnframes() - RATE * 1.2) < RATE * 0.05
+        frames = wav.readframes(wav.getnframes())
+    assert frames[:2] == b"\x00\x00" and frames[-2:] == b"\x01\x00"
+
+
+def test_mixdown_skips_tracks_that_never_received_audio(tmp_path):
+    async def write_track():
+        recorder = TrackRecorder(str(tmp_path / "agent.wav"), recording.AGENT, "agent", RATE, time.monotonic())
+        recorder.start()
+        recorder.write_frame(FRAME)
+        await recorder.close()
+
+    asyncio.run(write_track())
+    out = tmp_path / "mix.wav"
+    duration = mixdown_tracks([(str(tmp_path / "missing.wav"), 0), (str(tmp_path / "agent.wav"), 1)],
+                              str(out), 2, RATE)
+    assert duration > 0
+    with wave.open(str(out)) as wav:
+        assert wav.getnchannels() == 2
+
+
+def test_failed_track_capture_is_logged(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(recording, "TRACKS_DIR", str(tmp_path))
+    room = SimpleNamespace(local_participant=SimpleNamespace(identity="agent"))
+
+    async def capture(track, recorder):
+        raise OSError("No space left on device")
+
+    async def run():
+        recorder = recording.AudioRecorder(room, "job-1")
+        monkeypatch.setattr(recorder, "_capture_audio", capture)
+        recorder._add_track(SimpleNamespace(sid="TR_1"), recording.CALLER, "sip_caller")
+        await asyncio.gather(*recorder.tasks, return_exceptions=True)
+        await recorder.tracks["TR_1"].close()
+        return recorder
+
+    with caplog.at_level("ERROR", logger="outbound-agent"):
+        recorder = asyncio.run(run())
+    assert not recorder.tasks
+    assert "No space left on device" in caplog.text
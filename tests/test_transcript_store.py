@@ -0,0 +1,62 @@
+import pytest
+
+from backend.services.transcript_store import decode_cursor, encode_cursor
+
+
+def save_calls(store, count: int, timestamp: str = "2026-03-02 10:00:00"):
+    store.save_many([
+        {"job_id": f"job-{n:02d}", "phone_number": "+14155550100" if n % 2 else "+14155550199",
+         "timestamp": timestamp, "duration_seconds": n, "messages": []}
+        for n in range(count)
+    ])
+
+
+def all_pages(fetch, limit: int) -> list:
+    items, cursor = [], None
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        items.extend(item["job_id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_pages_cover_every_call_once_when_timestamps_tie(transcripts):
+    save_calls(transcripts, 7)
+    assert all_pages(transcripts.query, 3) == [f"job-{n:02d}" for n in reversed(range(7))]
+
+
+def test_calls_saved_between_pages_do_not_shift_the_cursor(transcripts):
+    save_calls(transcripts, 4)
+    first = transcripts.query(limit=2)
+    transcripts.save({"job_id": "job-new", "timestamp": "2026-03-02 11:00:00", "messages": []})
+    second = transcripts.query(limit=2, cursor=first["next_cursor"])
+    assert [item["job_id"] for item in second["items"]] == ["job-01", "job-00"]
+
+
+def test_filters_apply_across_pages(transcripts):
+    save_calls(transcripts, 6)
+    pages = all_pages(lambda **kw: transcripts.query(phone_number="+14155550100", min_duration=2, **kw), 1)
+    assert pages == ["job-05", "job-03"]
+    assert transcripts.query(date_to="2026-03-01")["items"] == []
+    assert len(transcripts.query(date_from="2026-03-02", date_to="2026-03-02")["items"]) == 6
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor("2026-03-02 10:00:00", "job-1")) == ("2026-03-02 10:00:00", "job-1")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def plan(store, sql: str, params: tuple) -> str:
+    rows = store.connection().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return " | ".join(row["detail"] for row in rows)
+
+
+def test_phone_filtered_pages_need_no_sort(transcripts):
+    page_sql = ("SELECT job_id FROM {table} WHERE phone_number = ? AND (timestamp, {key}) < (?, ?) "
+                "ORDER BY timestamp DESC, {key} DESC LIMIT 50")
+    for table, key, index in (("calls", "job_id", "idx_calls_phone_page"),
+                              ("recordings", "filename", "idx_recordings_phone_page")):
+        detail = plan(transcripts, page_sql.format(table=table, key=key), ("+14155550100", "2026-03-02", "x"))
+        assert index in detail and "TEMP B-TREE" not in detail
@@ -0,0 +1,43 @@
+import pytest
+
+from agent_services import transfer
+from agent_services.transfer import TransferDirectory, normalize_destination
+
+
+def test_numbers_become_tel_or_sip_uris():
+    assert normalize_destination("+91 12345-67890") == "tel:+911234567890"
+    assert normalize_destination("tel:+911234567890") == "tel:+911234567890"
+    assert normalize_destination("(415) 555.0100", "pbx.example.com") == "sip:4155550100@pbx.example.com"
+
+
+def test_sip_addresses_are_kept():
+    assert normalize_destination("sip:helpdesk@pbx.example.com") == "sip:helpdesk@pbx.example.com"
+    assert normalize_destination("helpdesk@pbx.example.com:5060", "other.example.com") == \
+        "sip:helpdesk@pbx.example.com:5060"
+
+
+@pytest.mark.parametrize("destination", ["sip:help desk@pbx", "sip:@pbx.example.com", "help@pbx_example!com",
+                                         "12345", "+91abc4567890", "sales", ""])
+def test_invalid_destinations_are_rejected(destination):
+    with pytest.raises(ValueError):
+        normalize_destination(destination)
+
+
+def test_directory_resolves_departments_and_falls_back_to_numbers(monkeypatch):
+    monkeypatch.setattr(transfer, "TRANSFER_DIRECTORY",
+                        "Sales=+911234567890, support=sip:helpdesk@pbx.example.com, broken=12, =+911111111111")
+    directory = TransferDirectory.from_env("+919999999999", "pbx.example.com")
+    assert directory.departments == ["sales", "support"]
+    assert directory.resolve(None) == "sip:+919999999999@pbx.example.com"
+    assert directory.resolve(" SALES ") == "sip:+911234567890@pbx.example.com"
+    assert directory.resolve("support") == "sip:helpdesk@pbx.example.com"
+    assert directory.resolve("+14155550100") == "sip:+14155550100@pbx.example.com"
+    with pytest.raises(ValueError):
+        directory.resolve("broken")
+
+
+def test_no_default_transfer_number(monkeypatch):
+    monkeypatch.setattr(transfer, "TRANSFER_DIRECTORY", "")
+    directory = TransferDirectory.from_env(None)
+    with pytest.raises(ValueError, match="no default transfer number"):
+        directory.resolve("")
@@ -0,0 +1,74 @@
+import asyncio
+from collections import deque
+
+import pytest
+
+from backend.services import trunk_admission
+from backend.services.trunk_admission import Trunk, TrunkAdmission, load_trunks
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    """TrunkAdmission over trunks ST_a (2 channels, weight 1) and ST_b (4 channels, weight 3)."""
+    monkeypatch.setattr(TrunkAdmission, "_trunks", {"ST_a": Trunk("ST_a", 2, 1.0), "ST_b": Trunk("ST_b", 4, 3.0)})
+    monkeypatch.setattr(TrunkAdmission, "_rooms", {})
+    monkeypatch.setattr(TrunkAdmission, "_waiters", deque())
+    monkeypatch.setattr(TrunkAdmission, "_queued_total", 0)
+    return TrunkAdmission
+
+
+def test_load_trunks(monkeypatch):
+    monkeypatch.setattr(trunk_admission, "SIP_TRUNKS", "ST_a:20:2, ST_b, ,ST_c::0.5")
+    monkeypatch.setattr(trunk_admission, "TRUNK_MAX_CHANNELS", 10)
+    assert load_trunks() == [("ST_a", 20, 2.0), ("ST_b", 10, 1.0), ("ST_c", 10, 0.5)]
+    monkeypatch.setattr(trunk_admission, "SIP_TRUNKS", "")
+    monkeypatch.setattr(trunk_admission, "OUTBOUND_TRUNK_ID", "ST_default")
+    assert load_trunks() == [("ST_default", 10, 1.0)]
+
+
+def test_aimd_backs_off_on_congestion_and_recovers(monkeypatch):
+    monkeypatch.setattr(trunk_admission, "TRUNK_MIN_CHANNELS", 1)
+    monkeypatch.setattr(trunk_admission, "TRUNK_DECREASE_INTERVAL_SECONDS", 5)
+    trunk = Trunk("ST_a", 8, 1.0)
+    trunk.observe("congested", 100.0)
+    assert trunk.limit == 4
+    # At most one decrease per interval
+    trunk.observe("congested", 101.0)
+    assert trunk.limit == 4
+    trunk.observe("congested", 106.0)
+    assert trunk.limit == 2
+    # Additive increase: about one channel per ceiling's worth of completions, up to the channels
+    for _ in range(2):
+        trunk.observe("answered", 110.0)
+    assert trunk.limit == pytest.approx(2.9, abs=0.05)
+    for _ in range(40):
+        trunk.observe("other", 110.0)
+    assert trunk.limit == 8
+    assert trunk.counts == {"admitted": 0, "answered": 2, "congested": 3, "completed": 45}
+
+
+def test_calls_spread_by_weight_and_queue_when_full(admission):
+    async def run():
+        trunks = [await admission.admit(f"room-{n}", timeout=0.1) for n in range(6)]
+        assert trunks.count("ST_a") == 2 and trunks.count("ST_b") == 4
+        assert await admission.admit("room-late", timeout=0.05) is None
+
+        waiter = asyncio.create_task(admission.admit("room-queued", timeout=1))
+        await asyncio.sleep(0)
+        assert admission.summary()["queued"] == 1
+        admission.call_finished("room-0", "answered")
+        assert await waiter == trunks[0]
+
+    asyncio.run(run())
+
+
+def test_congestion_lowers_the_trunk_ceiling(admission):
+    async def run():
+        return {f"room-{n}": await admission.admit(f"room-{n}", timeout=0.1) for n in range(6)}
+
+    rooms = asyncio.run(run())
+    congested = next(room for room, trunk_id in rooms.items() if trunk_id == "ST_b")
+    admission.call_finished(congested, None, sip_status="503")
+    trunk = admission.trunks()["ST_b"]
+    assert trunk.limit == 2 and trunk.counts["congested"] == 1
+    assert len(trunk.legs) == 3 and not trunk.has_capacity()